@@ -3,19 +3,235 @@
 
 """Determine the type of an input file by validating it with multiple schemas."""
 
-from output_filters.schema.validate import schema_check
+from output_filters.schema.validate import get_validator, load_input, is_valid
+import os
+import re
 import sys
 
-def get_matching_schemas(input_file : str, schemas : list):
-    checkit = lambda f : schema_check(input_file, f, quiet=True)
-    return list(filter(checkit, schemas))
+# Full validation against every candidate schema is the only reliable answer, but it requires loading the whole
+# input file and is repeated for each schema.  Most files can be narrowed down to one or a few plausible schemas by
+# some cheap "discriminators" first:
+#
+#  1. schema:    If the file names its schema, the candidate schema(s) with that path are the plausible ones.
+#  2. filetype:  If the file states its filetype (the IFEX Core IDL default is "IFEX Core IDL", see ifex_ast.AST),
+#                the schemas whose filetype (const/enum of the filetype property, or else the title) matches it.
+#  3. Key signature:  A schema is not plausible if a required top-level key is missing, if the file has a top-level
+#                key that the schema does not allow, or (for schemas that allow no additional properties anywhere) if
+#                the file uses a key that the schema does not define at all.  For example, a ValueConstraint layer
+#                uses min_value, which the Timing schema does not know.
+#
+# A discriminator that matches none of the candidates is ignored (the file may for example refer to the schema by
+# URL).  The keys are found by scanning the lines of the file, without parsing the YAML.  The scan stops early if the
+# schema key already identifies the schema.  The plausible schemas are then fully validated first.
+#
+# The scan is a heuristic, and YAML has constructs it does not understand (flow collections spanning lines, aliases,
+# ...), so the discriminators only decide the order of validation:  If the input is valid for none of the plausible
+# schemas, the other schemas are fully validated as well.  An input that is valid for some schema is therefore never
+# reported as matching nothing, it only takes longer when the discriminators guessed wrong.
+
+# A "key: value" line in block-style YAML, possibly a list item ("- key: value")
+key_line = re.compile(r'^( *)((?:- +)*)([^\s#\-{\[\'"&*!|>%@`][^:#]*?|"[^"]*"|\'[^\']*\') *:(?: +([^#]*?))? *(?:#.*)?$')
+
+# Block scalar indicator (description: |), the lines below it are text, not keys
+block_scalar = re.compile(r'^[|>][-+0-9]*$')
+
+# Merge key (<<: *defaults), which stands for the keys of another mapping
+MERGE_KEY = '<<'
+
+def _open_quote(value):
+    """Return the quote character if value starts a quoted scalar that continues on the next line, else None"""
+    if not value or value[0] not in '"\'':
+        return None
+    return value[0] if _closing_quote(value[1:], value[0]) is None else None
+
+def _closing_quote(text, quote):
+    """Return the position after the end of a quoted scalar that started before text, or None if it does not end"""
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if quote == '"' and c == '\\':
+            i += 2
+            continue
+        if c == quote:
+            if quote == "'" and text[i + 1:i + 2] == "'":   # '' is an escaped quote
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return None
+
+def _unquote(s):
+    return s[1:-1] if len(s) >= 2 and s[0] == s[-1] and s[0] in '"\'' else s
+
+def peek_keys(input_file, stop_at=None):
+    """Scan a YAML file for its keys.  Returns (top-level keys -> scalar value as a string or None, set of all keys).
+    Stops reading when the top-level key stop_at is found.  Returns None if the file is not block-style YAML."""
+    top_level = {}
+    all_keys = set()
+    text_indent = None  # Indentation of the block scalar that is being skipped
+    quote = None        # Quote character of the multi-line quoted scalar that is being skipped
+    with open(input_file, 'r') as file:
+        for line in file:
+            line = line.rstrip('\n')
+            stripped = line.lstrip(' ')
+            if quote is not None:
+                if _closing_quote(line, quote) is not None:
+                    quote = None
+                continue
+            if text_indent is not None:
+                if stripped == '' or len(line) - len(stripped) > text_indent:
+                    continue
+                text_indent = None
+            if stripped == '' or stripped[0] == '#' or line.startswith(('---', '...', '%')):
+                continue
+            if len(line) == len(stripped) and line[0] in '{[':
+                return None
+            match = key_line.match(line)
+            if match is None:
+                continue
+            indent, dashes, key, value = match.groups()
+            if value:
+                if block_scalar.match(value):
+                    text_indent = len(indent) + len(dashes)
+                # (The value without a comment, so "a # b" is judged from the line itself)
+                quote = _open_quote(line[match.start(4):])
+            key = _unquote(key)
+            if key == MERGE_KEY:
+                continue
+            all_keys.add(key)
+            if indent == '' and dashes == '':
+                top_level[key] = _unquote(value) if value else None
+                if key == stop_at:
+                    break
+    return top_level, all_keys
+
+def _subschemas(node):
+    for key in ('items', 'additionalItems', 'not', 'if', 'then', 'else', 'contains'):
+        sub = node.get(key)
+        if isinstance(sub, dict):
+            yield sub
+        elif isinstance(sub, list):
+            yield from sub
+    for key in ('allOf', 'anyOf', 'oneOf', 'prefixItems'):
+        yield from node.get(key, [])
+    for key in ('properties', 'definitions', '$defs'):
+        yield from node.get(key, {}).values()
+
+def _key_vocabulary(schema):
+    """Return all property names defined in the schema, or None if the schema allows undefined properties somewhere"""
+    names = set()
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if 'patternProperties' in node:
+            return None
+        if 'properties' in node:
+            if node.get('additionalProperties') is not False:
+                return None
+            names.update(node['properties'])
+        elif node.get('type') == 'object' and node.get('additionalProperties') is not False and \
+             not any(k in node for k in ('$ref', 'allOf', 'anyOf', 'oneOf')):
+            return None
+        stack.extend(_subschemas(node))
+    return names
+
+def _top_level_rules(schema):
+    """Return (allowed top-level keys or None if any key is allowed, required top-level keys, declared filetypes)"""
+    properties, required, closed = {}, set(), False
+    parts = [schema]
+    for sub in schema.get('allOf', []):
+        # Follow local references only ("#/definitions/AST")
+        ref = sub.get('$ref', '')
+        if ref.startswith('#/'):
+            target = schema
+            for name in ref[2:].split('/'):
+                target = target.get(name, {})
+            sub = target
+        parts.append(sub)
+    for part in parts:
+        properties.update(part.get('properties', {}))
+        required.update(part.get('required', []))
+        closed = closed or part.get('additionalProperties') is False
+    filetype = properties.get('filetype', {})
+    filetypes = [filetype['const']] if 'const' in filetype else filetype.get('enum', [])
+    return (set(properties) if closed else None), required, filetypes
+
+_rules = {}  # Absolute schema path -> (validator, rules)
+
+def _schema_rules(schema_file):
+    """Return (allowed top-level keys, required top-level keys, filetypes, key vocabulary) for a schema file"""
+    validator = get_validator(schema_file)
+    path = os.path.abspath(schema_file)
+    cached = _rules.get(path)
+    if cached is None or cached[0] is not validator:
+        cached = (validator, _top_level_rules(validator.schema) + (_key_vocabulary(validator.schema),))
+        _rules[path] = cached
+    return cached[1]
+
+def _same_file(schema_file, reference, input_file):
+    # The reference may be relative to the input file, or a partial path such as "Timing/schema.json"
+    reference = os.path.normpath(reference)
+    schema_path = os.path.normpath(os.path.abspath(schema_file))
+    return schema_path == os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(input_file)), reference)) or \
+           schema_path.endswith(os.sep + reference.lstrip(os.sep + '.'))
+
+def plausible_schemas(input_file : str, schemas : list):
+    """Return the schemas that input_file may be valid for, judged by the discriminators (see above)"""
+    peeked = peek_keys(input_file, stop_at='schema')
+    if peeked is None:
+        return list(schemas)
+    top_level, all_keys = peeked
+
+    reference = top_level.get('schema')
+    if reference:
+        named = [f for f in schemas if _same_file(f, reference, input_file)]
+        if named:
+            return named
+        # The scan stopped at the schema key.  All keys are needed for the other discriminators.
+        top_level, all_keys = peek_keys(input_file)
+
+    candidates = list(schemas)
+    filetype = top_level.get('filetype')
+    if filetype:
+        typed = [f for f in candidates
+                 if filetype in _schema_rules(f)[2] or
+                    filetype.lower() in get_validator(f).schema.get('title', '').lower()]
+        candidates = typed or candidates
+
+    def signature_matches(schema_file):
+        allowed, required, _, vocabulary = _schema_rules(schema_file)
+        return required.issubset(top_level) and \
+               (allowed is None or allowed.issuperset(top_level)) and \
+               (vocabulary is None or vocabulary.issuperset(all_keys))
+    return [f for f in candidates if signature_matches(f)]
+
+def get_matching_schemas(input_file : str, schemas : list, fast : bool = True):
+    """Return the schemas that input_file is valid for.  With fast=True, the schemas that are plausible according to
+    the discriminators are validated first, and the others only if the input is valid for none of them."""
+    # The input is loaded once, and the validators for the schemas are cached by the validate module
+    input_data = load_input(input_file)
+    if fast:
+        plausible = plausible_schemas(input_file, schemas)
+        matching = [f for f in plausible if is_valid(input_data, f)]
+        if matching:
+            return matching
+        schemas = [f for f in schemas if f not in plausible]
+    return [f for f in schemas if is_valid(input_data, f)]
 
 # Some other possibly useful entry points for usage from other modules:
 def is_single_match(input_file : str, schemas : list):
     return len(get_matching_schemas(input_file, schemas)) == 1
 
 # Note - this one intended to be called _only if_ is_single_match is True
-def identify_file(input_file : str, schemas : list):
+# With validate=False, the file is not validated if the discriminators leave only one plausible schema.  That is
+# only a guess of the file type (the file may still be invalid), but it does not require loading the file.
+def identify_file(input_file : str, schemas : list, validate : bool = True):
+    if not validate:
+        plausible = plausible_schemas(input_file, schemas)
+        if len(plausible) == 1:
+            return plausible[0]
     matching = get_matching_schemas(input_file, schemas)
     if len(matching) == 1:
         return matching[0]
@@ -13,6 +13,7 @@ from models.ifex.ifex_ast import (
     Struct,
     Typedef,
 )
+from models.common.ast_utils import plain_type
 from models.ifex import ifex_parser
 import sys
 
@@ -82,86 +83,192 @@ def get_array_member(typename):
     return typename.split("[")[0]
 
 
-# Main IFEX to D-Bus type translator:  This function will recurse until a D-Bus
-# supported primitive type has been created.
-def gen_dbus_type(ifextype):
-    dbus_type = ""
-    # Iterate over lists
-    if isinstance(ifextype, list):
-        for t in ifextype:
-            dbus_type += f"{t} => {gen_dbus_type(t)}\n"
-    # Array of items
-    elif is_array(ifextype):
-        dbus_type += "a" + gen_dbus_type(get_array_member(ifextype))
-    # Typedef/Enumeration -> just translate to the underlying type
-    elif isinstance(ifextype, Typedef) or isinstance(ifextype, Enumeration):
-        dbus_type += gen_dbus_type(ifextype.datatype)
-    # Struct of items -> parentheses, and recurse on struct members
-    elif isinstance(ifextype, Struct):
-        dbus_type += "("
-        for m in ifextype.members:
-            dbus_type += gen_dbus_type(m)
-        dbus_type += ")"
-    # Member (of Struct) -> translate its datatype
-    elif isinstance(ifextype, Member):
-        dbus_type += gen_dbus_type(ifextype.datatype)
-    # Direct type name, (non-array)
-    else:
-        dbt = ifex_to_dbus_types.get(ifextype)
-        known_type = known_ifex_type_definitions.get(ifextype)
+class DBusTypeError(Exception):
+    pass
+
+# Types are looked up in scopes:  Each Namespace, and each Interface, is a
+# scope that contains the types (structs, typedefs, enumerations) defined in
+# it.  A type name used in a scope refers to the definition in the nearest
+# enclosing scope, i.e. the Interface, then its Namespace, then the parent
+# Namespaces.  A name can also be qualified with the namespace path
+# (ns.subns.Type).  A name that is not visible from the scope at all refers to
+# a definition of that name anywhere (the last one collected), as all names
+# did before types were scoped.
+class _Scope:
+    __slots__ = ('parent', 'types')
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.types = {}
+
+# Main IFEX to D-Bus type translator.
+#
+# A SignatureResolver is created per generation run, collects the type
+# definitions (see collect()), and then returns the D-Bus signature for IFEX
+# types.  The signature of each definition is computed only once and then
+# cached, so a struct that is used by many arguments (or by other structs) is
+# not expanded again every time.  A type that refers to itself, directly or
+# through other types, has no D-Bus signature and raises DBusTypeError.
+#
+#     resolver = SignatureResolver(ast)
+#     resolver.signature("uint8[]")              # "ay"
+#     resolver.signature(arg.datatype, method)   # names as seen from method's interface
+class SignatureResolver:
+
+    def __init__(self, node=None):
+        self.root = _Scope()
+        # Namespace path (tuple of names) -> _Scope
+        self.namespaces = {(): self.root}
+        # id() of Namespaces, Interfaces and their methods/properties/events -> _Scope where names are looked up
+        self.node_scopes = {}
+        # Type name -> (definition, _Scope), for names that are not visible from a scope
+        self.all_types = {}
+        # id() of each definition -> _Scope where it is defined
+        self.definition_scopes = {}
+        self.clear_cache()
+        if node is not None:
+            self.collect(node)
+
+    def clear_cache(self):
+        # (id(scope), name) -> signature, and id(definition) -> signature
+        self.name_signatures = {}
+        self.definition_signatures = {}
+        # Definitions whose signature is being computed, to detect recursion
+        self.resolving = []
+
+    # Complex types (typedefs, structs, enums...) can refer to other complex
+    # types, not only to primitive types.  collect() registers all types that
+    # are defined in node, so that their definition is known when they are
+    # referenced later.  It shall be called with all IFEX trees that contain
+    # types that could be referenced by the converted interfaces.
+    def collect(self, node, path=()):
+        # FIXME: Shall this also handle partial type-defining files that lack namespace structure?
+        self.clear_cache()
+
+        # Recurse over each instance in a list
+        if isinstance(node, list):
+            for listitem in node:
+                self.collect(listitem, path)
+            return
+
+        # Recurse on each (sub)-namespace
+        if plain_type(node) is AST:
+            self.collect(node.namespaces, path)
+        elif plain_type(node) is Namespace:
+            path = path + (node.name,)
+            scope = self._namespace_scope(path)
+            self._add_types(node, scope)
+            self.node_scopes[id(node)] = scope
+            self.collect(node.namespaces, path)
+
+            # Finally, a single Interface can be underneath any Namespace
+            if node.interface is not None:
+                interface = node.interface
+                interface_scope = _Scope(scope)
+                self._add_types(interface, interface_scope)
+                for x in [interface] + interface.methods + interface.properties + interface.events:
+                    self.node_scopes[id(x)] = interface_scope
+        elif plain_type(node) is Interface:
+            # (An Interface without its Namespace)
+            self._add_types(node, self.root)
+
+    def _namespace_scope(self, path):
+        if path not in self.namespaces:
+            self.namespaces[path] = _Scope(self._namespace_scope(path[:-1]))
+        return self.namespaces[path]
+
+    def _add_types(self, node, scope):
+        for x in node.structs + node.typedefs + node.enumerations:
+            scope.types[x.name] = x
+            self.all_types[x.name] = (x, scope)
+            self.definition_scopes[id(x)] = scope
+
+    def lookup(self, name, scope=None):
+        """Return (definition, scope of the definition) for a type name used in scope, or None"""
+        s = scope or self.root
+        while s is not None:
+            if name in s.types:
+                return s.types[name], s
+            s = s.parent
+        if isinstance(name, str) and '.' in name:
+            path, _, base = name.rpartition('.')
+            qualified = self.namespaces.get(tuple(path.split('.')))
+            if qualified is not None and base in qualified.types:
+                return qualified.types[base], qualified
+        return self.all_types.get(name)
+
+    def signature(self, ifextype, context=None):
+        """Return the D-Bus signature of ifextype (a type name or a type definition).  Type names are looked up
+        from the scope of the context node (a Namespace, Interface, Method, Property or Event), if given."""
+        # Iterate over lists
+        if isinstance(ifextype, list):
+            return "".join(f"{t} => {self.signature(t, context)}\n" for t in ifextype)
+        scope = self.node_scopes.get(id(context)) if context is not None else None
+        return self._signature(ifextype, scope or self.root)
+
+    def _signature(self, ifextype, scope):
+        # Typedef/Enumeration/Struct -> see _definition_signature
+        if isinstance(ifextype, (Typedef, Enumeration, Struct)):
+            return self._definition_signature(ifextype, self.definition_scopes.get(id(ifextype), scope))
+        # Member (of Struct) -> translate its datatype
+        elif isinstance(ifextype, Member):
+            return self._signature(ifextype.datatype, scope)
+        # Type name
+        key = (id(scope), ifextype)
+        dbus_type = self.name_signatures.get(key)
+        if dbus_type is None:
+            dbus_type = self.name_signatures[key] = self._name_signature(ifextype, scope)
+        return dbus_type
+
+    def _name_signature(self, name, scope):
+        # Array of items
+        if is_array(name):
+            return "a" + self._signature(get_array_member(name), scope)
+        # Direct type name, (non-array)
+        dbt = ifex_to_dbus_types.get(name)
         if dbt is not None:
-            dbus_type += dbt
-        elif known_type is not None:
-            dbus_type += gen_dbus_type(known_type)
-        else:
-            dbus_type += f"UNKNOWN_TYPE({ifextype})"
+            return dbt
+        found = self.lookup(name, scope)
+        if found is None:
+            return f"UNKNOWN_TYPE({name})"
+        return self._definition_signature(*found)
 
-    return dbus_type
+    def _definition_signature(self, definition, scope):
+        dbus_type = self.definition_signatures.get(id(definition))
+        if dbus_type is not None:
+            return dbus_type
+        for i, d in enumerate(self.resolving):
+            if d is definition:
+                cycle = self.resolving[i:] + [definition]
+                raise DBusTypeError(f"Recursive type definition, which D-Bus cannot represent: "
+                                    f"{' -> '.join(d.name for d in cycle)}")
+        self.resolving.append(definition)
+        try:
+            # Struct of items -> parentheses, and recurse on struct members
+            if isinstance(definition, Struct):
+                dbus_type = "(" + "".join(self._signature(m.datatype, scope) for m in definition.members) + ")"
+            # Typedef/Enumeration -> just translate to the underlying type
+            else:
+                dbus_type = self._signature(definition.datatype, scope)
+        finally:
+            self.resolving.pop()
+        self.definition_signatures[id(definition)] = dbus_type
+        return dbus_type
 
 
-# Registry for type definitions taken from the IFEX file
-# (or included files):
-known_ifex_type_definitions = {}
+# Module-level functions, which use one resolver for everything that is
+# collected.  (The generator creates its own SignatureResolver for each run)
+default_resolver = SignatureResolver()
 
-# Complex types (typedefs, structs, enums...) can refer to other complex
-# types, not only to primitive types.
-# In this function we do a first iteration to register all defined types.
-# so that their definition is known when they are referenced later.
+def gen_dbus_type(ifextype, context=None):
+    return default_resolver.signature(ifextype, context)
 
 # collect_types() shall be called with all IFEX files that contain types that we
 # need to convert. (i.e. any type that _could_ be referenced by another type in the
 # converted interface file)
-
-
-# NOTE! This collects into a module-global variable `known_ifex_type_definitions`
-# => no multithreading/parallel use.
-# (if later needed the module shall be converted into an instantiable class instead)
 # The node parameter is a dataclass instance, as returned from the dacite conversion
 def collect_types(node):
-    # FIXME: Shall this also handle partial type-defining files that lack namespace structure?
-
-    # Recurse over each instance in a list
-    if type(node) is list:
-        for listitem in node:
-            collect_types(listitem)
-        return
-
-    # Recurse on each (sub)-namespace
-    if type(node) in [Namespace, AST]:
-        collect_types(node.namespaces)
-
-    # Types can be collected from either a Namespace or an Interface
-    if type(node) in [Interface, Namespace]:
-        for x in node.structs:
-            known_ifex_type_definitions[x.name] = x
-        for x in node.typedefs:
-            known_ifex_type_definitions[x.name] = x.datatype
-        for x in node.enumerations:
-            known_ifex_type_definitions[x.name] = x.datatype
-
-    # Finally, a single Interface can be underneath any Namespace
-    if type(node) is Namespace and node.interface is not None:
-        collect_types(node.interface)
+    default_resolver.collect(node)
 
 
 # main() = FOR MODULE TEST ONLY - NOT USED BY MAIN CODE GENERATOR
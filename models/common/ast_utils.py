@@ -2,10 +2,12 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from collections import OrderedDict
-from dataclasses import fields, is_dataclass
+from dataclasses import fields, is_dataclass, FrozenInstanceError
 from datetime import datetime, date
 from transformers.rule_translator import  _log
 from typing import get_args, get_origin, List, Optional, Union, Any, Dict, ForwardRef
+import copy
+import hashlib
 import oyaml
 
 # This module supports creating and processing an IFEX internal tree, and many
@@ -163,9 +165,10 @@ def is_simple_type(t) -> bool:
     return t in [str, int, float, bool, date, datetime]
 
 def is_empty(node) -> bool:
-    if type(node) is str:
+    # (isinstance, so that the FrozenList of a frozen tree counts as a list, see freeze())
+    if isinstance(node, str):
         return node == ""
-    elif type(node) is list:
+    elif isinstance(node, list):
         return node == []
     else:
         return node is None
@@ -173,7 +176,7 @@ def is_empty(node) -> bool:
 # Factoring out some of the boolean checks:
 def type_match(node, type_) -> bool:
     # Pass Any as type == wildcard matches everything...otherwise compare types
-    return type_ == Any or (type(node) ==  type_)
+    return type_ == Any or (plain_type(node) ==  type_)
 
 def name_match(node, name) -> bool:
     # Note that "*" is considered wildcard - matches any name!
@@ -378,7 +381,7 @@ def ast_to_dict(node, debug_context="") -> OrderedDict:
 
     # In addition to dicts, we might have python lists, which will be output as lists in YAML
     #if is_list(node) or type(node) == list:
-    if type(node) is list:
+    if isinstance(node, list):
         ret = []
         for listitem in node:
             ret.append(ast_to_dict(listitem, debug_context=str(node)))
@@ -400,6 +403,129 @@ def ast_to_dict(node, debug_context="") -> OrderedDict:
 
     return ret
 
+# Freezing: A tree that shares subtrees with other trees (see merge_overlay) is affected by any modification of the
+# shared nodes, through any of the trees.  freeze() makes a tree read-only:  Lists are replaced by FrozenList, and each node gets a frozen
+# variant of its class (a subclass with the same name, created once per class), for which assigning to a member
+# variable raises FrozenInstanceError.  The AST classes themselves are not modified, so nodes that were not frozen
+# behave as before.  Use plain_type() instead of type() to compare the class of a node that may be frozen.
+#
+# - Copies made with copy.deepcopy() or pickle remain frozen.
+# - dataclasses.replace() on a frozen node returns a normal (modifiable) node.
+# - Freezing stops at nodes that are already frozen, because everything below a frozen node is frozen too.  This
+#   means that freezing a new tree which reuses a frozen tree only costs as much as the new (unshared) part of it.
+# - freeze() modifies the given tree in place.
+
+class FrozenList(list):
+    """A list that raises TypeError on any modification (used by freeze())"""
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("This list is part of a frozen tree and can not be modified")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _immutable
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+    def __deepcopy__(self, memo):
+        return FrozenList(copy.deepcopy(x, memo) for x in self)
+
+_frozen_classes = {}  # AST class -> its frozen variant
+
+def _frozen_setattr(self, name, value):
+    raise FrozenInstanceError(f"cannot assign to field '{name}' of frozen {type(self).__name__} node")
+
+def _frozen_delattr(self, name):
+    raise FrozenInstanceError(f"cannot delete field '{name}' of frozen {type(self).__name__} node")
+
+def _frozen_new(cls, *args, **kwargs):
+    # Creating an instance of a frozen class (as dataclasses.replace() does) creates a normal node
+    node = object.__new__(cls._frozen_base)
+    node.__init__(*args, **kwargs)
+    return node
+
+def _frozen_eq(self, other):
+    base = self._frozen_base
+    if plain_type(other) is not base:
+        return NotImplemented
+    return all(getattr(self, f.name) == getattr(other, f.name) for f in fields(base) if f.compare)
+
+def _frozen_reduce_ex(self, protocol):
+    return (_make_frozen, (self._frozen_base, self.__dict__))
+
+def _make_frozen(cls, state):
+    node = object.__new__(cls)
+    node.__dict__.update(state)
+    node.__class__ = _frozen_class(cls)
+    return node
+
+def _frozen_class(cls):
+    frozen = _frozen_classes.get(cls)
+    if frozen is None:
+        frozen = type(cls.__name__, (cls,), {
+            '__module__': cls.__module__, '__qualname__': cls.__qualname__, '__doc__': cls.__doc__,
+            '_frozen_base': cls,
+            '__new__': _frozen_new, '__setattr__': _frozen_setattr, '__delattr__': _frozen_delattr,
+            '__eq__': _frozen_eq, '__hash__': cls.__hash__, '__reduce_ex__': _frozen_reduce_ex,
+        })
+        _frozen_classes[cls] = frozen
+    return frozen
+
+def plain_type(node):
+    """Return the class of node, or for a frozen node the class it is a frozen variant of"""
+    cls = type(node)
+    return cls.__dict__.get('_frozen_base', cls)
+
+def is_frozen(node) -> bool:
+    return '_frozen_base' in type(node).__dict__
+
+def _freeze_node(node):
+    for f in fields(node):
+        value = node.__dict__[f.name]
+        freeze(value)
+        if isinstance(value, list) and not isinstance(value, FrozenList):
+            # (A new list, so that a list which is also referenced from somewhere else is not affected)
+            node.__dict__[f.name] = FrozenList(value)
+    node.__class__ = _frozen_class(type(node))
+
+def freeze(node):
+    """Make the tree below (and including) node read-only.  Returns node."""
+    if isinstance(node, list):
+        for item in node:
+            freeze(item)
+        return node
+
+    if is_ast_type(node) and not is_frozen(node):
+        _freeze_node(node)
+    return node
+
+# Content hashes: A digest of the complete content of a node, including all its children.  Two nodes with the same
+# digest are equal (in the dataclass == sense).  Used for example to detect which parts of a layer were modified
+# since the last time it was read.
+
+def content_hash(node, hashes=None) -> bytes:
+    """Return the content digest of node.  If a dict is given as hashes, the digest of every node in the tree is
+    stored in it, keyed by id() of the node."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(node, list):
+        h.update(b'[')
+        for item in node:
+            h.update(content_hash(item, hashes))
+        h.update(b']')
+    elif hasattr(node, '__dataclass_fields__') and not isinstance(node, type):
+        h.update(type(node).__name__.encode())
+        for name in node.__dataclass_fields__:
+            h.update(name.encode())
+            value = getattr(node, name)
+            # (Shortcut for the most common leaf values.  The length prefix keeps adjacent values apart)
+            b = repr(value).encode() if value is None or type(value) in (str, int) else content_hash(value, hashes)
+            h.update(len(b).to_bytes(4, 'little'))
+            h.update(b)
+        if hashes is not None:
+            hashes[id(node)] = h.digest()
+    else:
+        h.update(repr(node).encode())
+    return h.digest()
+
 def dict_as_yaml(d):
     return oyaml.dump(d)
 
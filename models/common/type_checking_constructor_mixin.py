@@ -2,7 +2,7 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from dataclasses import dataclass, fields
-from models.common.ast_utils import is_dataclass, is_list, actual_type, inner_type, is_optional, field_is_optional, is_any
+from models.common.ast_utils import is_dataclass, is_list, actual_type, inner_type, is_optional, field_is_optional, is_any, plain_type
 from typing import get_type_hints, List, Optional, Any
 
 """
@@ -36,21 +36,22 @@ This module adds a type-checking constructor to dataclass definitions if they ha
 #    ns.interface.methods = [... method objects...]
 
 def is_correct_type(value, _type):
-    if type(value) is list and is_list(_type):
+    # (isinstance and plain_type, so that the lists and nodes of a frozen tree are accepted, see ast_utils.freeze())
+    if isinstance(value, list) and is_list(_type):
         # In standard python code values placed _inside_ a list could be of any
         # type (and different types!)   We want to check that the specification
         # is fulfilled, so we check that all values in list have the right type:
         expected_type = inner_type(_type)
-        return all(type(v) == expected_type for v in value)
+        return all(plain_type(v) == expected_type for v in value)
     # For optional types, it's OK to set them to None
     elif is_optional(_type):
         #print(f"OPTIONAL-> allowing None")
-        return value == None or type(value) == actual_type(_type)
+        return value == None or plain_type(value) == actual_type(_type)
     # If type is "Any", then any type is accepted
     elif is_any(_type):
         return True
     else:
-        return type(value) == actual_type(_type)
+        return plain_type(value) == actual_type(_type)
 
 
 def add_constructors_to_ast_model(module) -> None:
@@ -18,93 +18,368 @@ IFEX code-generation functions
 #    according to given templates.
 
 # For other features from parser module
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any
+from models.ifex.ifex_ast import Interface
 from output_filters.templates import JinjaTemplateEnv
-
-# Module global - probably soon to be modified to run-time instantiation of a
-# JinjaTemplateEnv instance instead.
-jinja_env = JinjaTemplateEnv.JinjaTemplateEnv("simple")
+import contextlib
+import jinja2
 
 # Exception:
 class GeneratorError(BaseException):
     def __init__(self, m):
         self.msg = m
 
-# ---------- GENERATION FUNCTIONS ------------
-
-# gen() function to be called from templates
-def gen(node : Any, template_file = None):
-    # Processing of lists of objects?
-
-    if node is None:
-       return "NONE"
-
-    if isinstance(node, (list,tuple)):
-        # Generate each node and return a list of results. A list is not
-        # intended to be printed directly as output, but to be processed by
-        # a jinja filter, such as |join(', ')
-        return [gen(x, template_file) for x in node]
-    else:
-        # No explicit template -> use default for the node type
-        if template_file is None:
-            return _gen_with_default_template(node)
-        elif type(template_file) == str:   # Explicit template file -> use it
-            return jinja_env.get_template(template_file).render({'item' : node})
+# ---------- RENDER CACHE ------------
+
+# Templates often call gen() several times on the same node, and shared nodes
+# (structs, typedefs) can be rendered from many places.  A template whose output
+# depends only on the node it renders (and on other pure templates), and not on
+# state that changes while the tree is rendered, can declare itself pure with
+# this comment anywhere in the template:
+#
+#     {# ifex:pure #}
+#
+# A Generator created with render_cache=True then renders each node with such a
+# template only once per run (i.e. per call of gen()/stream() from outside the
+# templates), and reuses the text for the other calls.  Its RenderCache counts
+# hits and misses per template, to show template authors how much is reused.
+# Output of pure templates is not streamed, since the text is kept anyway.
+
+PURE_MARKER = 'ifex:pure'
+
+class RenderCache:
+    def __init__(self):
+        # (template name, id(node)) -> (node, text).  (The node is kept so that its id is not reused during the run)
+        self.entries = {}
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        """Return template name -> (hits, misses)"""
+        return {name: (self.hits[name], self.misses[name]) for name in sorted(set(self.hits) | set(self.misses))}
+
+    def __str__(self):
+        lines = [f"{name}: {hits} hits, {misses} misses" for name, (hits, misses) in self.stats().items()]
+        return "\n".join(lines) or "(no pure templates used)"
+
+# ---------- GENERATOR ------------
+
+# A Generator owns its Jinja environment (with the template directory) and any
+# state that is built up during one generation run.  Its gen() function is a
+# closure over the generator, and is exported to the templates, so a template
+# calling gen() always renders with the same generator that is rendering the
+# template itself.  Several generators can therefore be used at the same time,
+# e.g. in different threads, without interfering with each other.
+#
+#     generator = Generator("D-Bus")
+#     generator.set_template_env(my_helper=my_helper)
+#     text = generator.gen(ast)
+#
+# Generators for a specific output format can derive from this class and keep
+# their own per-run state in the instance (see output_filters/DBus).
+
+class Generator:
+    # bytecode_cache: See output_filters/templates/TemplateCache.py
+    # compiled: See output_filters/templates/TemplateCompiler.py
+    # render_cache: See RenderCache
+    def __init__(self, template_dir="simple", bytecode_cache=None, compiled=None, render_cache=False,
+                 **template_globals):
+        self.template_dir = template_dir
+        self.jinja_env = JinjaTemplateEnv.JinjaTemplateEnv(template_dir, bytecode_cache, compiled)
+
+        # Results rendered by the workers of gen_parallel(), keyed by id() of the node
+        self.prerendered = {}
+
+        # Output of pure templates (or None), and template name -> is pure
+        self.render_cache = RenderCache() if render_cache else None
+        self.pure_templates = {}
+        # Number of gen()/stream() calls in progress, to find the start of a run
+        self.depth = 0
+
+        # If set, is told about each node that is rendered with a template (see
+        # models/ifex/ifex_incremental.py)
+        self.dependencies = None
+
+        # gen() function to be called from templates.  gen.stream() yields the
+        # same output in chunks, see stream()
+        def gen(node : Any, template_file = None):
+            with self._run():
+                return self._gen(node, template_file)
+        gen.stream = self.stream
+        self.gen = gen
+
+        self.jinja_env.set_template_env(gen=gen, **template_globals)
+
+    # Export functions and values into jinja template land so that they can be
+    # referred to inside templates.
+    def set_template_env(self, **kwargs):
+        self.jinja_env.set_template_env(**kwargs)
+
+    # ---------- GENERATION FUNCTIONS ------------
+
+    @contextlib.contextmanager
+    def _run(self):
+        if self.depth == 0 and self.render_cache is not None:
+            self.render_cache.clear()
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+
+    def is_pure(self, template):
+        pure = self.pure_templates.get(template.name)
+        if pure is None:
+            pure = PURE_MARKER in self.jinja_env.template_markers(template.name)
+            self.pure_templates[template.name] = pure
+        return pure
+
+    def _render(self, template, node : Any):
+        if self.dependencies is not None:
+            self.dependencies.used(template, node)
+        if self.render_cache is None or not self.is_pure(template):
+            return template.render({'item' : node})
+        key = (template.name, id(node))
+        entry = self.render_cache.entries.get(key)
+        if entry is not None:
+            self.render_cache.hits[template.name] += 1
+            return entry[1]
+        self.render_cache.misses[template.name] += 1
+        text = template.render({'item' : node})
+        self.render_cache.entries[key] = (node, text)
+        return text
+
+    def _generate(self, template, node : Any):
+        if self.render_cache is None or not self.is_pure(template):
+            if self.dependencies is not None:
+                self.dependencies.used(template, node)
+            yield from template.generate({'item' : node})
+        else:
+            yield self._render(template, node)
+
+    def _gen(self, node : Any, template_file = None):
+        # Processing of lists of objects?
+
+        if node is None:
+           return "NONE"
+
+        if isinstance(node, (list,tuple)):
+            # Generate each node and return a list of results. A list is not
+            # intended to be printed directly as output, but to be processed by
+            # a jinja filter, such as |join(', ')
+            return [self._gen(x, template_file) for x in node]
         else:
-            print(f'node is of type {type(node)}, second arg is of type {type(template_file)}  ({type(template_file).__class__}, {type(template_file).__class__.__name__})')
-            raise GeneratorError(f'Wrong use of gen() function! Usage: pass the node as first argument (you passed a {type(node)}), and optionally template name (str) as second argument. (You passed a {template_file.__name__})')
-
-# gen helper function:
-def _gen_with_default_template(node : Any):
-
-    # None is for a field that exists in Namespace definition, but was not given
-    # a value in the YAML (=> happens only if it was an optional item).
-    if node is None:
-        # FIXME: This should be expected behavior and should return empty string,
-        # but let's first debug to see when it happens:
-        raise GeneratorError(f"_gen_type(): Unexpected 'None' node received")
-
-    # StrictUndefined is for an *unknown* field mentioned in the Jinja template
-    # (misspelling, etc.)
-    nodetype=type(node).__name__
-    if nodetype == 'StrictUndefined':
-        raise GeneratorError(f'The template seems to call gen() with an unknown field name: node {node} is of type StrictUndefined. Please check!')
-        return ""
-
-    # Plain types -> print as-is
-    if isinstance(node, (str, int, float)):
-        return node
-
-    # Complex types -> use the corresponding template for the type
-    tpl = jinja_env.get_default_template_file(nodetype)
-    if tpl is None:
-        raise GeneratorError(f"gen() function called with node of type '{nodetype}' but no default template is defined for this type.")
-    else:
-        return jinja_env.get_template(tpl).render({'item' : node})
-
-#  Alternative functions, for unit testing
-
-# Instead of providing a template file, provide the template text itself
-# (for unit tests mostly).  See gen() for more comments/explanation.
+            # No explicit template -> use default for the node type
+            if template_file is None:
+                return self._gen_with_default_template(node)
+            elif type(template_file) == str:   # Explicit template file -> use it
+                return self._render(self.jinja_env.get_template(template_file), node)
+            else:
+                print(f'node is of type {type(node)}, second arg is of type {type(template_file)}  ({type(template_file).__class__}, {type(template_file).__class__.__name__})')
+                raise GeneratorError(f'Wrong use of gen() function! Usage: pass the node as first argument (you passed a {type(node)}), and optionally template name (str) as second argument. (You passed a {template_file.__name__})')
+
+    # gen helper function:
+    def _gen_with_default_template(self, node : Any):
+        template = self._default_template(node)
+        if isinstance(template, jinja2.Template):
+            return self._render(template, node)
+        return template
+
+    # Returns the default template for the node type, or the output directly if
+    # no template is needed (plain values, and nodes that are already rendered)
+    def _default_template(self, node : Any):
+
+        # None is for a field that exists in Namespace definition, but was not given
+        # a value in the YAML (=> happens only if it was an optional item).
+        if node is None:
+            # FIXME: This should be expected behavior and should return empty string,
+            # but let's first debug to see when it happens:
+            raise GeneratorError(f"_gen_type(): Unexpected 'None' node received")
+
+        # StrictUndefined is for an *unknown* field mentioned in the Jinja template
+        # (misspelling, etc.)
+        nodetype=type(node).__name__
+        if nodetype == 'StrictUndefined':
+            raise GeneratorError(f'The template seems to call gen() with an unknown field name: node {node} is of type StrictUndefined. Please check!')
+            return ""
+
+        # Plain types -> print as-is
+        if isinstance(node, (str, int, float)):
+            return node
+
+        # Already rendered by a worker, see gen_parallel()
+        if self.prerendered and id(node) in self.prerendered:
+            return self.prerendered[id(node)]
+
+        # Complex types -> use the corresponding template for the type
+        tpl = self.jinja_env.get_default_template_file(nodetype)
+        if tpl is None:
+            raise GeneratorError(f"gen() function called with node of type '{nodetype}' but no default template is defined for this type.")
+        else:
+            return self.jinja_env.get_template(tpl)
+
+    # ---------- STREAMING ------------
+
+    # stream() yields the output of gen() in chunks, as Jinja produces them
+    # (Template.generate()), so the output can be written while it is rendered.
+    # Templates are compiled so that {{ gen(x) }} streams the nested output too
+    # (see output_filters/templates/TemplateStreaming.py), so no complete text
+    # of the tree or of a subtree is built up, and large outputs can be written
+    # in bounded memory:
+    #
+    #     with open("out.xml", "w") as f:
+    #         generator.write(ast, f)
+    #
+    # ''.join(stream(node)) is always the same as gen(node).  Lists and plain
+    # values are output as str(gen(node)), like a template outputs them.
+
+    def stream(self, node : Any, template_file = None):
+        with self._run():
+            yield from self._stream(node, template_file)
+
+    def _stream(self, node : Any, template_file = None):
+        if node is None or isinstance(node, (list, tuple)):
+            yield str(self._gen(node, template_file))
+        elif template_file is None:
+            template = self._default_template(node)
+            if isinstance(template, jinja2.Template):
+                yield from self._generate(template, node)
+            else:
+                yield str(template)
+        elif type(template_file) == str:
+            yield from self._generate(self.jinja_env.get_template(template_file), node)
+        else:
+            # (Reports the wrong use)
+            yield str(self._gen(node, template_file))
+
+    def write(self, node : Any, out, template_file = None):
+        """Render node like gen() and write the output to the file object out (e.g. sys.stdout)"""
+        for chunk in self.stream(node, template_file):
+            out.write(chunk)
+
+    #  Alternative functions, for unit testing
+
+    # Instead of providing a template file, provide the template text itself
+    # (for unit tests mostly).  See gen() for more comments/explanation.
+    def gen_template_text(self, node: Any, template_text: str):
+       # Processing of lists of objects, see gen() for explanation
+       if isinstance(node, (list, tuple)):
+           return [self.gen_template_text(x, template_text) for x in node]
+       if template_text is None:
+           raise GeneratorError(f'gen_template_text called without template')
+       elif type(template_text) == str:
+           return self.jinja_env.render_template(template_text,{'item' : node})
+       else:
+           print(f'node is of type {type(node)}, second arg is of type {type(template_text)}  ({type(template_text).__class__}, {type(template_text).__class__.__name__})')
+           raise GeneratorError(f'Wrong use of gen() function! Usage: pass the node as first argument (you passed a {type(node)}), and optionally template name (str) as second argument. (You passed a {template_text.__name__})')
+
+    # Entry point for passing a dictionary of variables instead:
+    def gen_dict_with_template_file(self, variables : dict, templatefile):
+        return self.jinja_env.get_template(templatefile).render(variables)
+
+    # ---------- PARALLEL GENERATION ------------
+
+    # Independent subtrees (the top-level Namespaces, or all Interfaces) can be
+    # rendered concurrently in worker processes.  gen_parallel() renders each of
+    # them with its default template in a worker, and then runs the normal gen() on
+    # the root.  When a template calls gen() on one of the pre-rendered nodes it
+    # gets the finished text instead of rendering it again.  Since the serial pass
+    # still renders everything around those nodes in the usual order, the output is
+    # identical to calling gen() directly.  (The same idea as transform_parallel()
+    # in transformers/rule_translator.py)
+    #
+    # Notes:
+    # - Each worker creates its own Generator with the same template directory and
+    #   the same globals (everything passed to set_template_env()).  These must be
+    #   picklable, i.e. functions must be defined at module level.
+    # - The templates must not depend on state that is built up while rendering
+    #   other parts of the tree (such as add_namespace() in the D-Bus templates),
+    #   because each worker only renders its own subtrees.
+    # - If a subtree fails in a worker, it is simply rendered again in the serial
+    #   pass, so that any error is reported in the same way as with gen().
+
+    def gen_parallel(self, ast, jobs=None, split='namespaces'):
+        """Same as gen(ast), but the nodes selected by split (see split_nodes) are rendered in jobs worker
+        processes (default: number of CPUs)"""
+        nodes = split_nodes(ast, split)
+        if jobs == 1 or len(nodes) <= 1:
+            return self.gen(ast)
+        return ''.join(self.stream_parallel(ast, jobs, split))
+
+    def stream_parallel(self, ast, jobs=None, split='namespaces'):
+        """Same as stream(ast), with the nodes selected by split rendered in worker processes (see gen_parallel)"""
+        nodes = split_nodes(ast, split)
+        if jobs == 1 or len(nodes) <= 1:
+            yield from self.stream(ast)
+            return
+
+        template_globals = {k: v for k, v in self.jinja_env.exported.items() if k != 'gen'}
+        results = {}
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(ast, split, self.jinja_env.tpath, template_globals)) as executor:
+            futures = [(node, executor.submit(_gen_split_node, i)) for i, node in enumerate(nodes)]
+            for node, future in futures:
+                if future.exception() is None:
+                    results[id(node)] = future.result()
+
+        # Assemble the final result in this process
+        previous = self.prerendered
+        self.prerendered = results
+        try:
+            yield from self.stream(ast)
+        finally:
+            self.prerendered = previous
+
+
+SPLIT_LEVELS = ('namespaces', 'interfaces')
+
+def split_nodes(ast, split='namespaces'):
+    """Return the nodes that gen_parallel() renders in workers, in tree order"""
+    if split == 'namespaces':
+        return list(ast.namespaces)
+    elif split == 'interfaces':
+        from models.ifex.ifex_paths import PathIndex
+        return [n for n in PathIndex(ast).nodes.values() if isinstance(n, Interface)]
+    raise GeneratorError(f'Unknown split level {split!r}, expected one of {SPLIT_LEVELS}')
+
+# Worker process state: The generator, and the nodes to render in the order given by split_nodes()
+_worker_generator = None
+_worker_nodes = []
+
+def _init_worker(ast, split, template_dir, template_globals):
+    global _worker_generator, _worker_nodes
+    _worker_generator = Generator(template_dir, **template_globals)
+    _worker_nodes = split_nodes(ast, split)
+
+def _gen_split_node(index):
+    return _worker_generator._gen_with_default_template(_worker_nodes[index])
+
+# ---------- MODULE-LEVEL API ------------
+
+# Default generator, for code that uses the module-level functions.  (Some
+# callers re-initialize its environment with jinja_env.__init__(templatedir),
+# which keeps working because the generator uses the same jinja_env object.
+# New code should create its own Generator instead.)
+default_generator = Generator("simple")
+jinja_env = default_generator.jinja_env
+gen = default_generator.gen
+
 def gen_template_text(node: Any, template_text: str):
-   # Processing of lists of objects, see gen() for explanation
-   if type(node) == list or type(node) == tuple:
-       return [gen_template_text(x, template_text) for x in node]
-   if template_text is None:
-       raise GeneratorError(f'gen_template_text called without template')
-   elif type(template_text) == str:
-       return jinja_env.render_template(template_text,{'item' : node})
-   else:
-       print(f'node is of type {type(node)}, second arg is of type {type(template_text)}  ({type(template_text).__class__}, {type(template_text).__class__.__name__})')
-       raise GeneratorError(f'Wrong use of gen() function! Usage: pass the node as first argument (you passed a {type(node)}), and optionally template name (str) as second argument. (You passed a {template_text.__name__})')
-
-# Entry point for passing a dictionary of variables instead:
+    return default_generator.gen_template_text(node, template_text)
+
 def gen_dict_with_template_file(variables : dict, templatefile):
-    return get_template(templatefile).render(variables)
+    return default_generator.gen_dict_with_template_file(variables, templatefile)
+
+def gen_parallel(ast, jobs=None, split='namespaces'):
+    return default_generator.gen_parallel(ast, jobs, split)
 
-# Export the gen() function and classes into jinja template land
-# so that they can be referred to inside templates.
-jinja_env.set_template_env(gen=gen)
+def write(node: Any, out, template_file = None):
+    return default_generator.write(node, out, template_file)
 
 # ----------------------------------------------------------------
 # MAIN = Standalone test Code only, not normal use.
@@ -114,7 +389,5 @@ if __name__ == '__main__':
     yaml_file = sys.argv[1]
     template_dir = sys.argv[2]
     ast = get_ast_from_yaml_file(yaml_file)
-    # re-initialize jinja environment with the given template dir
-    jinja_env.__init__(template_dir)
-    jinja_env.set_template_env(gen=gen)
-    print(gen(ast))
+    Generator(template_dir).write(ast, sys.stdout)
+    print()
@@ -0,0 +1,313 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Incremental generation of output files
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Instead of one output for the whole tree, a generator can write several output
+# files, each rendered from one node (e.g. one file per interface).  While an
+# output is rendered, the generator records what it used:
+#
+# - The nodes that were rendered with a template (by gen()), by their path (see
+#   ifex_paths.py) and content hash.  The hash covers the complete subtree, so a
+#   node whose descendants were rendered as well is enough, and only the topmost
+#   such nodes are recorded.
+# - The templates that were used, and the templates they include, import or
+#   extend, by a checksum of their source.
+#
+# This is stored in a manifest (MANIFEST) in the output directory.  In the next
+# run, an output whose recorded nodes and templates are all unchanged (and whose
+# file still has the content that was written) is not rendered again.  Outputs
+# that are rendered are only written if their content changed, so the
+# modification time of unchanged files stays the same and build systems do not
+# rebuild anything that depends on them.
+#
+# An output is assumed to depend only on the nodes that it renders and on the
+# templates.  Template helpers that look at other parts of the tree (such as the
+# type lookup of the D-Bus generator) are not tracked.  An output that renders
+# a node that is not part of the tree is rendered in every run.
+#
+# The outputs are either one file per namespace or interface (split_outputs()),
+# or the files that the templates declare (declared_outputs()).  A template
+# declares that each node it is the default template for (by its file name, see
+# output_filters/templates/TemplateDir.py) is rendered to a file of its own,
+# with a comment that contains the file name as an inline template:
+#
+#     {# ifex:output {{ item.name }}.xml #}
+#
+# The file name is rendered with the node as item and its path as path.  A
+# directory can have several such templates for the same node type (for example
+# Interface-header.h and Interface-source.c), each gives one file per node.
+#
+# The outputs are rendered one after the other, since the templates share the
+# state of the generator, but the files are written by a pool of threads while
+# the next output is rendered.
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import is_dataclass
+from models.common.ast_utils import content_hash
+from models.ifex import ifex_ast
+from models.ifex.ifex_generator import GeneratorError, split_nodes
+from models.ifex.ifex_paths import PathIndex
+import hashlib
+import jinja2.meta
+import json
+import os
+import re
+
+MANIFEST = '.ifexgen.json'
+MANIFEST_VERSION = 1
+
+# (Matched against the marker comments of a template, see output_filters/templates/TemplateDir.py)
+OUTPUT_MARKER = re.compile(r'ifex:output\s+(.*)')
+
+# An output file:  The node is rendered with template (a template name, or None for the default template of the node)
+Output = namedtuple('Output', ['filename', 'node', 'template'])
+
+# Result of generate_files() for each output file
+SKIPPED = 'skipped'        # Dependencies unchanged, not rendered
+UNCHANGED = 'unchanged'    # Rendered, but the file already had that content
+WRITTEN = 'written'
+REMOVED = 'removed'        # Output of the last run that is not an output any more
+
+class Dependencies:
+    """Collects the nodes and templates that are used while one output is rendered (see Generator.dependencies)"""
+    def __init__(self):
+        self.nodes = {}
+        self.templates = set()
+
+    def used(self, template, node):
+        self.templates.add(template.name)
+        if is_dataclass(node) and not isinstance(node, type):
+            self.nodes[id(node)] = node
+
+def _checksum(data):
+    return hashlib.sha1(data).hexdigest()
+
+def topmost_paths(paths):
+    """Return the paths that are not below another of the given paths"""
+    kept = set()
+    for path in sorted(paths, key=len):
+        if '' in kept:
+            break
+        parts = path.split('/')
+        if not any('/'.join(parts[:i]) in kept for i in range(1, len(parts))):
+            kept.add(path)
+    return kept
+
+class _TemplateSums:
+    """Checksums of the templates of a generator, including the templates that each one refers to"""
+
+    def __init__(self, generator):
+        self.env = generator.jinja_env.jinja_env
+        self.tpath = generator.jinja_env.tpath
+        self.sums = {}
+        self.references = {}
+
+    def checksum(self, name):
+        if name not in self.sums:
+            try:
+                with open(os.path.join(self.tpath, name), 'rb') as f:
+                    source = f.read()
+                self.sums[name] = _checksum(source)
+                self.references[name] = set(jinja2.meta.find_referenced_templates(self.env.parse(source.decode())))
+            except (OSError, UnicodeDecodeError, jinja2.TemplateSyntaxError):
+                self.sums[name] = None
+                self.references[name] = set()
+        return self.sums[name]
+
+    def closure(self, names):
+        """Return name -> checksum for the given templates and all templates that they refer to"""
+        result = {}
+        todo = list(names)
+        while todo:
+            name = todo.pop()
+            if name in result:
+                continue
+            result[name] = self.checksum(name)
+            for ref in self.references[name]:
+                if ref is None:
+                    # Name computed at runtime: Could be any template
+                    todo.extend(n for n in self.env.list_templates() if not n.startswith('__'))
+                else:
+                    todo.append(ref)
+        return result
+
+class OutputDirectory:
+    """The output files in a directory, with the manifest of their dependencies from the previous run"""
+
+    def __init__(self, directory, template_dir):
+        self.directory = directory
+        self.template_dir = template_dir
+        self.outputs = {}
+        try:
+            with open(os.path.join(directory, MANIFEST), 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION and manifest.get('template_dir') == template_dir:
+                self.outputs = manifest['outputs']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def read(self, filename):
+        try:
+            with open(self.path(filename), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def write(self, filename, data):
+        """Write data to the file unless it already has that content.  Returns True if the file was written."""
+        if self.read(filename) == data:
+            return False
+        path = self.path(filename)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return True
+
+    def remove(self, filename):
+        try:
+            os.remove(self.path(filename))
+        except FileNotFoundError:
+            pass
+
+    def save(self, outputs):
+        self.outputs = outputs
+        manifest = {'version': MANIFEST_VERSION, 'template_dir': self.template_dir, 'outputs': outputs}
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.path(MANIFEST + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path(MANIFEST))
+
+def _is_up_to_date(entry, data, index, hashes, templates):
+    if entry is None or entry.get('untracked') or data is None or _checksum(data) != entry['content']:
+        return False
+    for path, digest in entry['nodes'].items():
+        node = index.get(path)
+        if node is None or hashes.get(id(node), b'').hex() != digest:
+            return False
+    return all(templates.checksum(name) == checksum for name, checksum in entry['templates'].items())
+
+def encode_output(text):
+    # An output file has the same content as the output of ifexgen on stdout
+    return (text + "\n").encode()
+
+def generate_files(generator, ast, outputs, directory, workers=None):
+    """Render the outputs (a list of Output) of ast into directory, except the ones whose dependencies did not change
+    since the last run.  The files are written by up to workers threads (default: see ThreadPoolExecutor).  Files of
+    the last run that are not in outputs are removed.  Returns filename -> SKIPPED, UNCHANGED, WRITTEN or REMOVED."""
+    out_dir = OutputDirectory(directory, generator.jinja_env.tpath)
+    index = PathIndex(ast)
+    hashes = {}
+    content_hash(ast, hashes)
+    templates = _TemplateSums(generator)
+
+    results = {}
+    manifest = {}
+    writes = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for output in outputs:
+            entry = out_dir.outputs.get(output.filename)
+            if _is_up_to_date(entry, out_dir.read(output.filename), index, hashes, templates):
+                results[output.filename] = SKIPPED
+                manifest[output.filename] = entry
+                continue
+
+            dependencies = Dependencies()
+            previous = generator.dependencies
+            generator.dependencies = dependencies
+            try:
+                data = encode_output(generator.gen(output.node, output.template))
+            finally:
+                generator.dependencies = previous
+
+            writes[output.filename] = executor.submit(out_dir.write, output.filename, data)
+            paths = {index.paths.get(i) for i in dependencies.nodes}
+            manifest[output.filename] = {
+                'content': _checksum(data),
+                'nodes': {path: hashes[id(index.nodes[path])].hex() for path in topmost_paths(paths - {None})},
+                'templates': templates.closure(dependencies.templates),
+                'untracked': None in paths,
+            }
+        for filename in out_dir.outputs.keys() - manifest.keys():
+            writes[filename] = executor.submit(out_dir.remove, filename)
+
+    # (Raises the first error of a write, if any)
+    for filename, write in writes.items():
+        if filename in manifest:
+            results[filename] = WRITTEN if write.result() else UNCHANGED
+        else:
+            write.result()
+            results[filename] = REMOVED
+    out_dir.save(manifest)
+    return results
+
+def split_outputs(generator, ast, split='namespaces'):
+    """One Output for each node selected by split (see ifex_generator.split_nodes), rendered with its default
+    template.  The file is named after the node path, with the extension of the template (ns.Interface.html)"""
+    index = PathIndex(ast)
+    outputs = []
+    for node in split_nodes(ast, split):
+        template = generator.jinja_env.get_default_template_file(type(node).__name__)
+        if template is None:
+            raise GeneratorError(f"Cannot write one file per {type(node).__name__} ({split}), since the template "
+                                 f"directory has no default template for {type(node).__name__}")
+        outputs.append(Output(index.path_of(node).replace('/', '.') + os.path.splitext(template)[1], node, None))
+    return outputs
+
+def _node_type(template_name, type_names):
+    # The node type is the longest type name that the file name starts with, as for default templates
+    filename = os.path.basename(template_name)
+    matches = [n for n in type_names if filename.startswith(n)]
+    return max(matches, key=len) if matches else None
+
+def output_templates(generator):
+    """Return (template name, node type name, file name template) for each template of the generator that declares
+    an output file (see OUTPUT_MARKER)"""
+    type_names = ifex_ast.get_ast_node_type_names()
+    result = []
+    for name in sorted(generator.jinja_env.jinja_env.list_templates()):
+        if name.startswith('__'):
+            continue
+        matches = [OUTPUT_MARKER.fullmatch(m) for m in generator.jinja_env.template_markers(name)]
+        match = next((m for m in matches if m is not None), None)
+        if match is None:
+            continue
+        node_type = _node_type(name, type_names)
+        if node_type is None:
+            raise GeneratorError(f"Template {name} declares an output file, but its name does not start with a node type")
+        result.append((name, node_type, match.group(1)))
+    return result
+
+def declared_outputs(generator, ast):
+    """One Output for each node of ast and each template that declares an output file for the type of the node.
+    Returns an empty list if no template declares one."""
+    declared = output_templates(generator)
+    if not declared:
+        return []
+    index = PathIndex(ast)
+    outputs = []
+    filenames = {MANIFEST: None}
+    for path, node in sorted(index.nodes.items()):
+        for template, node_type, filename_template in declared:
+            if type(node).__name__ != node_type:
+                continue
+            filename = generator.jinja_env.render_template(filename_template, {'item': node, 'path': path}).strip()
+            normalized = os.path.normpath(filename) if filename else ''
+            if normalized in ('', '.') or os.path.isabs(normalized) or normalized.split(os.sep)[0] == '..':
+                raise GeneratorError(f"Template {template} gives the file name {filename!r} for {path!r}, "
+                                     f"which is not a file in the output directory")
+            if normalized in filenames:
+                raise GeneratorError(f"Template {template} gives the file name {filename!r} for {path!r}, "
+                                     f"which is already the output of {filenames[normalized]!r}")
+            filenames[normalized] = path
+            outputs.append(Output(normalized, node, template))
+    return outputs
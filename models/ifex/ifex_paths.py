@@ -0,0 +1,154 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Node paths - addressing nodes in an IFEX tree by name
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# A path addresses a node by the names that lead to it from the root (AST) node, for example:
+#
+#     seats/Seating/methods/move
+#
+# - Namespaces (in AST.namespaces or Namespace.namespaces) and the Interface of a Namespace are given by their
+#   name only.  These are the levels that make up the "scope" of the items below them.
+# - Items in all other lists are given by the list (field) name, followed by the item's name:  methods/move
+# - An item that has no name (e.g. Include, or an Error without name) is given by its position in the list,
+#   counting from zero:  errors/0
+# - The root node has the empty path ''
+#
+# Since the same logical node has the same path in every file (core IDL, overlays, other layers), paths can be used
+# to refer to "the same" node across trees.
+
+from dataclasses import fields, is_dataclass
+from models.common.ast_utils import field_referenced_type, is_ast_class, is_forwardref
+
+# Fields whose items are addressed by name only
+IMPLICIT_FIELDS = ('namespaces', 'interface')
+
+def join_path(parent_path, segment):
+    return segment if parent_path == '' else f"{parent_path}/{segment}"
+
+def child_segment(field_name, item, index=None):
+    """Return the path segment of item, stored in field field_name (at position index, if the field is a list)"""
+    name = getattr(item, 'name', None)
+    if index is None:
+        return name if field_name in IMPLICIT_FIELDS and name is not None else field_name
+    key = str(index) if name is None else name
+    return key if field_name in IMPLICIT_FIELDS else f"{field_name}/{key}"
+
+def child_nodes(node):
+    """Yield (path segment, child node) for each direct child node of node, in field order"""
+    for f in fields(node):
+        value = getattr(node, f.name)
+        if isinstance(value, list):
+            for i, item in enumerate(value):
+                if is_dataclass(item):
+                    yield child_segment(f.name, item, i), item
+        elif is_dataclass(value):
+            yield child_segment(f.name, value), value
+
+def walk_path(root, path):
+    """Return the list of nodes along path, starting with root and ending with the addressed node.
+    Returns None if the path does not exist in the tree."""
+    nodes = [root]
+    rest = path
+    while rest != '':
+        for segment, child in child_nodes(nodes[-1]):
+            if rest == segment or rest.startswith(segment + '/'):
+                nodes.append(child)
+                rest = rest[len(segment) + 1:]
+                break
+        else:
+            return None
+    return nodes
+
+def find_by_path(root, path):
+    """Return the node at path, or None if it does not exist"""
+    nodes = walk_path(root, path)
+    return nodes[-1] if nodes is not None else None
+
+
+# Path index:
+#
+# walk_path() and find_by_path() search the lists on each level, which is fine for a single lookup.  Code that looks
+# up many nodes (for example all paths that a layer refers to, or the same node in several models) should build a
+# PathIndex once instead.  It walks the tree in one pass and records:
+#
+# - nodes:   path -> node
+# - paths:   id(node) -> path
+# - parents: id(node) -> parent node (None for the root)
+#
+# The index keeps references to all nodes, so the ids stay valid while the index exists.  It describes the tree as it
+# was when the index was built, so it must be rebuilt if the tree is modified.  (Trees returned by the merge functions
+# with freeze=True can not be modified, see ast_utils.freeze)
+
+_child_fields = {}  # Class -> names of the fields that can contain child nodes
+
+def child_node_fields(cls):
+    """Return the names of the fields of an AST class that can contain child nodes (e.g. methods, input, interface)"""
+    names = _child_fields.get(cls)
+    if names is None:
+        names = tuple(f.name for f in fields(cls)
+                      if is_forwardref(field_referenced_type(f)) or is_ast_class(field_referenced_type(f)))
+        _child_fields[cls] = names
+    return names
+
+class PathIndex:
+    def __init__(self, root):
+        self.root = root
+        self.nodes = {'': root}
+        self.paths = {id(root): ''}
+        self.parents = {id(root): None}
+
+        # Iterative, depth-first, so that deep trees do not hit the recursion limit
+        stack = [(root, '')]
+        while stack:
+            node, path = stack.pop()
+            for field_name in child_node_fields(type(node)):
+                value = getattr(node, field_name)
+                if isinstance(value, list):
+                    items = enumerate(value)
+                elif value is not None:
+                    items = [(None, value)]
+                else:
+                    continue
+                for index, child in items:
+                    segment = child_segment(field_name, child, index)
+                    child_path = segment if path == '' else f"{path}/{segment}"
+                    # If a list contains the same name twice (not valid, but possible), the first one is indexed
+                    if child_path not in self.nodes:
+                        self.nodes[child_path] = child
+                    self.paths[id(child)] = child_path
+                    self.parents[id(child)] = node
+                    stack.append((child, child_path))
+
+    def __getitem__(self, path):
+        return self.nodes[path]
+
+    def __contains__(self, path):
+        return path in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get(self, path, default=None):
+        return self.nodes.get(path, default)
+
+    def path_of(self, node):
+        """Return the path of node, which must be a node in the indexed tree"""
+        return self.paths[id(node)]
+
+    def parent(self, node):
+        """Return the parent node of node (None for the root)"""
+        return self.parents[id(node)]
+
+    def ancestors(self, path):
+        """Return the list of nodes along path, like walk_path(), or None if the path does not exist"""
+        node = self.nodes.get(path)
+        if node is None:
+            return None
+        nodes = [node]
+        while nodes[-1] is not self.root:
+            nodes.append(self.parents[id(nodes[-1])])
+        nodes.reverse()
+        return nodes
@@ -5,67 +5,95 @@
 # Custom generator for D-Bus XML format
 # ----------------------------------------------------------------------------
 
-from models.ifex.ifex_generator import jinja_env, gen
+from models.ifex.ifex_generator import Generator
 from models.ifex.ifex_parser import get_ast_from_yaml_file
 from models.DBus import dbus_types
 import lxml.etree as etree
 import sys
 
-# Collect up namespaces in hierarchy
-namespace_path = ""
+# The helper functions that the D-Bus templates call build up some state while
+# the tree is rendered (the namespace path, the error counter and the cached
+# type signatures), so each generation run uses its own DBusGenerator instance.
+class DBusGenerator(Generator):
+    def __init__(self, template_dir="D-Bus"):
+        super().__init__(template_dir)
 
+        # Collect up namespaces in hierarchy
+        self.namespace_path = ""
 
-def add_namespace(ns):
-    global namespace_path
-    if namespace_path != "":
-        namespace_path += "."
-    namespace_path += ns.name
-    # Must return empty string since it's called from generation template!
-    # Otherwise, the return value "None" will be printed to output
-    return ""
+        # Errors need to be given a name if they don't have one
+        self.counter = 0
 
+        # Type definitions of this run, see collect_types()
+        self.types = dbus_types.SignatureResolver()
 
-# Construct the interface name from the Namespace hierarchy
-def get_interface_name(if_name):
-    global namespace_path
-    return f"{namespace_path}.{if_name}"
+        self.set_template_env(
+            gen_dbus_type=self.types.signature,
+            add_namespace=self.add_namespace,
+            get_interface_name=self.get_interface_name,
+            gen_error_name=self.gen_error_name,
+        )
 
+    # Must be called with all trees that define types which the generated
+    # interfaces refer to, before generating
+    def collect_types(self, node):
+        self.types.collect(node)
 
-# Errors need to be given a name if they don't have one
-counter = 0
+    def add_namespace(self, ns):
+        if self.namespace_path != "":
+            self.namespace_path += "."
+        self.namespace_path += ns.name
+        # Must return empty string since it's called from generation template!
+        # Otherwise, the return value "None" will be printed to output
+        return ""
 
+    # Construct the interface name from the Namespace hierarchy
+    def get_interface_name(self, if_name):
+        return f"{self.namespace_path}.{if_name}"
 
-def gen_error_name(err):
-    global counter
-    if err.name is None:
-        counter += 1
-        return "error" + str(counter)
-    else:
-        return err.name
+    def gen_error_name(self, err):
+        if err.name is None:
+            self.counter += 1
+            return "error" + str(self.counter)
+        else:
+            return err.name
 
 
-def main_generate(yaml_file):
-    template_dir = "D-Bus"
-    ast = get_ast_from_yaml_file(yaml_file)
-    # re-initialize jinja environment with the given template dir
-    jinja_env.__init__(template_dir)
-    jinja_env.set_template_env(
-        gen=gen,
-        gen_dbus_type=dbus_types.gen_dbus_type,
-        add_namespace=add_namespace,
-        get_interface_name=get_interface_name,
-        gen_error_name=gen_error_name,
-    )
-    dbus_types.collect_types(ast.namespaces)
-    raw_xml=gen(ast)
-
-    # OMG this is complicated to get a decent XML output!
+# The templates write indented XML directly (see AST.tpl), so the output can be
+# streamed to a file as it is rendered.  With normalize=True, the output is also
+# parsed and pretty-printed again with lxml, as all output was before.  That
+# checks that it is well-formed XML (lxml raises an error otherwise), at the
+# cost of holding the whole document in memory several times.
+
+def _prepare(ast):
+    generator = DBusGenerator()
+    generator.collect_types(ast.namespaces)
+    return generator
+
+def normalize_xml(raw_xml):
     # You MUST ask to remove any spaces in input, otherwise the parser believes
     # they are significant (like in HTML) and will not reindent the XML.
     parser = etree.XMLParser(remove_blank_text=True)
-    print(etree.tostring(etree.fromstring(raw_xml, parser), pretty_print=True).decode("utf-8"))
+    return etree.tostring(etree.fromstring(raw_xml, parser), pretty_print=True).decode("utf-8")
+
+def generate(ast, normalize=False):
+    """Return the D-Bus XML for ast (pretty-printed)"""
+    raw_xml = _prepare(ast).gen(ast)
+    return normalize_xml(raw_xml) if normalize else raw_xml
+
+def write(ast, out, normalize=False):
+    """Write the D-Bus XML for ast to the file object out"""
+    if normalize:
+        out.write(generate(ast, normalize=True))
+    else:
+        _prepare(ast).write(ast, out)
+
+def main_generate(yaml_file, normalize=False):
+    ast = get_ast_from_yaml_file(yaml_file)
+    write(ast, sys.stdout, normalize)
+    print()
 
 # ----------------------------------------------------------------
 # MAIN = Standalone test Code only, not normal use.
 if __name__ == "__main__":
-    main_generate(sys.argv[1])
+    main_generate(sys.argv[1], normalize='--normalize' in sys.argv[2:])
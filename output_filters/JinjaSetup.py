@@ -1,9 +1,11 @@
 # SPDX-FileCopyrightText: Copyright (c) 2025 MBition GmbH.
 # SPDX-License-Identifier: MPL-2.0
 
+import functools
 import jinja2
 import os
 from models.ifex import ifex_ast_doc
+from output_filters.templates import TemplateCache, TemplateCompiler, TemplateDir
 from typing import Dict, Any
 
 # Exception:
@@ -11,54 +13,28 @@ class GeneratorError(BaseException):
     def __init__(self, m):
         self.msg = m
 
+# Node classes of an AST model, collected once per root class
+@functools.lru_cache(maxsize=None)
+def _ast_class_names(root_ast_class):
+    names = set()
+    # Reuse walk_type_tree() from documentation generator, which gives us each of the
+    # node classes in the ifex AST definition.  More correctly, its like the
+    # visitor pattern, so the function we provide will be called once for each
+    # found class.  Reusing type_name() from ifex_ast_doc takes care of
+    # ForwardRef type correctly.
+    ifex_ast_doc.walk_type_tree(root_ast_class, lambda x : names.add(ifex_ast_doc.type_name(x)), {})
+    return frozenset(names)
+
 class TemplateFinder:
     def __init__(self, name):
         self.classes_list = None
 
-    # collector: Small helper that grabs each output from the walk
-    # function, and in the process converting each class object to its
-    # name string Reusing type_name() from ifex_ast_doc takes care of
-    # ForwardRef type correctly.
-
-    # Create a closure around the classes_list variable
-    def create_collector(self):
-        self.classes_list = set() # Reset
-        return lambda x : self.classes_list.add(ifex_ast_doc.type_name(x))
-
-    def reset_collector(self):
-        self.classes_list = set()
-
     def find_matching_template_files(self, directory : str, root_ast_class, recurse = False, absolute = False):
         """Search in given directory to find any files that match (start with) any of the given class names.
         Return a dict that maps each class name to its corresponding template file name.
         If there is more than one matching file, the last found one will remain in result."""
-        # Reuse walk_type_tree() from documentation generator, which gives us each of the
-        # node classes in the ifex AST definition.  More correctly, its like the
-        # visitor pattern, so the function we provide (collector) will be called once
-        # for each found class.
-
-        collector = self.create_collector()
-        ifex_ast_doc.walk_type_tree(root_ast_class, collector, {})
-
-        # Now all classes are collected in the classes_list variable
-        classes = self.classes_list
-
-        templates = {}  # Dict maps node name to the template file name
-        if recurse:
-            for _,_,filenames in os.walk(directory):
-                for ff in filenames:
-                    for n in classes:
-                        if ff.startswith(n + '.'):
-                            templates[n] = os.path.join(root, ff)
-        else: # non recursive
-            for ff in os.listdir(directory):
-                for n in classes:
-                    if ff.startswith(n + '.'):
-                        if absolute:
-                            templates[n] = os.path.join(directory, ff)
-                        else:
-                            templates[n] = ff
-        return templates
+        self.classes_list = _ast_class_names(root_ast_class)
+        return TemplateDir.match_template_files(directory, self.classes_list, '.', recurse, absolute)
 
 
 # A class to hold our Jinja environment, as well as the table of default
@@ -68,17 +44,23 @@ class JinjaTemplateEnv:
     default_templates = {}
     jinja_env = None
 
-    def __init__(self, root_node, template_dir_abs):
+    # bytecode_cache: See TemplateCache.bytecode_cache()
+    # compiled: See TemplateCompiler.template_loader()
+    def __init__(self, root_node, template_dir_abs, bytecode_cache=None, compiled=None):
         tpath = template_dir_abs
 
         # Set up Jinja
         self.jinja_env = jinja2.Environment(
                 # Use the subdirectory 'templates' relative to this file's location
-                loader=jinja2.FileSystemLoader(tpath),
+                # (or the precompiled templates in it, if there are any)
+                loader=TemplateCompiler.template_loader(tpath, compiled),
 
                 # Templates with these extension gets automatic auto escape for HTML
                 # It's more annoying for code generation, so passing empty list for now.
-                autoescape=jinja2.select_autoescape([])
+                autoescape=jinja2.select_autoescape([]),
+
+                # Compiled templates are kept on disk between runs
+                bytecode_cache=TemplateCache.bytecode_cache(bytecode_cache)
                 )
 
         # We want the control blocks in the template to NOT result in any extra
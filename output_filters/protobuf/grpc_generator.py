@@ -6,6 +6,7 @@ import os
 import sys
 from models.protobuf import protobuf_ast, protobuf_lark
 from output_filters import JinjaSetup
+from output_filters.templates import TemplateCompiler
 from input_filters.protobuf import protobuf_to_ifex
 
 def gen_str_or_int(item):
@@ -14,15 +15,18 @@ def gen_str_or_int(item):
     else:
         return '"' + item + '"'  # Quoted string
 
+# Template directory, templates/ relative to this file location
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "templates")
+
 def proto_to_text(proto_ast: protobuf_ast.Proto) -> str:
-    template_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "templates")
-    return ast_to_text(proto_ast, template_dir)
+    return ast_to_text(proto_ast, TEMPLATE_DIR)
 
 
-def ast_to_text(proto_ast: protobuf_ast.Proto, template_dir) -> str:
+# compiled: See TemplateCompiler.template_loader()
+def ast_to_text(proto_ast: protobuf_ast.Proto, template_dir, compiled=None) -> str:
     # Set up Jinja environment - collect templates that match the names of the
     # Proto AST classes (recursive search through AST types).
-    jinja_setup = JinjaSetup.JinjaTemplateEnv(protobuf_ast.Proto, template_dir)
+    jinja_setup = JinjaSetup.JinjaTemplateEnv(protobuf_ast.Proto, template_dir, compiled=compiled)
 
     # Reuse the protobuf-parser function in protobuf_to_ifex
     path = os.path.dirname(protobuf_to_ifex.__file__)
@@ -38,6 +42,13 @@ def ast_to_text(proto_ast: protobuf_ast.Proto, template_dir) -> str:
     return gen(proto_ast).rstrip() + "\n"
 
 
+def compile_templates(template_dir=TEMPLATE_DIR, target=None):
+    """Compile the templates ahead of time (see TemplateCompiler), with the same environment that ast_to_text()
+    loads them with.  Returns the names of the compiled templates."""
+    env = JinjaSetup.JinjaTemplateEnv(protobuf_ast.Proto, template_dir, bytecode_cache=False, compiled=False).jinja_env
+    return TemplateCompiler.compile_template_dir(template_dir, target, env)
+
+
 # This parses a Protobuf/gRPC file and then prints it back out again.  
 # Text -> Protobuf Parser -> Protobuf AST -> to text via Jinja templates
 if __name__ == '__main__':
@@ -49,18 +60,22 @@ if __name__ == '__main__':
         """
 
     parser.add_argument("protofile", help="Input file.", nargs="?")
+    parser.add_argument("--compile-templates", action="store_true",
+                        help="Compile the templates ahead of time, into templates/__compiled__, and exit.")
     args = parser.parse_args()
 
+    if args.compile_templates:
+        names = compile_templates()
+        print(f"{TemplateCompiler.compiled_dir(TEMPLATE_DIR)}: {len(names)} templates")
+        sys.exit(0)
+
     if args.protofile is None:
         parser.print_help()
         sys.exit(1)
 
-    # Get template directory which is templates/ relative to this file location
-    template_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "templates")
-
     # Parse the given input file (gRPC/proto format expected)
     proto_ast = protobuf_lark.get_ast_from_proto_file(args.protofile)
 
     # Print out the AST as text
-    print(ast_to_text(proto_ast, template_dir))
+    print(ast_to_text(proto_ast, TEMPLATE_DIR))
 
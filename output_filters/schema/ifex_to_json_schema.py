@@ -19,6 +19,7 @@ from models.common.ast_utils import actual_type, field_actual_type, field_inner_
 from models.common.ast_utils import is_simple_type
 from models.ifex.ifex_ast import AST
 from typing import Any
+import copy
 import json
 
 # =======================================================================
@@ -50,8 +51,9 @@ def get_type_name(t):
 # JSON SCHEMA OUTPUT
 # =======================================================================
 
-# Here are print-functions for the main object type variations in the JSON
-# schema such as a single object, or an array of objects.
+# Here are functions for the main object type variations in the JSON schema
+# such as a single object, or an array of objects.  Each one returns the
+# schema fragment as a dict.
 
 # Special case for "Any" (used with Option values). For now we allow it to be
 # either an integer or a string when checking against a schema.  Many languages
@@ -60,79 +62,77 @@ def get_type_name(t):
 # However, in YAML it seems, for now, only realistic to allow specifying
 # constant values as either numbers and strings.
 
-def print_field(field_name, type_name, is_primitive=False, description=None):
+ANY_SCHEMA = { "anyOf": [ { "type": "integer" }, { "type": "string" } ] }
+
+def field_schema(type_name, is_primitive=False, description=None):
     if type_name == 'Any':
         # For now, considered to be *either* a number or string.
-        print(f'"{field_name}" : {{ "anyOf": [\n {{ "type": "integer" }},\n {{ "type": "string" }}\n]\n', end="")
+        schema = copy.deepcopy(ANY_SCHEMA)
     elif is_primitive:
-        print(f'"{field_name}" : {{ "type": "{type_name}"\n', end="")
+        schema = { "type": type_name }
     else:  # complex/object type
-        print(f'"{field_name}" : {{ "type": "object",\n"$ref": "#/definitions/{type_name}"\n', end="")
+        schema = { "type": "object", "$ref": f"#/definitions/{type_name}" }
     if description:
-        print(f', "description": "{description}"')
-    print('}')
+        schema["description"] = description
+    return schema
 
-def print_array_field(field_name, type_name, is_primitive=False, description=None):
+def array_field_schema(type_name, is_primitive=False, description=None):
     if type_name == 'Any':
-        print(f'"{field_name}" : {{ "type": "array", "items": {{ "anyOf": [\n {{ "type": "integer" }},\n {{ "type": "string"}}\n]\n}}', end="")
+        items = copy.deepcopy(ANY_SCHEMA)
     elif is_primitive:
-        print(f'"{field_name}" : {{ "type": "array", "items": {{ "type": "{type_name}" }}')
+        items = { "type": type_name }
     else:
-        print(f'"{field_name}" : {{ "type": "array", "items": {{ "$ref": "#/definitions/{type_name}" }}')
+        items = { "$ref": f"#/definitions/{type_name}" }
+    schema = { "type": "array", "items": items }
     if description:
-        print(f', "description": "{description}"') 
-    print('}')
+        schema["description"] = description
+    return schema
 
-def print_type(t, fields):
-    print(f'"{t}": {{ "type": "object", "properties": {{')
-    for n, (field_name, field_type, is_array, _) in enumerate(fields):
-        # FIXME add description to print_field
+def type_schema(fields):
+    properties = {}
+    for field_name, field_type, is_array, _ in fields:
+        # FIXME add description to field_schema
         is_primitive = (get_type_name(field_type) in ["string", "integer"])
         if is_array:
-            print_array_field(field_name, get_type_name(field_type), is_primitive)
+            properties[field_name] = array_field_schema(get_type_name(field_type), is_primitive)
         else:
-            print_field(field_name, get_type_name(field_type), is_primitive)
-        # Skipping last comma - is there a better idiom for this?  Probably.
-        if n != len(fields)-1:
-            print(',')
-    print('},')
-
-    # Same loop for the "required" field
-    print(f'"required" : [')
-    for n, (field_name, field_type, is_array, is_required) in enumerate(fields):
-        if is_required:
-            # Comma, if there were any previous ones
-            if n != 0:
-                print(',')
-            print(f'"{field_name}"', end="")
-
-    print(f'],')
-    print('"additionalProperties" : false') 
+            properties[field_name] = field_schema(get_type_name(field_type), is_primitive)
+    return { "type": "object",
+             "properties": properties,
+             "required": [field_name for field_name, _, _, is_required in fields if is_required],
+             "additionalProperties": False }
 
 # =======================================================================
 # Model traversal
 # =======================================================================
 
-def collect_type_info(t, collection={}, seen={}):
+def collect_type_info(t, collection=None, seen=None):
     """This is the main recursive function that loops through tree and collects
-       information about its structure which is later used to output the schema:"""
+       information about its structure which is later used to output the schema:
+       type name -> list of (field_name, field_type, is_list, is_required).
+       Returns the collection (a new dict, unless one is passed in)"""
+
+    if collection is None:
+        collection = {}
+    if seen is None:
+        seen = {}
 
     # We don't need to gather information about primitive types because they
     # will not have any member fields below them.
     if is_simple_type(t) or t is Any:
-        return
+        return collection
 
     # ForwardRef will fail if we try to recurse over its children.  However,
     # the types that are handled with ForwardRef (Namespace) ought to appear
     # anyhow *somewhere else* in the tree as a real type -> so we can skip it.
     if is_forwardref(t):
-        return
+        return collection
 
     # Also skip types we have already seen because the tree search will
     # encounter duplicates
     typename = type_name(t)
     if seen.get(typename):
-        return
+        return collection
 
     seen[typename] = True
 
@@ -152,34 +152,44 @@ def collect_type_info(t, collection={}, seen={}):
         # Self recursion on the type of each found member field
         collect_type_info(field_type, collection, seen)
 
+    return collection
+
 
 # =======================================================================
-# MAIN PROGRAM
+# Schema generation
 # =======================================================================
 
-if __name__ == "__main__":
-
-    # First, collect info
-    types={}
-    collect_type_info(AST, types)
-
-    # Then print JSON-schema
-    print('''{
+SCHEMA_HEADER = {
     "$schema": "https://json-schema.org/draft/2020-12/schema",
     "title": "IFEX Core IDL (YAML format), version: TAG-PLACEHOLDER",
     "description": "This file can be used to validate IFEX Core IDL files, which are normally written in YAML, not JSON.  The schema is not the source-of-truth but an artifact generated from the source-of-truth, so it should be consistent",
     "type": "object",
-    "allOf": [ { "$ref": "#/definitions/AST" } ],
-    "definitions": {
-    ''')
-
-    items=types.items()
-    for n, (typ,fields) in enumerate(items):
-        print_type(typ, fields)
-        # print comma, but not on last item
-        if n != len(items)-1:
-            print('},')
-        else:
-            print('}')
-    print('}\n}')
+}
+
+def generate_json_schema(root_type=AST):
+    """Return the JSON schema for the model that root_type is the root node of, as a dict"""
+    schema = copy.deepcopy(SCHEMA_HEADER)
+    schema["allOf"] = [ { "$ref": f"#/definitions/{type_name(root_type)}" } ]
+    schema["definitions"] = { typ: type_schema(fields) for typ, fields in collect_type_info(root_type).items() }
+    return schema
+
+# Generating the schema means walking all the type definitions, so the result
+# is kept per root type.  The key is the class object itself: the schema is
+# built from the classes as they were imported, and a reloaded model module
+# (e.g. while developing the language) has new classes, and so a new schema.
+_schemas = {}
+
+def get_json_schema(root_type=AST):
+    """Return the JSON schema for root_type (see generate_json_schema), from the cache if possible.
+       The returned dict is shared between callers and must not be modified."""
+    schema = _schemas.get(root_type)
+    if schema is None:
+        schema = _schemas[root_type] = generate_json_schema(root_type)
+    return schema
+
+# =======================================================================
+# MAIN PROGRAM
+# =======================================================================
 
+if __name__ == "__main__":
+    print(json.dumps(get_json_schema(), indent=2))
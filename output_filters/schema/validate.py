@@ -14,60 +14,120 @@
 from pathlib import Path
 import json
 import jsonschema
+import os
 import sys
 import yaml
 
+# Validators are expensive to create: The schema file must be read and parsed, and the schema itself is checked
+# against its meta-schema.  Therefore one validator per schema file is created and kept, and it is only rebuilt if the
+# schema file is modified (the cache is keyed by the absolute path, and checks the modification time).
+_validators = {}  # Absolute schema path -> (mtime_ns, validator)
 
-def schema_check(input_file, schema_file, quiet = True):
+def get_validator(schema_file):
+    """Return a (cached) validator for the given JSON-schema file"""
+    path = os.path.abspath(schema_file)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _validators.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
 
-    if quiet:
-        _print = lambda *args, **kwargs : None
-    else:
-        _print = print
+    # Load JSON-schema from file
+    with open(path, 'r') as file:
+        schema_data = json.load(file)
 
-    suffix = Path(input_file).suffix
+    # The schema's $schema decides the draft, and the IFEX schemas are written for draft 2020-12
+    cls = jsonschema.validators.validator_for(schema_data, default=jsonschema.Draft202012Validator)
+    cls.check_schema(schema_data)
+    validator = cls(schema_data)
+    _validators[path] = (mtime, validator)
+    return validator
 
+def load_input(input_file):
+    """Load a JSON or YAML input file"""
     # This is a special case to handle also JSON inputs, even if YAML is preferred in most cases
-    if suffix == '.json':
-       _print("Loading input as JSON")
-       load_function=json.load
     # .yaml or .ifex is preferred, but we assume YAML also if unknown:
-    else:
-       _print("Loading input as YAML")
-       load_function=yaml.safe_load
+    # (The C implementation of the YAML loader is used if PyYAML was built with it, it is many times faster)
+    load_function = json.load if Path(input_file).suffix == '.json' else \
+                    lambda file: yaml.load(file, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
 
     # Load input data from file
     with open(input_file, 'r') as file:
-        input_data = load_function(file)
+        return load_function(file)
 
-    # Load JSON-schema from file
-    with open(schema_file, 'r') as file:
-        schema_data = json.load(file)
+def find_error(input_data, schema_file):
+    """Return the most relevant ValidationError of input_data (same as jsonschema.validate reports), or None"""
+    return jsonschema.exceptions.best_match(get_validator(schema_file).iter_errors(input_data))
+
+def is_valid(input_data, schema_file):
+    """Check already loaded input data against a schema, without reporting anything"""
+    return get_validator(schema_file).is_valid(input_data)
+
+def report_error(input_file, e, _print=print):
+    _print(f"\n{input_file} violates the schema.")
+    if len(e.path) == 0:
+        _print("The error appears to be at the top-level of the file")
+    else:
+        _print("The path leading up to the error is:\n")
+        while len(e.path) > 0:
+            node=e.path.popleft()
+            if type(node) is int:
+                # Change indexing from zero-based to one-based and report the item number
+                _print(f'[item #{int(node)+1}]->', end="")
+            else:
+                _print(f'{node}->')
+    _print(f"ERROR: {e.message}")
+    _print("\n(Numbers indicate the item number in a list of items.)")
+
+def schema_check(input_file, schema_file, quiet = True):
+
+    if quiet:
+        _print = lambda *args, **kwargs : None
+    else:
+        _print = print
+
+    _print(f"Loading input as {'JSON' if Path(input_file).suffix == '.json' else 'YAML'}")
+    input_data = load_input(input_file)
 
     # Validate data against JSON-schema
-    try:
-        jsonschema.validate(input_data, schema_data)
+    error = find_error(input_data, schema_file)
+    if error is None:
         _print(f"{input_file} is valid according to the schema.")
         return True
-    except jsonschema.exceptions.ValidationError as e:
-        _print(f"\n{input_file} violates the schema.")
-        if len(e.path) == 0:
-            _print("The error appears to be at the top-level of the file")
-        else:
-            _print("The path leading up to the error is:\n")
-            while len(e.path) > 0:
-                node=e.path.popleft()
-                if type(node) is int:
-                    # Change indexing from zero-based to one-based and report the item number
-                    _print(f'[item #{int(node)+1}]->', end="")
-                else:
-                    _print(f'{node}->')
-        _print(f"ERROR: {e.message}")
-        _print("\n(Numbers indicate the item number in a list of items.)")
+    else:
+        report_error(input_file, error, _print)
         return False
 
+def schema_check_many(input_files, schema_files, quiet = True):
+    """Validate many input files in one go.  Each input is loaded once and checked against each of the schemas, using
+    the cached validators.  Returns a dict: input file -> list of the schema files that the input is valid for."""
+    schema_files = [schema_files] if isinstance(schema_files, str) else list(schema_files)
+    result = {}
+    for input_file in input_files:
+        input_data = load_input(input_file)
+        result[input_file] = []
+        for schema_file in schema_files:
+            error = find_error(input_data, schema_file)
+            if error is None:
+                result[input_file].append(schema_file)
+            elif not quiet:
+                report_error(input_file, error)
+    return result
+
 if __name__ == '__main__':
 
+    if len(sys.argv) < 3:
+        print("Usage: validate.py input_file schema_file [--quiet]")
+        print("       validate.py --many schema_file input_file [input_file2 ...]")
+        sys.exit(1)
+
+    # Batch mode: Validate all given input files against one schema, in this process
+    if sys.argv[1] == '--many':
+        schema_file = sys.argv[2]
+        result = schema_check_many(sys.argv[3:], schema_file, quiet=False)
+        failed = [f for f, schemas in result.items() if not schemas]
+        print(f"{len(result) - len(failed)} of {len(result)} files are valid according to {schema_file}")
+        sys.exit(1 if failed else 0)
+
     input_file = sys.argv[1]
     schema_file = sys.argv[2]
 
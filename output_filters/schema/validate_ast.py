@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: MPL-2.0
+
+# =======================================================================
+# (C) 2025 MBition GmbH
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+# =======================================================================
+
+"""Validate an IFEX AST (a tree of ifex_ast dataclasses) against the rules of the IFEX Core JSON schema"""
+
+# To check an AST that was created by a program (e.g. a converter from another format) against the schema, it could
+# be written as YAML with ast_as_yaml() and validated with validate.py.  This module checks the dataclass tree
+# directly instead, without the YAML round trip.
+#
+# The rules are the same ones that ifex_to_json_schema.py writes to the schema, and they are taken from the same
+# place (collect_type_info), once per AST model:
+#
+#  - Required fields (all fields that are not Optional) must have a value.
+#  - Each field value must have the type of the field (string, integer, object of the expected node type, or array)
+#  - A node must not have fields that the expected node type does not define ("additionalProperties": false)
+#
+# As in the YAML output, empty values (None, "" and []) count as missing.
+#
+# Errors are reported with the node path (see models/ifex/ifex_paths.py) and the field name, and the messages are
+# worded like the ones from the jsonschema library.
+
+from collections import namedtuple
+from dataclasses import fields, is_dataclass
+from models.common.ast_utils import is_empty
+from models.ifex.ifex_paths import child_segment
+from output_filters.schema.ifex_to_json_schema import collect_type_info, get_type_name
+import functools
+import models.ifex.ifex_ast as ifex_ast
+
+ASTError = namedtuple('ASTError', ['path', 'field', 'message'])
+ASTError.__str__ = lambda e: f"{'/'.join(p for p in (e.path, e.field) if p)}: {e.message}"
+
+# JSON-schema type name -> check for a field value
+_PRIMITIVE_CHECKS = {
+    'string':  lambda v: isinstance(v, str),
+    'integer': lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+    'number':  lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'Any':     lambda v: isinstance(v, str) or (isinstance(v, int) and not isinstance(v, bool)),
+}
+
+class _TypeRules:
+    """The rules for one node type:  field name -> (JSON-schema type name or node type name, is_list), and the
+    names of the required fields"""
+    __slots__ = ('properties', 'required')
+
+    def __init__(self, type_info):
+        self.properties = {name: (get_type_name(field_type), is_list)
+                           for name, field_type, is_list, _ in type_info}
+        self.required = tuple(name for name, _, _, is_required in type_info if is_required)
+
+@functools.lru_cache(maxsize=None)
+def compile_rules(root_type=ifex_ast.AST):
+    """Return node type name -> _TypeRules for all node types that can be reached from root_type"""
+    return {type_name: _TypeRules(type_info) for type_name, type_info in collect_type_info(root_type).items()}
+
+@functools.lru_cache(maxsize=None)
+def _field_names(cls):
+    return tuple(f.name for f in fields(cls))
+
+def _describe(value):
+    # A node appears as an object in the YAML output
+    return f"<{type(value).__name__} object>" if is_dataclass(value) else repr(value)
+
+class _Done(Exception):
+    pass
+
+class _Validator:
+    def __init__(self, rules, max_errors):
+        self.rules = rules
+        self.max_errors = max_errors
+        self.errors = []
+
+    def error(self, path, field, message):
+        self.errors.append(ASTError(path, field, message))
+        if self.max_errors is not None and len(self.errors) >= self.max_errors:
+            raise _Done()
+
+    def check_node(self, node, type_name, path):
+        if not is_dataclass(node) or isinstance(node, type):
+            self.error(path, None, f"{_describe(node)} is not of type 'object'")
+            return
+        rules = self.rules[type_name]
+        present = set()
+        unexpected = []
+        for name in _field_names(type(node)):
+            value = getattr(node, name)
+            if is_empty(value):
+                continue
+            present.add(name)
+            rule = rules.properties.get(name)
+            if rule is None:
+                unexpected.append(name)
+                continue
+            kind, is_list = rule
+            if is_list:
+                if not isinstance(value, list):
+                    self.error(path, name, f"{_describe(value)} is not of type 'array'")
+                    continue
+                for index, item in enumerate(value):
+                    self.check_value(item, kind, path, name, index)
+            else:
+                self.check_value(value, kind, path, name, None)
+        for name in rules.required:
+            if name not in present:
+                self.error(path, None, f"'{name}' is a required property")
+        if unexpected:
+            names = ', '.join(repr(name) for name in unexpected)
+            verb = 'was' if len(unexpected) == 1 else 'were'
+            self.error(path, None, f"Additional properties are not allowed ({names} {verb} unexpected)")
+
+    def check_value(self, value, kind, path, field, index):
+        check = _PRIMITIVE_CHECKS.get(kind)
+        if check is not None:
+            if not check(value):
+                location = field if index is None else f"{field}/{index}"
+                expected = "integer' or 'string" if kind == 'Any' else kind
+                self.error(path, location, f"{_describe(value)} is not of type '{expected}'")
+        elif kind in self.rules:
+            segment = str(child_segment(field, value, index)) if is_dataclass(value) else \
+                      (field if index is None else f"{field}/{index}")
+            self.check_node(value, kind, segment if path == '' else f"{path}/{segment}")
+        # (Other types are not defined in the schema either, so nothing can be checked)
+
+def validate_ast(node, type_name='AST', root_type=ifex_ast.AST, max_errors=None):
+    """Check node (by default, the root of a complete IFEX AST) and return the list of ASTErrors, which is empty if
+    the tree is valid.  type_name is the node type that node shall have, root_type is the AST class that the rules
+    are collected from.  Validation stops after max_errors errors, if given."""
+    validator = _Validator(compile_rules(root_type), max_errors)
+    try:
+        validator.check_node(node, type_name, '')
+    except _Done:
+        pass
+    return validator.errors
+
+def is_valid_ast(node, type_name='AST', root_type=ifex_ast.AST):
+    return not validate_ast(node, type_name, root_type, max_errors=1)
+
+# --- Script entry point ---
+if __name__ == '__main__':
+    import sys
+    from models.ifex.ifex_parser import get_ast_from_yaml_file
+
+    if len(sys.argv) != 2:
+        print(f"Usage: python {sys.argv[0]} <ifex-file>")
+        sys.exit(1)
+
+    errors = validate_ast(get_ast_from_yaml_file(sys.argv[1]))
+    for e in errors:
+        print(e)
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,150 @@
+# SPDX-License-Identifier: MPL-2.0
+
+# =======================================================================
+# (C) 2025 MBition GmbH
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+# =======================================================================
+
+"""Validate all IFEX and layer files in a directory tree, in parallel"""
+
+# Each file is checked against the given schemas the same way as identify_layer does it:  The plausible schemas
+# (see the discriminators there) are validated first, and the other schemas only if none of them matches.  The file
+# is valid if it is valid according to (at least) one of the schemas.
+#
+# - Files are validated in a process pool.  Each worker process creates the validators for all schemas once, when
+#   it starts, and they are then reused for all files that the worker gets.
+# - A result is produced for each file as soon as it is validated (in completion order, not in file order).
+# - If a state file is given, the content hash of each valid file is stored in it.  On the next run, files whose
+#   content is unchanged are skipped, as long as the schemas are unchanged too.  Invalid files are always validated
+#   again.
+# - The IFEX Core IDL schema is generated from the AST classes (see ifex_to_json_schema.py), so there is no schema
+#   file for it.  write_core_schema() writes it to a file, to be validated against like any other schema.
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from layer_types.utils.identify_layer import plausible_schemas
+from output_filters.schema.ifex_to_json_schema import get_json_schema
+from output_filters.schema.validate import find_error, get_validator, load_input
+import glob
+import hashlib
+import json
+import os
+import time
+
+DEFAULT_PATTERNS = ['**/*.ifex', '**/*.ilay']
+CORE_SCHEMA_FILE = 'ifex-core-idl.json'
+
+def discover_files(root, patterns=DEFAULT_PATTERNS):
+    """Return the files below root that match any of the glob patterns, sorted and without duplicates"""
+    found = set()
+    for pattern in patterns:
+        found.update(f for f in glob.glob(os.path.join(root, pattern), recursive=True) if os.path.isfile(f))
+    return sorted(found)
+
+def file_digest(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+def schemas_digest(schemas):
+    # By content only, so that a schema that is written to a new (temporary) file in each run still matches
+    h = hashlib.blake2b(digest_size=16)
+    for digest in sorted(file_digest(schema_file) for schema_file in schemas):
+        h.update(digest.encode('ascii'))
+    return h.hexdigest()
+
+def write_core_schema(directory):
+    """Write the IFEX Core IDL schema to a file in directory, and return its name"""
+    schema_file = os.path.join(directory, CORE_SCHEMA_FILE)
+    with open(schema_file, 'w') as f:
+        json.dump(get_json_schema(), f, indent=1)
+    return schema_file
+
+def _error_text(error):
+    location = ''.join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in error.absolute_path).lstrip('.')
+    return f"{location}: {error.message}" if location else error.message
+
+def validate_file(input_file, schemas):
+    """Validate one file.  Returns a result dict (see validate_files)"""
+    start = time.perf_counter()
+    result = {'file': input_file}
+    try:
+        plausible = plausible_schemas(input_file, schemas)
+        input_data = load_input(input_file)
+        errors = [(s, find_error(input_data, s)) for s in plausible]
+        matching = [s for s, error in errors if error is None]
+        if not matching:
+            # The error message of a plausible schema is the most useful one, so those come first
+            errors += [(s, find_error(input_data, s)) for s in schemas if s not in plausible]
+            matching = [s for s, error in errors if error is None]
+        result['status'] = 'valid' if matching else 'invalid'
+        result['schemas'] = matching
+        if not matching:
+            result['error'] = _error_text(errors[0][1]) if errors else 'No schemas given'
+    except Exception as e:
+        # E.g. YAML syntax errors
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+def _init_worker(schemas):
+    # Pre-warm the validator cache of the worker process
+    for schema_file in schemas:
+        get_validator(schema_file)
+
+def read_state(state_file):
+    try:
+        with open(state_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_state(state_file, state):
+    # Write to a temporary file first, so that an interrupted run does not leave a broken state file
+    tmp = state_file + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, state_file)
+
+def validate_files(files, schemas, jobs=None, state_file=None):
+    """Validate files against schemas and yield one result dict per file, as soon as it is available:
+        file, status ('valid', 'invalid', 'error' or 'skipped'), schemas (the matching ones), error, duration_ms
+    jobs is the number of worker processes (default: number of CPUs, 1 = validate in this process).
+    If state_file is given, files that were valid in the previous run and are unchanged are skipped."""
+    state = read_state(state_file) if state_file else {}
+    digest = schemas_digest(schemas)
+    previous = state.get('files', {}) if state.get('schemas') == digest else {}
+    # Files that are not part of this run keep their state
+    checked = {os.path.abspath(f) for f in files}
+    valid = {key: content for key, content in previous.items() if key not in checked}
+
+    todo = []
+    for input_file in files:
+        content = file_digest(input_file)
+        key = os.path.abspath(input_file)
+        if previous.get(key) == content:
+            valid[key] = content
+            yield {'file': input_file, 'status': 'skipped', 'duration_ms': 0.0}
+        else:
+            todo.append((input_file, key, content))
+
+    def record(result, key, content):
+        if result['status'] == 'valid':
+            valid[key] = content
+        return result
+
+    try:
+        if jobs == 1 or len(todo) <= 1:
+            for input_file, key, content in todo:
+                yield record(validate_file(input_file, schemas), key, content)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(schemas,)) as executor:
+                futures = {executor.submit(validate_file, input_file, schemas): (key, content)
+                           for input_file, key, content in todo}
+                for future in as_completed(futures):
+                    yield record(future.result(), *futures[future])
+    finally:
+        if state_file:
+            write_state(state_file, {'schemas': digest, 'files': valid})
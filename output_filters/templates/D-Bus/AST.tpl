@@ -1,14 +1,22 @@
 {# Collect namespace names for naming of interface.  (This does not generate any text) #}
-{% for n in item.namespaces %}
-{{ add_namespace(n) }}
+{% for n in item.namespaces %}{{ add_namespace(n) }}{% endfor %}
+{#
+   The output is indented XML, with the same layout as lxml's pretty_print, so
+   it can be written out directly (see output_filters/DBus/dbus_generator.py).
+   Each template outputs complete lines, each ending with a newline, indented
+   for its place in the document, and outputs nothing if it has nothing to say.
+   An element without children is written as <element/>.  (Jinja drops the
+   newline at the end of a template file, so a template whose last line is
+   output ends with a comment line.)
+#}
+{% set content = namespace(found=false) %}
+{% for n in item.namespaces if n.interface != None or n.structs or n.enumerations %}
+{% set content.found = true %}
 {% endfor %}
-
-{# Start of generation here #}
-<!DOCTYPE node PUBLIC
-    "-//freedesktop//DTD D-BUS Object Introspection 1.0//EN"
-    "http://www.freedesktop.org/standards/dbus/1.0/introspect.dtd" >
+{% if content.found %}
 <node xmlns:doc="http://www.freedesktop.org/dbus/1.0/doc.dtd">
-{% for n in item.namespaces %}
-{{ gen(n) }}
-{% endfor %}
+{% for n in item.namespaces %}{{ gen(n) }}{% endfor %}
 </node>
+{% else %}
+<node xmlns:doc="http://www.freedesktop.org/dbus/1.0/doc.dtd"/>
+{% endif %}
@@ -1,4 +1,7 @@
+{# Included from Namespace.tpl and Interface.tpl, which set the indentation #}
+{% set indentation = indentation|default("  ") %}
 {% if item.description != None %}
-<!-- Enumeration {{item.name}} = {{item.description.strip()}} -->
+{{indentation}}<!-- Enumeration {{item.name}} = {{item.description.strip()}} -->
 {% endif %}
-<!-- Enumeration {{item.name}} values are : {% for o in item.options %}{{o.name}} = {{o.value}}, {% endfor %} -->
+{{indentation}}<!-- Enumeration {{item.name}} values are : {% for o in item.options %}{{o.name}} = {{o.value}}, {% endfor %} -->
+{# (Keeps the newline above, see AST.tpl) #}
@@ -1,6 +1,12 @@
-{% if item.description != "" %}<!-- Event (D-Bus signal): {{ item.description }} -->{% endif %}
-<signal name="{{item.name}}">
+{% if item.description != "" %}
+    <!-- Event (D-Bus signal): {{ item.description }} -->
+{% endif %}
+{% if item.input %}
+    <signal name="{{item.name}}">
 {% for x in item.input: %}
-<arg type="{{ gen_dbus_type(x.datatype) }}" name="{{x.name}}"/>
+      <arg type="{{ gen_dbus_type(x.datatype, item) }}" name="{{x.name}}"/>
 {% endfor %}
-</signal>
+    </signal>
+{% else %}
+    <signal name="{{item.name}}"/>
+{% endif %}
@@ -1,16 +1,5 @@
-{% if item.interface != None %}
-  {{gen(item.interface)}}
-{% endif %}
-
+{% if item.interface != None %}{{ gen(item.interface) }}{% endif %}
 {# Definition of named structs and other datatypes have little meaning in D-Bus, but we can generate some comments about them: #}
-{% for x in item.structs %}
-{{gen(x)}}
-{% endfor %}
-
-{% for x in item.typedefs %}
-{{gen(x)}}
-{% endfor %}
-
-{% for x in item.enumerations %}
-{{gen(x)}}
-{% endfor %}
+{% set indentation = "  " %}
+{% for item in item.structs %}{% include "Struct.tpl" %}{% endfor %}
+{% for item in item.enumerations %}{% include "Enumeration.tpl" %}{% endfor %}
@@ -1,4 +1,5 @@
 {% if item.description != None %}
-<!-- Property: {{item.name}} = {{item.description.strip(" \t\n")}} -->
+    <!-- Property: {{item.name}} = {{item.description.strip(" \t\n")}} -->
 {% endif %}
-<property name="{{item.name}}" type="{{gen_dbus_type(item.datatype)}}"/>
+    <property name="{{item.name}}" type="{{gen_dbus_type(item.datatype, item)}}"/>
+{# (Keeps the newline above, see AST.tpl) #}
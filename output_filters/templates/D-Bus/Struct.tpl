@@ -1,12 +1,14 @@
+{# Included from Namespace.tpl and Interface.tpl, which set the indentation #}
+{% set indentation = indentation|default("  ") %}
 {% if item.description != None %}
-<!-- Struct {{item.name}} = {{item.description.strip()}} -->
+{{indentation}}<!-- Struct {{item.name}} = {{item.description.strip()}} -->
 {% endif %}
-<!-- Struct {{item.name}} defined as: { {% for m in item.members %}{{m.name}} ({{m.datatype}}), {% endfor %} } -->
-<!-- Struct {{item.name}} members details: -->
+{{indentation}}<!-- Struct {{item.name}} defined as: { {% for m in item.members %}{{m.name}} ({{m.datatype}}), {% endfor %} } -->
+{{indentation}}<!-- Struct {{item.name}} members details: -->
 {% for m in item.members %}
 {% if m.description != None %}
-<!-- member {{item.name}}:{{m.name}} of type {{m.datatype}} = {{m.description.strip()}} -->
+{{indentation}}<!-- member {{item.name}}:{{m.name}} of type {{m.datatype}} = {{m.description.strip()}} -->
 {% else %}
-<!-- member {{item.name}}:{{m.name}} of type {{m.datatype}} -->
+{{indentation}}<!-- member {{item.name}}:{{m.name}} of type {{m.datatype}} -->
 {% endif %}
 {% endfor %}
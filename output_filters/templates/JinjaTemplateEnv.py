@@ -1,28 +1,51 @@
 # SPDX-FileCopyrightText: Copyright (c) 2022 MBition GmbH.
 # SPDX-License-Identifier: MPL-2.0
 
+import functools
 import os
 import jinja2
 from typing import Dict, Any
-from output_filters.templates import TemplateDir
+from output_filters.templates import TemplateCache, TemplateCompiler, TemplateDir
+from output_filters.templates.TemplateStreaming import StreamingExtension
+
+# Number of compiled inline templates that are kept, see render_template()
+INLINE_TEMPLATE_CACHE_SIZE = 256
 
 class JinjaTemplateEnv:
 
     tpath = ""
     default_templates = {}
     jinja_env = None
+    exported = {}
 
-    def __init__(self, directory=""):
+    # bytecode_cache: See TemplateCache.bytecode_cache()
+    # compiled: See TemplateCompiler.template_loader()
+    def __init__(self, directory="", bytecode_cache=None, compiled=None):
         tpath = TemplateDir.abs_template_path(directory)
+        self.tpath = tpath
+
+        # Everything given to set_template_env(), so that an identical
+        # environment can be set up again (e.g. in a worker process)
+        self.exported = {}
+
+        # See render_template()
+        self.inline_template = functools.lru_cache(maxsize=INLINE_TEMPLATE_CACHE_SIZE)(self._compile_inline_template)
 
         # Set up Jinja
         self.jinja_env = jinja2.Environment(
                 # Use the subdirectory 'templates' relative to this file's location
-                loader=jinja2.FileSystemLoader(tpath),
+                # (or the precompiled templates in it, if there are any)
+                loader=TemplateCompiler.template_loader(tpath, compiled),
 
                 # Templates with these extension gets automatic auto escape for HTML
                 # It's more annoying for code generation, so passing empty list for now.
-                autoescape=jinja2.select_autoescape([])
+                autoescape=jinja2.select_autoescape([]),
+
+                # Compiled templates are kept on disk between runs
+                bytecode_cache=TemplateCache.bytecode_cache(bytecode_cache),
+
+                # Output of nested gen() calls can be streamed, see TemplateStreaming.py
+                extensions=[StreamingExtension]
                 )
 
         # We want the control blocks in the template to NOT result in any extra
@@ -40,10 +63,18 @@ class JinjaTemplateEnv:
 
     # wrapper over jinja2 render
     def render_template(self, text: str, env: Dict[Any,Any]):
-        return jinja2.Template(text).render(env);
+        return self.inline_template(text).render(env)
+
+    # Inline templates (given as text, e.g. by gen_template_text) are compiled
+    # once per text and kept in a bounded LRU cache.  (They are compiled with
+    # Jinja's default settings, like jinja2.Template(text), not with the
+    # settings of jinja_env)
+    def _compile_inline_template(self, text: str):
+        return jinja2.Template(text)
 
     # wrapper over jinja2 to export environment.
     def set_template_env(self, **kwargs):
+        self.exported.update(kwargs)
         self.jinja_env.globals.update(kwargs)
         
     # gets template by name from the list of default_templates.
@@ -54,6 +85,19 @@ class JinjaTemplateEnv:
     def get_template(self, filename):
         return self.jinja_env.get_template(filename)
 
+    # Marker comments of a template, e.g. ['ifex:pure'] (see TemplateDir.py).
+    # For a precompiled template they come from the manifest of the package,
+    # so they are found even if the package is shipped without the source.
+    def template_markers(self, filename):
+        markers = TemplateCompiler.compiled_markers(self.jinja_env.loader, filename)
+        if markers is not None:
+            return markers
+        try:
+            with open(os.path.join(self.tpath, filename), 'r') as f:
+                return TemplateDir.find_markers(f.read())
+        except (OSError, UnicodeDecodeError):
+            return []
+
 
 # Test code
 if __name__ == '__main__':
@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 MBition GmbH.
+# SPDX-License-Identifier: MPL-2.0
+
+# On-disk cache of compiled templates
+#
+# Jinja compiles each template to Python code the first time it is used.
+# Without a bytecode cache that happens in every run, for every template that
+# the run uses, which is a large part of the run time for small inputs.  With
+# the cache, the compiled code is written to disk and later runs only load it.
+#
+# The cache is off unless it is enabled by the IFEX_TEMPLATE_CACHE environment
+# variable (or by ifexgen --template-cache), so that nothing is written to the
+# home directory unasked, e.g. by a test suite or a CI job:
+#
+#   (not set), "" or "off"   No bytecode cache
+#   "on"                     $XDG_CACHE_HOME/ifex/jinja2 (default ~/.cache/ifex/jinja2)
+#   <directory>              Use that directory
+#
+# Invalidation:  Jinja stores a checksum of the template source with the code,
+# and recompiles the template when the source has changed.  Cache files also
+# contain the Jinja and Python versions that wrote them.  In addition, the cache
+# key used here includes the environment options that change the compiled code
+# (trim_blocks, delimiters, ...), so environments with different settings can
+# share the directory.
+
+import jinja2
+import os
+
+CACHE_ENV_VARIABLE = 'IFEX_TEMPLATE_CACHE'
+
+def default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'ifex', 'jinja2')
+
+def compile_options(environment):
+    # All Environment settings that affect the code that a template compiles to
+    return (environment.block_start_string, environment.block_end_string,
+            environment.variable_start_string, environment.variable_end_string,
+            environment.comment_start_string, environment.comment_end_string,
+            environment.line_statement_prefix, environment.line_comment_prefix,
+            environment.trim_blocks, environment.lstrip_blocks, environment.newline_sequence,
+            environment.keep_trailing_newline, environment.optimized, environment.is_async,
+            tuple(sorted(environment.extensions)))
+
+class TemplateBytecodeCache(jinja2.FileSystemBytecodeCache):
+    def get_bucket(self, environment, name, filename, source):
+        # (The name is only used to compute the cache key)
+        return super().get_bucket(environment, f"{name}\0{compile_options(environment)!r}", filename, source)
+
+def bytecode_cache(setting=None):
+    """Return the bytecode cache to use for a Jinja environment, or None for no cache.
+    setting: None = from the environment variable (see above), False = no cache, "on" = the default directory,
+    a directory name, or a jinja2.BytecodeCache to use as it is"""
+    if isinstance(setting, jinja2.BytecodeCache):
+        return setting
+    if setting is None:
+        setting = os.environ.get(CACHE_ENV_VARIABLE)
+    if setting is None or setting is False or setting in ('', 'off'):
+        return None
+    if setting == 'on':
+        setting = default_cache_dir()
+    try:
+        os.makedirs(setting, exist_ok=True)
+    except OSError:
+        # E.g. a read-only home directory: Run without the cache
+        return None
+    return TemplateBytecodeCache(setting)
@@ -0,0 +1,156 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 MBition GmbH.
+# SPDX-License-Identifier: MPL-2.0
+
+# Ahead-of-time compiled templates
+#
+# A template directory (e.g. D-Bus, protobuf, sds-bamm, dtdl) can be compiled
+# into Python modules, one per template, with Jinja's compile_templates().  They
+# are written to the sub-directory __compiled__ of the template directory, so
+# they are shipped together with the templates (e.g. in a container image):
+#
+#     python -m output_filters.templates.TemplateCompiler D-Bus protobuf
+#
+# JinjaTemplateEnv then loads the compiled templates with a ModuleLoader, which
+# needs no parsing of template source at runtime.  (The Python bytecode of the
+# modules is written too, so that they do not need to be compiled either.)  Any template that is not in
+# the compiled package is loaded from source as usual.
+#
+# A template directory that is loaded with a different environment, like
+# output_filters/protobuf/templates (loaded by JinjaSetup), must be compiled with
+# that environment.  See compile_templates() in output_filters/protobuf/grpc_generator.py.
+#
+# The package also contains a manifest with a checksum of each template source
+# and the environment options it was compiled with.  A compiled template is only
+# used if its source is unchanged (the size and modification time are compared
+# first, and the content only if they differ) and the environment has the same
+# options.  Otherwise the template is loaded from source, so a stale package
+# gives slower startup, but never stale output.  A template whose source does
+# not exist at all is loaded from the package, so that a package can also be
+# shipped without the template sources (compile again after removing a template).
+#
+# The manifest also has the marker comments of each template (see TemplateDir.py),
+# which the compiled code does not contain.
+
+from output_filters.templates import TemplateDir
+from output_filters.templates.TemplateCache import compile_options
+import compileall
+import hashlib
+import jinja2
+import json
+import os
+import py_compile
+import shutil
+import sys
+
+COMPILED_DIR = '__compiled__'
+MANIFEST = 'templates.json'
+
+def compiled_dir(template_dir):
+    return os.path.join(TemplateDir.abs_template_path(template_dir), COMPILED_DIR)
+
+def _source_checksum(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _is_template(name):
+    return not name.startswith(COMPILED_DIR + '/') and not name.startswith('__pycache__/')
+
+def compile_template_dir(template_dir, target=None, env=None):
+    """Compile all templates in template_dir into target (default: the __compiled__ sub-directory).
+    env is the Jinja environment that the templates are loaded with, set up to load from source.  The default is
+    that of JinjaTemplateEnv, which the IFEX generators use.  (Compiled templates are only loaded by an environment
+    with the same options.)
+    Returns the names of the compiled templates."""
+    from output_filters.templates.JinjaTemplateEnv import JinjaTemplateEnv
+    tpath = TemplateDir.abs_template_path(template_dir)
+    target = target or compiled_dir(tpath)
+
+    # The same settings as a generator uses, but always from source
+    if env is None:
+        env = JinjaTemplateEnv(tpath, bytecode_cache=False, compiled=False).jinja_env
+    names = [n for n in env.list_templates() if _is_template(n)]
+
+    # Write to a new directory and replace the old one, so that a failed compilation leaves no partial package
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    env.compile_templates(tmp, zip=None, filter_func=lambda n: n in names, ignore_errors=False)
+    # Also write the Python bytecode of the modules, so that importing them needs no compilation either.  The
+    # bytecode is checked against a hash of the module source, which stays valid when the files are copied.
+    compileall.compile_dir(tmp, quiet=1, invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+    templates = {}
+    for name in names:
+        st = os.stat(os.path.join(tpath, name))
+        source, _, _ = env.loader.get_source(env, name)
+        templates[name] = {'sha1': _source_checksum(os.path.join(tpath, name)),
+                           'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                           'markers': TemplateDir.find_markers(source)}
+    with open(os.path.join(tmp, MANIFEST), 'w') as f:
+        json.dump({'jinja': jinja2.__version__, 'options': repr(compile_options(env)), 'templates': templates},
+                  f, indent=1, sort_keys=True)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return names
+
+
+class CompiledTemplateLoader(jinja2.ModuleLoader):
+    """Loads the templates of a compiled package that are up to date with their source"""
+
+    def __init__(self, path, source_dir, manifest):
+        super().__init__(path)
+        self.options = manifest['options']
+        self.templates = {}
+        for name, info in manifest['templates'].items():
+            source = os.path.join(source_dir, name)
+            try:
+                st = os.stat(source)
+            except OSError:
+                # Shipped without the source
+                self.templates[name] = info
+                continue
+            if (st.st_size, st.st_mtime_ns) == (info['size'], info['mtime_ns']) or \
+               _source_checksum(source) == info['sha1']:
+                self.templates[name] = info
+
+    def load(self, environment, name, globals=None):
+        if name not in self.templates or repr(compile_options(environment)) != self.options:
+            raise jinja2.TemplateNotFound(name)
+        return super().load(environment, name, globals)
+
+    def list_templates(self):
+        return sorted(self.templates)
+
+def compiled_markers(loader, name):
+    """Return the marker comments of template name from the compiled package that loader loads it from, or None if
+    it is not loaded from a compiled package"""
+    for loader in loader.loaders if isinstance(loader, jinja2.ChoiceLoader) else [loader]:
+        if isinstance(loader, CompiledTemplateLoader) and name in loader.templates:
+            return loader.templates[name].get('markers')
+    return None
+
+def template_loader(tpath, compiled=None):
+    """Return the Jinja loader for the template directory tpath (an absolute path).
+    compiled: None = use the compiled package in tpath if there is one, False = always load from source,
+    or the directory of a compiled package"""
+    source_loader = jinja2.FileSystemLoader(tpath)
+    if compiled is False:
+        return source_loader
+    package = compiled or os.path.join(tpath, COMPILED_DIR)
+    try:
+        with open(os.path.join(package, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return source_loader
+    if manifest.get('jinja') != jinja2.__version__:
+        return source_loader
+    return jinja2.ChoiceLoader([CompiledTemplateLoader(package, tpath, manifest), source_loader])
+
+
+# Compile the given template directories
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f"Usage: python -m output_filters.templates.TemplateCompiler <template-dir>...")
+        print("(Directories are absolute paths or sub-directories of output_filters/templates)")
+        sys.exit(1)
+    for template_dir in sys.argv[1:]:
+        names = compile_template_dir(template_dir)
+        print(f"{compiled_dir(template_dir)}: {len(names)} templates")
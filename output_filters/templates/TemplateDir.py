@@ -4,35 +4,79 @@
 from models.ifex import ifex_ast
 from models.ifex import ifex_ast_doc
 import os
+import re
 import sys
 
 # Needed globally by setup.py
 TemplatePath = os.path.dirname(os.path.realpath(__file__))
 
+# Template maps:  Generators find the default template for each AST node type
+# by its file name, which starts with the name of the node type.  The map is
+# needed each time a template environment is created, so it is kept per
+# directory and rebuilt only when the directory is modified (a file added,
+# removed or renamed changes the modification time of the directory).
+#
+# Instead of testing each file name against each class name, the class names
+# are indexed by length, so each file name is only looked up in a set once per
+# distinct length (or once per '.' in it, if the class name must be followed by
+# a '.').
+
+# (directory, classes, separator, recurse, absolute) -> (modification times, template map)
+_template_maps = {}
+
+def _matching_classes(filename, classes, lengths, separator):
+    if separator:
+        # Class name followed by the separator, e.g. "Method." => the prefixes that end before a separator
+        candidates = (filename[:i] for i, c in enumerate(filename) if c == separator)
+    else:
+        candidates = (filename[:n] for n in lengths if n <= len(filename))
+    return [c for c in candidates if c in classes]
+
+def match_template_files(directory : str, classes, separator = '', recurse = False, absolute = False):
+    """Return a dict that maps each class name in classes to the template file in directory whose name starts with
+    the class name (followed by separator, if given).  If there is more than one matching file, the last found one
+    will remain in result.  The result is cached until the directory is modified."""
+    directory = os.path.abspath(directory)
+    classes = frozenset(classes)
+    if recurse:
+        walk = list(os.walk(directory))
+        stamp = tuple((root, os.stat(root).st_mtime_ns) for root, _, _ in walk)
+    else:
+        walk = None
+        stamp = os.stat(directory).st_mtime_ns
+
+    key = (directory, classes, separator, recurse, absolute)
+    cached = _template_maps.get(key)
+    if cached is not None and cached[0] == stamp:
+        return dict(cached[1])
+
+    if walk is None:
+        walk = [(directory, None, os.listdir(directory))]
+    lengths = sorted({len(n) for n in classes})
+    templates = {}  # Dict maps node name to the template file name
+    for root, _, filenames in walk:
+        for fn in filenames:
+            for n in _matching_classes(fn, classes, lengths, separator):
+                # Sub-directories can only be told apart by an absolute path, so recurse implies absolute
+                templates[n] = os.path.join(root, fn) if (absolute or recurse) else fn
+    _template_maps[key] = (stamp, templates)
+    return dict(templates)
+
 def find_matching_template_files(directory : str, recurse = False, absolute = False):
     """Search in given directory to find any files that match (start with) any of the given class names.
     Return a dict that maps each class name to its corresponding template file name.
     If there is more than one matching file, the last found one will remain in result."""
+    return match_template_files(directory, ifex_ast.get_ast_node_type_names(), '', recurse, absolute)
 
-    classes = ifex_ast.get_ast_node_type_names()
+# Marker comments:  A template can declare things about itself to the generator
+# in comments that start with "ifex:", e.g. {# ifex:pure #}.  Comments are not
+# part of a compiled template, so the markers are also kept in the manifest of
+# a precompiled package (see TemplateCompiler.py).
+MARKER_COMMENT = re.compile(r'\{#-?\s*(ifex:.*?)\s*-?#\}')
 
-    templates = {}  # Dict maps node name to the template file name
-    if recurse:
-        for _, _, filenames in os.walk(directory):
-            for fn in filenames:
-                for n in classes:
-                    if fn.startswith(n):
-                        # here absolute path is assumed since we're iterating over possibly multiple sub-directories
-                        templates[n] = os.path.join(root, fn)
-    else: # non recursive
-        for fn in os.listdir(directory):
-            for n in classes:
-                if fn.startswith(n):
-                    if absolute:
-                        templates[n] = os.path.join(directory, fn)
-                    else:
-                        templates[n] = fn
-    return templates
+def find_markers(text):
+    """Return the marker comments in the template source text, without the comment delimiters"""
+    return MARKER_COMMENT.findall(text)
 
 def abs_template_path(p):
     """ Convert relative or absolute path p into an absolute path pointing to a template directory """
@@ -0,0 +1,117 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 MBition GmbH.
+# SPDX-License-Identifier: MPL-2.0
+
+# Streaming of nested gen() output
+#
+# Jinja can render a template as a stream of chunks (Template.generate()), so
+# the output can be written to a file while it is rendered, instead of being
+# built up as one string first.  But a template such as
+#
+#     {% for n in item.namespaces %}
+#     {{ gen(n) }}
+#     {% endfor %}
+#
+# still renders each namespace into a complete string before it is output,
+# because gen() returns a string.  With StreamingExtension, the templates are
+# compiled so that an expression that consists of nothing but a call of gen()
+# outputs the chunks of the nested template instead:
+#
+#     yield str(context.call(gen, n))                  (normal)
+#     yield from environment.stream_output(context, gen, n)   (with the extension)
+#
+# stream_output() uses gen.stream() if the function has it (see
+# models/ifex/ifex_generator.py), and otherwise outputs the result of the call
+# as usual.  The output is the same in both cases, the difference is only in
+# how much of it exists in memory at the same time.
+#
+# Only gen() calls that are output directly are compiled like this.  If the
+# result is processed further ({{ gen(x)|join(', ') }}, {% set s = gen(x) %})
+# or output into a buffer (inside a macro, a {% filter %} block, ...), it is
+# compiled as usual.
+#
+# StreamingCodeGenerator overrides internal methods of Jinja's CodeGenerator,
+# which can change in any Jinja release.  Therefore it is only used with the
+# Jinja versions in SUPPORTED_JINJA.  With any other version the extension
+# warns and leaves Jinja's own CodeGenerator in place, so the templates work
+# as usual and only the nested gen() output is no longer streamed (each
+# {{ gen(x) }} is output as one string).
+
+from jinja2.compiler import CodeGenerator
+from jinja2.ext import Extension
+from jinja2 import nodes
+import jinja2
+import re
+import warnings
+
+# Functions whose output is streamed when they are called in an output expression
+STREAMED_FUNCTIONS = ('gen',)
+
+# Supported Jinja versions: (first supported release, first unsupported release)
+SUPPORTED_JINJA = ((3, 1), (3, 2))
+
+def jinja_version_supported(version=jinja2.__version__):
+    release = tuple(int(n) for n in re.findall(r'\d+', version)[:2])
+    return SUPPORTED_JINJA[0] <= release < SUPPORTED_JINJA[1]
+
+def stream_output(context, function, *args):
+    stream = getattr(function, 'stream', None)
+    if stream is None:
+        yield str(context.call(function, *args))
+    else:
+        yield from stream(*args)
+
+def _is_streamed_call(node):
+    return (isinstance(node, nodes.Call) and isinstance(node.node, nodes.Name) and
+            node.node.name in STREAMED_FUNCTIONS and not node.kwargs and
+            node.dyn_args is None and node.dyn_kwargs is None)
+
+class StreamingCodeGenerator(CodeGenerator):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The Call nodes that are being compiled as stream_output()
+        self.streamed_calls = []
+
+    def _streams(self, node, frame, finalize):
+        # Output that is yielded directly, and that would be output with str()
+        return (frame.buffer is None and finalize.src is None and not frame.eval_ctx.volatile and
+                not frame.eval_ctx.autoescape and _is_streamed_call(node))
+
+    def _output_child_pre(self, node, frame, finalize):
+        if self._streams(node, frame, finalize):
+            # Follows "yield "
+            self.write("from environment.stream_output(context, ")
+            self.streamed_calls.append(node)
+        else:
+            super()._output_child_pre(node, frame, finalize)
+
+    def _output_child_post(self, node, frame, finalize):
+        if self.streamed_calls and self.streamed_calls[-1] is node:
+            self.streamed_calls.pop()
+            self.write(")")
+        else:
+            super()._output_child_post(node, frame, finalize)
+
+    def visit_Call(self, node, frame, forward_caller=False):
+        if self.streamed_calls and self.streamed_calls[-1] is node:
+            # Only the function and its arguments, the call is made by stream_output()
+            self.visit(node.node, frame)
+            for arg in node.args:
+                self.write(", ")
+                self.visit(arg, frame)
+        else:
+            super().visit_Call(node, frame, forward_caller=forward_caller)
+
+class StreamingExtension(Extension):
+    """Compiles the templates of the environment so that nested gen() output is streamed (see above)"""
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(stream_output=stream_output)
+        if jinja_version_supported():
+            environment.code_generator_class = StreamingCodeGenerator
+        else:
+            supported = f">={'.'.join(map(str, SUPPORTED_JINJA[0]))},<{'.'.join(map(str, SUPPORTED_JINJA[1]))}"
+            warnings.warn(f"Jinja2 {jinja2.__version__} is not supported by the template streaming "
+                          f"(TemplateStreaming.py), which needs Jinja2 {supported}.  The nested gen() output "
+                          f"is not streamed.", RuntimeWarning, stacklevel=2)
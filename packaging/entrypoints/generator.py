@@ -1,10 +1,10 @@
 # SPDX-FileCopyrightText: Copyright (c) 2022 MBition GmbH.
 # SPDX-License-Identifier: MPL-2.0
 
-from models.ifex.ifex_generator import jinja_env
-from models.ifex.ifex_generator import gen
+from models.ifex.ifex_generator import Generator, GeneratorError, SPLIT_LEVELS
+from models.ifex.ifex_incremental import declared_outputs, generate_files, split_outputs
 from models.ifex.ifex_parser import get_ast_from_yaml_file
-import argparse, dacite
+import argparse, dacite, sys
 
 def ifex_generator_run():
     parser = argparse.ArgumentParser(description='Runs generic IFEX code generator with given template(s).')
@@ -13,6 +13,20 @@ def ifex_generator_run():
                         help='choose output type by stating the template directory, as an absolute path or a sub-directory of templates/')
     parser.add_argument('template', metavar='root-template', type=str, nargs='?',
                         help='Top-level template file name (default : first file starting with AST_....)')
+    parser.add_argument('-j','--jobs', dest='jobs', type=int, default=1,
+                        help='number of worker processes that render the top-level namespaces (or interfaces, see --split) in parallel.  The output is the same as with one process (the default).  0 = number of CPUs')
+    parser.add_argument('--split', dest='split', choices=SPLIT_LEVELS, default='namespaces',
+                        help='the nodes that are rendered in parallel with --jobs, or to separate files with --output-dir (default: namespaces)')
+    parser.add_argument('-o','--output', dest='output', metavar='output-file', type=str,
+                        help='write the output to this file instead of stdout')
+    parser.add_argument('--output-dir', dest='output_dir', metavar='directory', type=str,
+                        help='write the files that the templates declare ({# ifex:output <file name> #}), or if they declare none, one file for each node selected by --split, named after its path.  Files whose input nodes and templates did not change since the last run are not generated again, and files whose content did not change are not rewritten')
+    parser.add_argument('--write-threads', dest='write_threads', type=int,
+                        help='number of threads that write the files of --output-dir (default: depends on the number of CPUs)')
+    parser.add_argument('--render-cache', dest='render_cache', action='store_true',
+                        help='render each node only once with templates that are declared pure ({# ifex:pure #}), and print how often the output of each of them was reused to stderr')
+    parser.add_argument('--template-cache', dest='template_cache', metavar='directory', nargs='?', const='on',
+                        help='keep the compiled templates on disk between runs, in the given directory (default: ~/.cache/ifex/jinja2).  Without this option the environment variable IFEX_TEMPLATE_CACHE decides, and by default there is no cache')
 
     try:
         args = parser.parse_args()
@@ -21,9 +35,32 @@ def ifex_generator_run():
 
     ast = get_ast_from_yaml_file(args.input)
 
-    jinja_env.__init__(args.templatedir)
-    jinja_env.set_template_env( gen=gen )
-    print(gen(ast))
+    generator = Generator(args.templatedir, bytecode_cache=args.template_cache, render_cache=args.render_cache)
+
+    if args.output_dir:
+        try:
+            outputs = declared_outputs(generator, ast) or split_outputs(generator, ast, args.split)
+        except GeneratorError as e:
+            print(f"ERROR: {e.msg}", file=sys.stderr)
+            sys.exit(1)
+        results = generate_files(generator, ast, outputs, args.output_dir, workers=args.write_threads)
+        counts = {status: list(results.values()).count(status) for status in ('written', 'unchanged', 'skipped', 'removed')}
+        print(f"{len(results)} files: " + ", ".join(f"{n} {status}" for status, n in counts.items()), file=sys.stderr)
+    else:
+        _write_output(generator, ast, args)
+    if generator.render_cache is not None:
+        print(f"Render cache:\n{generator.render_cache}", file=sys.stderr)
+
+def _write_output(generator, ast, args):
+    # The output is written while it is rendered, see Generator.stream()
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for chunk in generator.stream_parallel(ast, jobs=args.jobs or None, split=args.split):
+            out.write(chunk)
+        out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
 
 
 if __name__ == "__main__":
@@ -11,10 +11,12 @@ import argparse, dacite
 def ifex_dbus_generator_run():
     parser = argparse.ArgumentParser(description='Runs IFEX to D-Bus XML translator.')
     parser.add_argument('input', metavar='ifex-input-file', type=str, help='path to input IFEX (YAML) file')
+    parser.add_argument('--normalize', action='store_true',
+                        help='parse the generated XML and pretty-print it again with lxml.  This checks that the output is well-formed XML, but needs more time and memory.  The output is otherwise the same')
 
     try:
         args = parser.parse_args()
-        dbus_generator.main_generate(args.input)
+        dbus_generator.main_generate(args.input, args.normalize)
 
     except dacite.UnexpectedDataError as e:
         print(f"ERROR: Read error resulting from {filename}: {e}")
@@ -0,0 +1,44 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 MBition GmbH.
+# SPDX-License-Identifier: MPL-2.0
+
+# User-invocation script for validating all IFEX files in a directory tree
+
+from output_filters.schema.validate_repo import discover_files, validate_files, write_core_schema, DEFAULT_PATTERNS
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+
+# The layer types that are defined in this project
+layer_types_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'layer_types')
+
+def ifex_validate_repo_run():
+    parser = argparse.ArgumentParser(description='Validates all IFEX (and layer) files in a directory tree against JSON schemas. '
+                                                 'Prints one JSON object per file (JSON lines), in completion order.')
+    parser.add_argument('root', metavar='directory', type=str, nargs='?', default='.', help='root directory to search (default: .)')
+    parser.add_argument('-p', '--pattern', dest='patterns', action='append', metavar='glob',
+                        help=f'glob pattern relative to the root directory, can be repeated (default: {" ".join(DEFAULT_PATTERNS)})')
+    parser.add_argument('-s', '--schema', dest='schemas', action='append', metavar='schema.json', default=[],
+                        help='JSON schema to validate against, can be repeated.  The IFEX Core IDL schema and the layer type schemas of this project are always included.')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--state-file', type=str, default=None,
+                        help='file that records valid files, to skip them in the next run if they are unchanged (default: no state file, all files are validated)')
+    args = parser.parse_args()
+
+    files = discover_files(args.root, args.patterns or DEFAULT_PATTERNS)
+
+    failed = 0
+    with tempfile.TemporaryDirectory(prefix='ifexvalidate-') as tmp:
+        schemas = [write_core_schema(tmp)] + args.schemas + sorted(glob.glob(os.path.join(layer_types_dir, '*', 'schema.json')))
+        for result in validate_files(files, schemas, jobs=args.jobs, state_file=args.state_file):
+            print(json.dumps(result), flush=True)
+            failed += result['status'] in ('invalid', 'error')
+
+    print(f"{len(files)} files, {failed} failed", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    ifex_validate_repo_run()
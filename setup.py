@@ -11,10 +11,14 @@ setup(name='ifex',
       author_email='',
       url='https://github.com/COVESA/ifex',
       packages=find_packages(),
+      # Newer Jinja releases work too, but without the streaming of nested gen() output,
+      # see SUPPORTED_JINJA in output_filters/templates/TemplateStreaming.py
+      install_requires=['Jinja2>=3.1'],
       entry_points='''
             [console_scripts]
             ifexgen=packaging.entrypoints.generator:ifex_generator_run
             ifexgen_dbus=packaging.entrypoints.generator_dbus:ifex_dbus_generator_run
             ifexconv_protobuf=packaging.entrypoints.protobuf_ifex:protobuf_to_ifex_run
+            ifexvalidate=packaging.entrypoints.validate_repo:ifex_validate_repo_run
       '''
       )
@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Applying a layer with thousands of wildcard rules
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_apply_layer
+#
+# The layer selects methods with exact names, prefix and suffix patterns, and arguments by datatype.  The compiled
+# layer is compared with the straightforward approach of testing every rule on every candidate node (using
+# fnmatchcase, like the naive implementation in tests/test_apply_layer.py).
+#
+# The last part compares the memory held by a LayerStore with the memory of one copy of the core AST, which is what
+# each merged tree would cost.
+
+from tests.helpers import make_synthetic_ast, count_nodes
+from tests.test_apply_layer import naive_apply
+from transformers.apply_layer import compile_layer, LayerStore
+import copy
+import time
+import tracemalloc
+
+def make_layer(rules):
+    # Most rules select a few nodes or none at all, as in a large layer written for many different core files
+    methods = []
+    for i in range(rules):
+        kind = i % 4
+        if kind == 0:
+            methods.append({"name": f"m{i // 4}", "exact": i})
+        elif kind == 1:
+            methods.append({"name": f"m{i // 4}*", "prefix": i})
+        elif kind == 2:
+            methods.append({"name": f"*_{i // 4}", "suffix": i})
+        else:
+            methods.append({"name": f"m{i // 4}[0-9]", "input": [{"datatype": "uint*", "checked": i}]})
+    return {"namespaces": [{"name": "*", "interface": {"name": "if*", "methods": methods}}]}
+
+def allocated(f):
+    tracemalloc.start()
+    result = f()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    ast = make_synthetic_ast(namespaces=20, methods=40)
+    print(f"Core AST: {count_nodes(ast)} nodes")
+    for rules in [100, 1000, 4000]:
+        layer = make_layer(rules)
+        compiled, t_compile = timed(lambda: compile_layer(layer))
+        result, t_apply = timed(lambda: compiled.apply(ast))
+        reference, t_naive = timed(lambda: naive_apply(ast, [layer]))
+        assert result == reference
+        print(f"{rules:5} rules: compile {t_compile*1000:7.1f} ms | apply {t_apply*1000:7.1f} ms | "
+              f"naive {t_naive*1000:8.1f} ms | {t_naive / t_apply:5.1f}x faster | {len(result)} nodes with data")
+
+    store = LayerStore(ast)
+    layers = [compile_layer(make_layer(100)) for _ in range(5)]
+    _, tree = allocated(lambda: copy.deepcopy(ast))
+    for i, layer in enumerate(layers):
+        _, size = allocated(lambda: store.add_layer(f"layer{i}", layer))
+        print(f"Layer {i}: side table {size // 1024:5} KiB ({len(store.tables[f'layer{i}'])} entries), "
+              f"copy of core AST {tree // 1024:5} KiB")
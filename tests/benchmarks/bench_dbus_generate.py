@@ -0,0 +1,45 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: D-Bus XML written directly by the templates, compared to the lxml pass
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_dbus_generate [namespaces]
+#
+# The synthetic namespaces each have one interface, so the size of the XML grows with the number of namespaces.
+# normalize=True renders the same text and then parses and pretty-prints it again with lxml.  (tracemalloc only sees
+# the memory of Python objects, so the peak of the lxml pass does not include the parsed tree)
+
+from output_filters.DBus import dbus_generator
+from tests.helpers import make_synthetic_ast
+import sys
+import time
+import tracemalloc
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+def peak_memory(f):
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+if __name__ == '__main__':
+    namespaces = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ast = make_synthetic_ast(namespaces=namespaces, methods=20)
+    dbus_generator.generate(ast)   # (Load the templates before measuring)
+
+    normalized, t_normalized = timed(lambda: dbus_generator.generate(ast, normalize=True))
+    direct, t_direct = timed(lambda: dbus_generator.generate(ast))
+    assert direct == normalized
+    peak_normalized = peak_memory(lambda: dbus_generator.generate(ast, normalize=True))
+    peak_direct = peak_memory(lambda: dbus_generator.generate(ast))
+    print(f"{namespaces} namespaces, {len(direct) / 1e6:.1f} MB of XML: "
+          f"lxml pass {t_normalized*1000:.0f} ms, peak {peak_normalized / 1e6:.1f} MB | "
+          f"direct {t_direct*1000:.0f} ms, peak {peak_direct / 1e6:.1f} MB | {t_normalized / t_direct:.2f}x faster")
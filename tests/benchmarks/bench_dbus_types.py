@@ -0,0 +1,44 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: D-Bus signatures of arguments that use nested structs
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_dbus_types [arguments] [depth]
+#
+# Struct s<n> contains s<n-1>, down to s0, and each argument has the type s<depth>.  Expanding the structs again for
+# every argument (uncached(), which is what gen_dbus_type() did before SignatureResolver) takes arguments * depth
+# steps, the resolver takes arguments + depth.
+
+from models.DBus.dbus_types import SignatureResolver, ifex_to_dbus_types
+from models.ifex.ifex_ast import *
+import sys
+import time
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+def uncached(datatype, definitions):
+    if datatype in ifex_to_dbus_types:
+        return ifex_to_dbus_types[datatype]
+    return "(" + "".join(uncached(m.datatype, definitions) for m in definitions[datatype].members) + ")"
+
+if __name__ == '__main__':
+    arguments = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    structs = [Struct(name="s0", members=[Member(name="x", datatype="uint32")])] + \
+              [Struct(name=f"s{i}", members=[Member(name="inner", datatype=f"s{i-1}"),
+                                             Member(name="x", datatype="uint32")]) for i in range(1, depth + 1)]
+    method = Method(name="m", input=[Argument(name=f"a{a}", datatype=f"s{depth}") for a in range(arguments)])
+    ast = AST(namespaces=[Namespace(name="ns", structs=structs, interface=Interface(name="If", methods=[method]))])
+
+    definitions = {s.name: s for s in structs}
+    expected, t_uncached = timed(lambda: [uncached(a.datatype, definitions) for a in method.input])
+    types = SignatureResolver(ast)
+    result, t_cached = timed(lambda: [types.signature(a.datatype, method) for a in method.input])
+    assert result == expected
+    print(f"{arguments} arguments, structs nested {depth} deep: uncached {t_uncached*1000:7.1f} ms | "
+          f"SignatureResolver {t_cached*1000:6.1f} ms | {t_uncached / t_cached:5.1f}x faster")
@@ -0,0 +1,39 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: serial gen() vs gen_parallel() on a multi-namespace model
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_gen_parallel [namespaces] [methods-per-namespace]
+#
+# Uses the 'simple' templates, whose Namespace template renders all methods, structs etc. of the namespace.
+
+from models.ifex import ifex_generator
+from tests.helpers import make_synthetic_ast, count_nodes
+import os
+import sys
+import time
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    namespaces = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    methods = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    ast = make_synthetic_ast(namespaces=namespaces, methods=methods)
+    ifex_generator.jinja_env.__init__("simple")
+    ifex_generator.jinja_env.set_template_env(gen=ifex_generator.gen)
+    print(f"Model: {namespaces} namespaces, {count_nodes(ast)} nodes")
+
+    serial, t_serial = timed(lambda: ifex_generator.gen(ast))
+    print(f"serial        : {t_serial:7.3f}s  ({len(serial) // 1024} KiB output)")
+    for workers in [2, 4, 8]:
+        if workers > (os.cpu_count() or 1):
+            break
+        result, t = timed(lambda: ifex_generator.gen_parallel(ast, jobs=workers))
+        assert result == serial
+        print(f"processes ({workers}) : {t:7.3f}s  {t_serial / t:4.1f}x")
@@ -0,0 +1,72 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Identifying the layer type of many files
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_identify_layer
+#
+# Writes a directory of layer files (with and without a schema key) and IFEX Core IDL files, and identifies each of
+# them among the layer type schemas and the IFEX Core IDL schema: with full validation against every schema
+# (fast=False), with the discriminators first (fast=True), and with the discriminators only (identify_file with
+# validate=False).  Validation of the one plausible schema is most of the remaining time.
+
+from layer_types.utils.identify_layer import get_matching_schemas, identify_file
+from models.common.ast_utils import ast_as_yaml
+from output_filters.schema.ifex_to_json_schema import get_json_schema
+from tests.helpers import make_synthetic_ast
+import glob
+import json
+import os
+import tempfile
+import time
+
+root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
+
+def timing_layer(n, with_schema):
+    header = "schema: Timing/schema.json\n" if with_schema else ""
+    properties = "".join(f"        - name: p{i}\n          min_period: {i}ms\n" for i in range(n))
+    return f"{header}namespaces:\n  - name: ns\n    interface:\n      name: if\n      properties:\n{properties}"
+
+def constraint_layer(n):
+    properties = "".join(f"        - name: p{i}\n          max_value: {i}\n" for i in range(n))
+    return f"namespaces:\n  - name: ns\n    interface:\n      name: if\n      properties:\n{properties}"
+
+def write_files(directory):
+    for i in range(100):
+        with open(os.path.join(directory, f"timing{i}.ilay"), 'w') as f:
+            f.write(timing_layer(50, with_schema=i % 2 == 0))
+        with open(os.path.join(directory, f"constraint{i}.ilay"), 'w') as f:
+            f.write(constraint_layer(50))
+    for i in range(20):
+        with open(os.path.join(directory, f"core{i}.ifex"), 'w') as f:
+            f.write(ast_as_yaml(make_synthetic_ast(namespaces=2, methods=10)))
+    with open(os.path.join(directory, "ifex-core-schema.json"), 'w') as f:
+        json.dump(get_json_schema(), f, indent=2)
+
+def identify_all(files, schemas, fast):
+    return {f: get_matching_schemas(f, schemas, fast) for f in files}
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        write_files(directory)
+        schemas = sorted(glob.glob(os.path.join(root, 'layer_types', '*', 'schema.json')))
+        schemas.append(os.path.join(directory, "ifex-core-schema.json"))
+        files = sorted(glob.glob(os.path.join(directory, '*.i*')))
+
+        identify_all(files[:1], schemas, True)  # Build the cached validators first
+        for fast in [False, True]:
+            start = time.perf_counter()
+            result = identify_all(files, schemas, fast)
+            t = time.perf_counter() - start
+            if not fast:
+                full = result
+            print(f"fast={fast!s:5}: {t / len(files) * 1000:6.2f} ms/file ({len(files)} files)")
+        assert result == full
+
+        start = time.perf_counter()
+        guessed = {f: identify_file(f, schemas, validate=False) for f in files}
+        t = time.perf_counter() - start
+        print(f"no validation: {t / len(files) * 1000:6.2f} ms/file")
+        assert all([guessed[f]] == full[f] for f in files)
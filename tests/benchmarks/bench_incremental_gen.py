@@ -0,0 +1,49 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Incremental generation of one file per namespace
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_incremental_gen [namespaces]
+#
+# Generates one file per namespace with the simple templates (like ifexgen --output-dir), then again after one
+# namespace was modified, and compares the second run with generating all files again.  The check of the dependencies
+# needs the content hash of the tree, so the time saved is the rendering time of the skipped files, which depends on
+# how much work the templates do (the simple templates do little).  Also compares writing all files of a first run
+# with one thread and with the default number of threads.
+
+from models.ifex.ifex_generator import Generator
+from models.ifex.ifex_incremental import MANIFEST, generate_files, split_outputs
+from tests.helpers import make_synthetic_ast
+from collections import Counter
+import os
+import sys
+import tempfile
+import time
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    namespaces = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    ast = make_synthetic_ast(namespaces=namespaces, methods=20)
+    generator = Generator("simple")
+    outputs = split_outputs(generator, ast)
+
+    with tempfile.TemporaryDirectory() as out:
+        _, t_first = timed(lambda: generate_files(generator, ast, outputs, out))
+        ast.namespaces[namespaces // 2].structs[0].members[0].name = "modified"
+        results, t_incremental = timed(lambda: generate_files(generator, ast, outputs, out))
+        os.remove(os.path.join(out, MANIFEST))
+        _, t_full = timed(lambda: generate_files(generator, ast, outputs, out))
+    print(f"{namespaces} files: first run {t_first*1000:7.1f} ms | all again {t_full*1000:7.1f} ms | "
+          f"one modified {t_incremental*1000:6.1f} ms {dict(Counter(results.values()))} | "
+          f"{t_full / t_incremental:5.1f}x faster")
+
+    for workers in [1, None]:
+        with tempfile.TemporaryDirectory() as out:
+            _, t = timed(lambda: generate_files(generator, ast, outputs, out, workers=workers))
+        print(f"first run, {workers or 'default'} write threads: {t*1000:7.1f} ms")
@@ -0,0 +1,51 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: full merge_many() vs IncrementalMerge when a single layer changes
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_incremental_merge
+#
+# Simulates an edit-generate loop:  A large base with a stack of layers, where one layer at a time is replaced by
+# a modified version of itself (e.g. re-read after the file was saved).
+
+from models.ifex.ifex_ast import AST, Namespace, Interface, Method, Argument
+from tests.helpers import make_synthetic_ast, count_nodes
+from transformers.merge_overlay import merge_many, IncrementalMerge
+import time
+
+def make_layer(layer, edit=0, namespaces=10, methods=10):
+    # Each layer touches its own range of namespaces.  "edit" modifies the description in one method only.
+    first = layer * namespaces
+    return AST(namespaces=[Namespace(name=f"ns{n}",
+                                     interface=Interface(name=f"if{n}",
+                                                         methods=[Method(name=f"m{m}",
+                                                                         description=f"layer {layer} edit {edit if (n, m) == (first, 0) else 0}",
+                                                                         input=[Argument(name=f"extra{layer}", datatype="uint8")])
+                                                                  for m in range(methods)]))
+                           for n in range(first, first + namespaces)])
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    base = make_synthetic_ast(namespaces=120, methods=40)
+    layers = [make_layer(i) for i in range(10)]
+    print(f"Base: {count_nodes(base)} nodes, {len(layers)} layers, {count_nodes(layers)} layer nodes")
+
+    _, t_full = timed(lambda: merge_many(base, layers))
+    incremental, t_first = timed(lambda: IncrementalMerge(base, layers))
+    print(f"full merge_many              : {t_full*1000:7.2f} ms")
+    print(f"IncrementalMerge, first merge: {t_first*1000:7.2f} ms")
+
+    for edit in range(1, 6):
+        index = edit % len(layers)
+        layer = make_layer(index, edit)
+        layers[index] = layer
+        result, t = timed(lambda: incremental.set_layer(index, layer))
+        assert result == merge_many(base, layers)
+        print(f"re-merge after edit of layer {index}: {t*1000:7.2f} ms  "
+              f"(cache: {incremental.cache.hits} hits, {incremental.cache.misses} misses in total)")
@@ -0,0 +1,35 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: gen_template_text() on a list of nodes
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_inline_templates [nodes]
+#
+# gen_template_text() renders the same template text for each node of a list.  This compares it with compiling the
+# text for each node (jinja2.Template(text), which is what render_template() did before the cache).
+
+from models.ifex import ifex_generator
+from models.ifex.ifex_ast import Argument, Method
+import jinja2
+import sys
+import time
+
+TEMPLATE = """{{ item.name }}({% for a in item.input %}{{ a.datatype }} {{ a.name }}{% if not loop.last %}, {% endif %}{% endfor %})"""
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    nodes = [Method(name=f"m{i}", input=[Argument(name=f"a{a}", datatype="uint8") for a in range(3)])
+             for i in range(count)]
+
+    uncached, t_uncached = timed(lambda: [jinja2.Template(TEMPLATE).render({'item': n}) for n in nodes])
+    cached, t_cached = timed(lambda: ifex_generator.gen_template_text(nodes, TEMPLATE))
+    assert cached == uncached
+    print(f"{count} nodes: compile per node {t_uncached*1000:7.1f} ms | cached {t_cached*1000:6.1f} ms | "
+          f"{t_uncached / t_cached:5.1f}x faster  {ifex_generator.jinja_env.inline_template.cache_info()}")
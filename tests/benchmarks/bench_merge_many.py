@@ -0,0 +1,63 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: N overlays merged pairwise (merge_asts) vs in one pass (merge_many)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_merge_many
+#
+# Each overlay modifies the same methods (a typical stack of deployment overlays refines the same parts of the
+# interface).  Pairwise merging creates a new version of each modified path for every layer, merge_many() creates
+# it once.  "nodes" counts the AST nodes created by the merge, "peak" is the tracemalloc peak during the merge.
+
+from models.ifex.ifex_ast import AST, Namespace, Interface, Method, Argument
+from tests.helpers import make_synthetic_ast
+import dataclasses
+import time
+import tracemalloc
+import transformers.merge_overlay as merge_overlay
+
+# Count the nodes created by the merge functions (they create all nodes through dataclasses.replace)
+created = 0
+def counting_replace(obj, **changes):
+    global created
+    created += 1
+    return dataclasses.replace(obj, **changes)
+merge_overlay.replace = counting_replace
+
+def make_overlay(layer, namespaces=20, methods=10):
+    return AST(namespaces=[Namespace(name=f"ns{n}",
+                                     interface=Interface(name=f"if{n}",
+                                                         methods=[Method(name=f"m{m}",
+                                                                         description=f"layer {layer}",
+                                                                         input=[Argument(name=f"extra{layer}", datatype="uint8")])
+                                                                  for m in range(methods)]))
+                           for n in range(namespaces)])
+
+def measure(f):
+    global created
+    created = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = f()
+    t = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, t, created, peak
+
+def pairwise(base, overlays):
+    for overlay in overlays:
+        base = merge_overlay.merge_asts(base, overlay)
+    return base
+
+if __name__ == '__main__':
+    base = make_synthetic_ast(namespaces=40, methods=40)
+    for n in [1, 5, 10, 15]:
+        overlays = [make_overlay(layer) for layer in range(n)]
+        r1, t1, nodes1, peak1 = measure(lambda: pairwise(base, overlays))
+        r2, t2, nodes2, peak2 = measure(lambda: merge_overlay.merge_many(base, overlays))
+        assert r1 == r2
+        print(f"{n:2} layers: pairwise {t1*1000:7.1f} ms {nodes1:6} nodes {peak1//1024:6} KiB peak | "
+              f"merge_many {t2*1000:7.1f} ms {nodes2:6} nodes {peak2//1024:6} KiB peak | "
+              f"nodes {nodes1/nodes2:4.1f}x fewer")
@@ -0,0 +1,51 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: overlay merge cost as a function of base size and overlay size
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_merge_overlay
+#
+# The merge shares all untouched nodes, so with a fixed overlay the time should stay (nearly) flat while the base
+# grows.  For reference, the time of a copy.deepcopy() of the base is printed too - the previous implementation
+# copied at least that much on every merge.
+
+from models.ifex.ifex_ast import AST, Namespace, Interface, Method, Argument
+from tests.helpers import make_synthetic_ast, count_nodes
+from transformers.merge_overlay import merge_asts
+import copy
+import time
+
+def timed(f, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = f()
+        t = time.perf_counter() - start
+        best = t if best is None else min(best, t)
+    return result, best
+
+def make_overlay(touched_namespaces):
+    return AST(namespaces=[Namespace(name=f"ns{n}",
+                                     interface=Interface(name=f"if{n}",
+                                                         methods=[Method(name="m3", input=[Argument(name="+extra", datatype="uint8")])]))
+                           for n in range(touched_namespaces)])
+
+if __name__ == '__main__':
+    print("Fixed overlay (one method), growing base:")
+    for namespaces in [10, 30, 120]:
+        base = make_synthetic_ast(namespaces=namespaces, methods=40)
+        overlay = make_overlay(1)
+        _, t_merge = timed(lambda: merge_asts(base, overlay))
+        _, t_frozen = timed(lambda: merge_asts(base, overlay, freeze=True))
+        _, t_copy = timed(lambda: copy.deepcopy(base), repeat=1)
+        print(f"  base {count_nodes(base):6} nodes: merge {t_merge*1000:8.3f} ms, "
+              f"merge+freeze {t_frozen*1000:8.3f} ms, (deepcopy of base: {t_copy*1000:8.1f} ms)")
+
+    print("Fixed base, growing overlay:")
+    base = make_synthetic_ast(namespaces=120, methods=40)
+    for touched in [1, 10, 100]:
+        overlay = make_overlay(touched)
+        _, t_merge = timed(lambda: merge_asts(base, overlay))
+        print(f"  overlay touching {touched:3} namespaces: merge {t_merge*1000:8.3f} ms")
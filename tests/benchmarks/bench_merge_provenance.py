@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Cost of recording merge provenance
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_merge_provenance
+#
+# Merges a stack of overlays onto a synthetic base, with and without a Provenance object, using both the pairwise
+# (merge_asts) and the single-pass (merge_many) merge.  Without a Provenance the merge only tests
+# "provenance is not None" on modified paths, so the disabled case is the plain merge.
+#
+# Every overlay modifies 400 methods, so nearly all of the merge work is on recorded nodes.  The pairwise merge moves
+# the entry of each modified node to its next version, while merge_many() only creates the final one.  New methods are
+# objects of the overlays, which are not recorded at all.
+
+from models.ifex.ifex_ast import AST, Namespace, Interface, Method, Argument
+from tests.helpers import make_synthetic_ast
+from transformers.merge_overlay import merge_asts, merge_many, Provenance
+import time
+
+def make_overlay(layer, namespaces=40, methods=10):
+    return AST(namespaces=[Namespace(name=f"ns{n}",
+                                     description=f"layer {layer}",
+                                     interface=Interface(name=f"if{n}",
+                                                         methods=[Method(name=f"m{m}",
+                                                                         description=f"layer {layer}",
+                                                                         input=[Argument(name=f"extra{layer}", datatype="uint8")])
+                                                                  for m in range(layer, layer + methods)]))
+                           for n in range(namespaces)])
+
+def pairwise(base, overlays, provenance=None):
+    for layer, overlay in enumerate(overlays, 1):
+        base = merge_asts(base, overlay, provenance=provenance, layer=layer)
+    return base
+
+def best_of(functions, repeat=10):
+    # Alternate between the functions so that noise from other load affects them equally.  (CPU time of this process,
+    # which is less affected by other processes than the wall clock time)
+    best = [float('inf')] * len(functions)
+    for _ in range(repeat):
+        for i, f in enumerate(functions):
+            start = time.process_time()
+            f()
+            best[i] = min(best[i], time.process_time() - start)
+    return best
+
+def overhead(disabled, enabled, rounds=15):
+    # The load on a shared machine changes over time, so the ratio is measured in short rounds, and the median is used
+    results = sorted(best_of([disabled, enabled]) for _ in range(rounds))
+    ratios = sorted(e / d for d, e in results)
+    return results[rounds // 2][0], ratios[rounds // 2] - 1
+
+if __name__ == '__main__':
+    base = make_synthetic_ast(namespaces=40, methods=40)
+    overlays = [make_overlay(layer) for layer in range(1, 6)]
+    files = ["base.yaml"] + [f"overlay{layer}.yaml" for layer in range(1, 6)]
+
+    for name, merge in [("pairwise", pairwise), ("merge_many", merge_many)]:
+        disabled, ratio = overhead(lambda: merge(base, overlays),
+                                   lambda: merge(base, overlays, provenance=Provenance(files)))
+        provenance = Provenance(files)
+        merge(base, overlays, provenance=provenance)
+        print(f"{name:10}: disabled {disabled*1000:7.2f} ms | overhead {100 * ratio:5.1f} % (median of rounds) | "
+              f"{len(provenance.entries)} nodes recorded")
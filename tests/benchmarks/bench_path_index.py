@@ -0,0 +1,33 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Looking up nodes by path, with walk_path() and with a PathIndex
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_path_index
+#
+# Looks up every node of one model in another model with the same structure, which is what matching "the same"
+# node across files does.
+
+from models.ifex.ifex_paths import PathIndex, find_by_path
+from tests.helpers import make_synthetic_ast
+import time
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    for namespaces in [10, 40]:
+        first = make_synthetic_ast(namespaces=namespaces, methods=40)
+        second = make_synthetic_ast(namespaces=namespaces, methods=40)
+        paths = list(PathIndex(first).nodes)
+        sample = paths[::10]
+
+        _, t_walk = timed(lambda: [find_by_path(second, p) for p in sample])
+        index, t_build = timed(lambda: PathIndex(second))
+        _, t_lookup = timed(lambda: [index[p] for p in paths])
+        print(f"{len(paths):6} nodes: find_by_path {t_walk / len(sample) * 1e6:7.1f} us/lookup | "
+              f"index build {t_build*1000:6.1f} ms, {t_lookup / len(paths) * 1e6:5.2f} us/lookup")
@@ -0,0 +1,49 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: gen() with the render cache for pure templates
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_render_cache [namespaces]
+#
+# The templates write, for each method, the definition of every struct of the namespace, so each struct node is
+# rendered once per method.  With render_cache=True, the pure Struct and Member templates render each node once.
+
+from models.ifex.ifex_generator import Generator
+from tests.helpers import make_synthetic_ast
+import os
+import sys
+import tempfile
+import time
+
+TEMPLATES = {
+    'AST-bench.tpl': "{% for n in item.namespaces %}{{ gen(n) }}\n{% endfor %}",
+    'Namespace-bench.tpl': "{% for m in item.interface.methods %}\n{{ m.name }} uses:\n"
+                           "{% for s in item.structs %}{{ gen(s) }}\n{% endfor %}{% endfor %}",
+    'Struct-bench.tpl': "{# ifex:pure #}\nstruct {{ item.name }} { {{ gen(item.members)|join('; ') }} }",
+    'Member-bench.tpl': "{# ifex:pure #}\n{{ item.datatype }} {{ item.name }}",
+}
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    namespaces = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    ast = make_synthetic_ast(namespaces=namespaces, methods=20, structs=10)
+    with tempfile.TemporaryDirectory() as template_dir:
+        for name, text in TEMPLATES.items():
+            with open(os.path.join(template_dir, name), 'w') as f:
+                f.write(text)
+        plain = Generator(template_dir)
+        cached = Generator(template_dir, render_cache=True)
+        plain.gen(ast), cached.gen(ast)   # (Load the templates before measuring)
+
+        expected, t_plain = timed(lambda: plain.gen(ast))
+        result, t_cached = timed(lambda: cached.gen(ast))
+    assert result == expected
+    print(f"{namespaces} namespaces: without cache {t_plain*1000:7.1f} ms | render cache {t_cached*1000:6.1f} ms | "
+          f"{t_plain / t_cached:5.1f}x faster")
+    print(cached.render_cache)
@@ -0,0 +1,53 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Peak memory of gen() compared to writing the output with stream()
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_stream [namespaces] [template-dir]
+#
+# gen() builds the complete output as one string (and the text of every subtree on the way), while write() writes the
+# chunks of the templates to the file as they are produced.  Memory is measured with tracemalloc, the AST itself is
+# created before the measurement starts.
+
+from models.ifex.ifex_generator import Generator
+from tests.helpers import make_synthetic_ast
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+def peak_memory(f):
+    tracemalloc.start()
+    try:
+        result, t = timed(f)
+        return result, t, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def write_to(generator, ast, filename):
+    with open(filename, 'w') as f:
+        generator.write(ast, f)
+    return os.path.getsize(filename)
+
+if __name__ == '__main__':
+    namespaces = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    template_dir = sys.argv[2] if len(sys.argv) > 2 else "protobuf"
+    ast = make_synthetic_ast(namespaces=namespaces, methods=20)
+    generator = Generator(template_dir)
+    generator.gen(ast)   # (Load the templates before measuring)
+
+    text, t_gen, peak_gen = peak_memory(lambda: generator.gen(ast))
+    with tempfile.TemporaryDirectory() as tmp:
+        size, t_stream, peak_stream = peak_memory(lambda: write_to(generator, ast, os.path.join(tmp, 'out')))
+    assert size == len(text.encode())
+    print(f"{template_dir}, {namespaces} namespaces, output {size / 1e6:.1f} MB: "
+          f"gen() {t_gen*1000:.0f} ms, peak {peak_gen / 1e6:.1f} MB | "
+          f"write() {t_stream*1000:.0f} ms, peak {peak_stream / 1e6:.2f} MB")
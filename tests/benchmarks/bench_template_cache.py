@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Generator startup with and without the template bytecode cache
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_template_cache
+#
+# For a small input, most of a generator run is spent compiling the templates.  Each measurement runs the generator
+# in a new process (like a CI job calling ifexgen), and is the best of a few runs:
+#
+#  - no cache    IFEX_TEMPLATE_CACHE=off
+#  - warm cache  the cache directory was filled by a previous run
+#
+# The second part measures only the loading of all templates of each template directory, in a new environment:
+# compiled from source, from the bytecode cache, and from a precompiled package (TemplateCompiler).
+#
+# The last part measures creating a Generator, with and without the cached template map (TemplateDir).
+
+from models.common.ast_utils import ast_as_yaml
+from models.ifex.ifex_generator import Generator
+from output_filters.templates import TemplateDir
+from output_filters.templates.JinjaTemplateEnv import JinjaTemplateEnv
+from output_filters.templates.TemplateCompiler import compile_template_dir
+from tests.helpers import make_synthetic_ast
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
+
+COMMANDS = {
+    'simple':   ['-m', 'packaging.entrypoints.generator', '{input}', '-d', 'simple'],
+    'protobuf': ['-m', 'packaging.entrypoints.generator', '{input}', '-d', 'protobuf'],
+    'D-Bus':    ['-m', 'output_filters.DBus.dbus_generator', '{input}'],
+}
+
+def load_all(template_dir, cache, compiled=False):
+    env = JinjaTemplateEnv(template_dir, bytecode_cache=cache, compiled=compiled)
+    start = time.perf_counter()
+    for name in env.default_templates.values():
+        env.get_template(name)
+    return time.perf_counter() - start
+
+def run(args, cache, runs=5):
+    env = dict(os.environ, IFEX_TEMPLATE_CACHE=cache)
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, env=env, cwd=root, check=True, stdout=subprocess.DEVNULL)
+        t = time.perf_counter() - start
+        best = t if best is None else min(best, t)
+    return best
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        input_file = os.path.join(directory, 'small.ifex')
+        with open(input_file, 'w') as f:
+            f.write(ast_as_yaml(make_synthetic_ast(namespaces=2, methods=3)))
+        cache = os.path.join(directory, 'cache')
+        baseline = run(['-c', 'import jinja2, models.ifex.ifex_parser'], 'off')
+        print(f"Python startup and imports: {baseline*1000:6.0f} ms")
+        for name, command in COMMANDS.items():
+            args = [a.format(input=input_file) for a in command]
+            t_off = run(args, 'off')
+            run(args, cache, runs=1)
+            t_warm = run(args, cache)
+            print(f"{name:9}: no cache {t_off*1000:6.0f} ms | warm cache {t_warm*1000:6.0f} ms | "
+                  f"excluding startup: {(t_off - baseline)*1000:5.0f} ms -> {(t_warm - baseline)*1000:5.0f} ms")
+
+        print()
+        for template_dir in ['simple', 'D-Bus', 'protobuf', 'sds-bamm', 'dtdl']:
+            load_all(template_dir, cache)
+            package = os.path.join(directory, 'compiled-' + template_dir)
+            compile_template_dir(template_dir, package)
+            t_off = min(load_all(template_dir, False) for _ in range(5))
+            t_warm = min(load_all(template_dir, cache) for _ in range(5))
+            t_compiled = min(load_all(template_dir, False, package) for _ in range(5))
+            print(f"Loading templates/{template_dir:9}: compile {t_off*1000:6.1f} ms | from cache {t_warm*1000:5.1f} ms"
+                  f" | precompiled {t_compiled*1000:5.1f} ms")
+
+        print()
+        def create(clear):
+            if clear:
+                TemplateDir._template_maps.clear()
+            start = time.perf_counter()
+            Generator('D-Bus', bytecode_cache=cache)
+            return time.perf_counter() - start
+        create(False)
+        t_uncached = min(create(True) for _ in range(20))
+        t_cached = min(create(False) for _ in range(20))
+        print(f"Generator('D-Bus'): {t_uncached*1e6:6.0f} us, with cached template map {t_cached*1e6:6.0f} us")
@@ -0,0 +1,45 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: serial transform() vs transform_parallel() on a multi-namespace model
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_transform_parallel [namespaces] [methods-per-namespace]
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from tests.helpers import make_synthetic_ast, count_nodes
+from tests.test_rule_translator import identity_mapping_table
+from transformers.rule_translator import transform, transform_parallel
+import os
+import sys
+import time
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    namespaces = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    methods = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    ast = make_synthetic_ast(namespaces=namespaces, methods=methods)
+    table = identity_mapping_table()
+    print(f"Model: {namespaces} namespaces, {count_nodes(ast)} nodes")
+
+    serial, t_serial = timed(lambda: transform(table, ast))
+    print(f"serial                      : {t_serial:7.3f}s")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result, t = timed(lambda: transform_parallel(table, ast, executor))
+    assert result == serial
+    print(f"threads (4)                 : {t:7.3f}s  (GIL bound, shown for reference)")
+
+    for workers in [1, 2, 4, 8]:
+        if workers > (os.cpu_count() or 1):
+            break
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            result, t = timed(lambda: transform_parallel(table, ast, executor))
+        assert result == serial
+        print(f"processes ({workers})               : {t:7.3f}s  speedup {t_serial / t:4.2f}x")
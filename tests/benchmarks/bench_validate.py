@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Schema validation with cached validators
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_validate
+#
+# Checks the example layers against all layer type schemas, the way identify_layer does.  "uncached" is what
+# schema_check() did before: read the schema and call jsonschema.validate() (which checks the schema) every time.
+
+from output_filters.schema.validate import load_input, schema_check, schema_check_many
+import glob
+import json
+import jsonschema
+import os
+import time
+
+root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
+
+def uncached(input_file, schema_file):
+    input_data = load_input(input_file)
+    with open(schema_file, 'r') as file:
+        schema_data = json.load(file)
+    try:
+        jsonschema.validate(input_data, schema_data)
+        return True
+    except jsonschema.exceptions.ValidationError:
+        return False
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    files = sorted(glob.glob(os.path.join(root, 'layer_types', '*', '*.ilay'))) * 20
+    schemas = sorted(glob.glob(os.path.join(root, 'layer_types', '*', 'schema.json')))
+    checks = len(files) * len(schemas)
+
+    r1, t1 = timed(lambda: [uncached(f, s) for f in files for s in schemas])
+    r2, t2 = timed(lambda: [schema_check(f, s) for f in files for s in schemas])
+    r3, t3 = timed(lambda: schema_check_many(files, schemas))
+    assert r1 == r2
+    print(f"{checks} checks: uncached {t1 / checks * 1000:6.2f} ms/check | schema_check {t2 / checks * 1000:6.2f} ms/check | "
+          f"schema_check_many {t3 / checks * 1000:6.2f} ms/check")
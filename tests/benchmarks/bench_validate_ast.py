@@ -0,0 +1,40 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Validating an AST directly, and through a YAML round trip
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_validate_ast
+#
+# The YAML round trip is what checking a converted AST against the core schema otherwise takes:  ast_as_yaml(),
+# yaml.safe_load() and validation with the (already created) jsonschema validator.
+
+from jsonschema import Draft202012Validator
+from models.common.ast_utils import ast_as_yaml
+from output_filters.schema.ifex_to_json_schema import get_json_schema
+from output_filters.schema.validate_ast import compile_rules, validate_ast
+from tests.helpers import make_synthetic_ast, count_nodes
+import time
+import yaml
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    validator = Draft202012Validator(get_json_schema())
+    _, t_compile = timed(compile_rules)
+    print(f"Compiling the rules: {t_compile*1000:.1f} ms (once)")
+    for namespaces in [5, 20, 80]:
+        ast = make_synthetic_ast(namespaces=namespaces, methods=20)
+        errors, t_direct = timed(lambda: validate_ast(ast))
+        assert errors == []
+        text, t_dump = timed(lambda: ast_as_yaml(ast))
+        data, t_load = timed(lambda: yaml.safe_load(text))
+        _, t_schema = timed(lambda: validator.is_valid(data))
+        t_roundtrip = t_dump + t_load + t_schema
+        print(f"{count_nodes(ast):6} nodes: direct {t_direct*1000:7.1f} ms | round trip {t_roundtrip*1000:8.1f} ms "
+              f"(dump {t_dump*1000:.0f}, load {t_load*1000:.0f}, validate {t_schema*1000:.0f}) | "
+              f"{t_roundtrip / t_direct:5.1f}x faster")
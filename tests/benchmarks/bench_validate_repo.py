@@ -0,0 +1,39 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Benchmark: Validating a directory tree of layer and IFEX files
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# Usage:  python -m tests.benchmarks.bench_validate_repo
+#
+# Uses the files from bench_identify_layer.  Compares validation in this process, in a process pool, and a second
+# run where all files are unchanged (and therefore skipped).
+
+from output_filters.schema.validate_repo import discover_files, validate_files
+from tests.benchmarks.bench_identify_layer import root, write_files
+import glob
+import os
+import tempfile
+import time
+
+def run(files, schemas, **kwargs):
+    start = time.perf_counter()
+    results = list(validate_files(files, schemas, **kwargs))
+    return results, time.perf_counter() - start
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        write_files(directory)
+        schemas = sorted(glob.glob(os.path.join(root, 'layer_types', '*', 'schema.json')))
+        schemas.append(os.path.join(directory, "ifex-core-schema.json"))
+        files = discover_files(directory)
+        state_file = os.path.join(directory, 'state.json')
+
+        serial, t_serial = run(files, schemas, jobs=1)
+        pool, t_pool = run(files, schemas, state_file=state_file)
+        again, t_again = run(files, schemas, state_file=state_file)
+        assert sorted(r['status'] for r in serial) == sorted(r['status'] for r in pool)
+        assert all(r['status'] == 'skipped' for r in again if r['status'] != 'invalid')
+        print(f"{len(files)} files: serial {t_serial:6.2f} s | process pool ({os.cpu_count()} CPUs) {t_pool:6.2f} s | "
+              f"unchanged {t_again:6.2f} s")
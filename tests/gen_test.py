@@ -48,6 +48,169 @@ def test_gen():
             assert generated == wanted
 
 
+def test_gen_parallel():
+    from tests.helpers import make_synthetic_ast
+    ast = make_synthetic_ast(namespaces=4, methods=3)
+    ifex_generator.jinja_env.__init__("simple")
+    ifex_generator.jinja_env.set_template_env(gen=ifex_generator.gen)
+
+    serial = ifex_generator.gen(ast)
+    assert "m2" in serial
+    assert ifex_generator.gen_parallel(ast, jobs=2) == serial
+    assert ifex_generator.gen_parallel(ast, jobs=2, split='interfaces') == serial
+    assert len(ifex_generator.split_nodes(ast, 'interfaces')) == 4
+
+
+def test_generator_instances():
+    from concurrent.futures import ThreadPoolExecutor
+    from output_filters.DBus.dbus_generator import generate as generate_dbus
+    from tests.helpers import make_synthetic_ast
+    asts = [make_synthetic_ast(namespaces=n, methods=3) for n in range(1, 9)]
+
+    # Each generator has its own template directory and state, so runs in parallel threads do not interfere
+    expected = [(ifex_generator.Generator("simple").gen(ast), ifex_generator.Generator("protobuf").gen(ast),
+                 generate_dbus(ast)) for ast in asts]
+    assert 'interface name="ns0.if0"' in expected[0][2]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda ast: (ifex_generator.Generator("simple").gen(ast),
+                                                 ifex_generator.Generator("protobuf").gen(ast),
+                                                 generate_dbus(ast)), asts * 3))
+    assert results == expected * 3
+
+
+def test_inline_template_cache():
+    nodes = [Method(name=f"m{i}") for i in range(100)]
+    template = "{{ item.name }}/{{ item.input|length }}"
+    cache = ifex_generator.jinja_env.inline_template
+    before = cache.cache_info()
+    assert ifex_generator.gen_template_text(nodes, template) == [f"m{i}/0" for i in range(100)]
+    after = cache.cache_info()
+    assert after.misses - before.misses <= 1 and after.hits - before.hits >= 99
+    assert ifex_generator.gen_template_text(nodes[0], template) == "m0/0"
+    assert cache.cache_info().misses == after.misses
+
+
+def test_stream():
+    import io
+    from tests.helpers import make_synthetic_ast
+    sample = ifex_parser.get_ast_from_yaml_file(os.path.join(TestPath, 'test.ifex.sample', 'input.yaml'))
+    for template_dir in ["simple", "protobuf"]:
+        generator = ifex_generator.Generator(template_dir)
+        for ast in [sample, make_synthetic_ast(namespaces=3, methods=4)]:
+            out = io.StringIO()
+            generator.write(ast, out)
+            assert out.getvalue() == generator.gen(ast)
+
+    # Nested gen() output arrives as many small chunks, not as one string per namespace
+    generator = ifex_generator.Generator("simple")
+    ast = make_synthetic_ast(namespaces=3, methods=4)
+    chunks = list(generator.stream(ast))
+    assert max(len(c) for c in chunks) < len(generator.gen(ast.namespaces[0]))
+    assert list(generator.stream(["a", 1])) == ["['a', 1]"]
+
+    # Only gen() calls that are output directly are streamed, anything else gets the text as before
+    import jinja2
+    from output_filters.templates.TemplateStreaming import StreamingExtension
+    def gen(x):
+        return f"<{x}>"
+    gen.stream = lambda x: iter(["(", str(x), ")"])
+    env = jinja2.Environment(extensions=[StreamingExtension])
+    template = env.from_string("{{ gen(1) }}{{ gen(2)|upper }}{% set s = gen(3) %}{{ s }}"
+                               "{% macro m() %}{{ gen(4) }}{% endmacro %}{{ m() }}{{ gen(5) ~ '' }}")
+    assert template.render(gen=gen) == "(1)<2><3><4><5>"
+    assert template.render(gen=lambda x: f"[{x}]") == "[1][2][3][4][5]"
+
+
+def test_stream_matches_plain_jinja(monkeypatch):
+    # StreamingExtension depends on Jinja internals.  Each bundled template directory must give exactly the same
+    # output as with Jinja's own code generator, and other Jinja versions fall back to that code generator.
+    import io
+    from jinja2.compiler import CodeGenerator
+    from output_filters.DBus import dbus_generator
+    from output_filters.templates import TemplateStreaming
+    sample = ifex_parser.get_ast_from_yaml_file(os.path.join(TestPath, 'test.ifex.sample', 'input.yaml'))
+    templates = os.path.join(TestPath, '..', 'output_filters', 'templates')
+    template_dirs = sorted(d for d in os.listdir(templates)
+                           if os.path.isdir(os.path.join(templates, d)) and not d.startswith('__'))
+    assert {"D-Bus", "protobuf", "simple"} <= set(template_dirs)
+
+    def make_generator(template_dir):
+        if template_dir == "D-Bus":
+            generator = dbus_generator.DBusGenerator()
+            generator.collect_types(sample)
+            return generator
+        return ifex_generator.Generator(template_dir, bytecode_cache=False, compiled=False)
+
+    for template_dir in template_dirs:
+        streamed = io.StringIO()
+        make_generator(template_dir).write(sample, streamed)
+        plain = make_generator(template_dir)
+        env = plain.jinja_env.jinja_env
+        env.extensions = {name: e for name, e in env.extensions.items()
+                          if not isinstance(e, TemplateStreaming.StreamingExtension)}
+        env.code_generator_class = CodeGenerator
+        assert streamed.getvalue() == plain.gen(sample), template_dir
+
+    assert TemplateStreaming.jinja_version_supported("3.1.6")
+    for version in ["3.0.3", "3.2.0", "4.0.0"]:
+        assert not TemplateStreaming.jinja_version_supported(version)
+
+    # Other Jinja versions keep Jinja's own CodeGenerator and give the same output, without streaming
+    template_dir = template_dirs[0]
+    expected = make_generator(template_dir).gen(sample)
+    monkeypatch.setattr(TemplateStreaming, 'SUPPORTED_JINJA', ((3, 0), (3, 1)))
+    with pytest.warns(RuntimeWarning, match="not supported"):
+        fallback = make_generator(template_dir)
+    assert fallback.jinja_env.jinja_env.code_generator_class is CodeGenerator
+    streamed = io.StringIO()
+    fallback.write(sample, streamed)
+    assert streamed.getvalue() == expected
+
+def test_render_cache(tmp_path):
+    from models.ifex.ifex_ast import Struct, Member
+    templates = {
+        'AST-test.tpl': "{% for n in item.namespaces %}{% for s in n.structs + n.structs %}{{ gen(s) }};{% endfor %}"
+                        "{% endfor %}{{ gen(item.namespaces[0], 'Counted.tpl') }}{{ gen(item.namespaces[0], 'Counted.tpl') }}",
+        'Struct-test.tpl': "{# ifex:pure #}\n{{ item.name }}({{ gen(item.members)|join(',') }})",
+        'Member-test.tpl': "{#- ifex:pure -#}{{ item.name }}",
+        # Not pure: The output changes each time
+        'Counted.tpl': "[{{ count() }}]",
+    }
+    for name, text in templates.items():
+        (tmp_path / name).write_text(text)
+    ast = AST(namespaces=[Namespace(name="ns", structs=[Struct(name=f"s{i}", members=[Member(name="a", datatype="uint8")])
+                                                        for i in range(3)])])
+    calls = []
+    def count():
+        calls.append(1)
+        return len(calls)
+
+    expected = ifex_generator.Generator(str(tmp_path), count=count).gen(ast)
+    assert expected == "s0(a);s1(a);s2(a);s0(a);s1(a);s2(a);[1][2]"
+    calls.clear()
+    generator = ifex_generator.Generator(str(tmp_path), render_cache=True, count=count)
+    assert generator.gen(ast) == expected
+    assert generator.render_cache.stats() == {'Member-test.tpl': (0, 3), 'Struct-test.tpl': (3, 3)}
+
+    # The cache is only valid for one run
+    calls.clear()
+    ast.namespaces[0].structs[0].name = "changed"
+    assert "".join(generator.stream(ast)).startswith("changed(a);s1(a)")
+    assert generator.render_cache.stats()['Struct-test.tpl'] == (6, 6)
+
+    # Comments are not part of compiled templates.  The markers of precompiled templates come from the manifest of
+    # the package, even if it is shipped without the template sources.
+    from output_filters.templates import TemplateCompiler
+    ast.namespaces[0].structs[0].name = "s0"
+    TemplateCompiler.compile_template_dir(str(tmp_path))
+    generator = ifex_generator.Generator(str(tmp_path), bytecode_cache=False, render_cache=True, count=count)
+    for name in ['Struct-test.tpl', 'Member-test.tpl']:
+        (tmp_path / name).unlink()
+    calls.clear()
+    assert generator.gen(ast) == expected
+    assert generator.render_cache.stats() == {'Member-test.tpl': (0, 3), 'Struct-test.tpl': (3, 3)}
+
+
 def test_ast_gen():
     service = ifex_parser.get_ast_from_yaml_file(os.path.join(TestPath, 'test.ifex.sample', 'input.yaml'))
 
@@ -0,0 +1,56 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test helpers: Synthetic IFEX models, used by the unit tests and the benchmarks
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from models.ifex.ifex_ast import *
+
+# The model is built from plain loops with predictable names, so that two calls with the same parameters always
+# produce equal trees.  The names follow the pattern <kind><number> so that any node can be found again from a test
+# (e.g. namespace 3, method 7 => ns3/if3/m7).
+
+def make_method(n, args=3):
+    return Method(name=f"m{n}",
+                  description=f"Method number {n}",
+                  input=[Argument(name=f"in{a}", datatype="uint32") for a in range(args)],
+                  output=[Argument(name=f"out{a}", datatype="string") for a in range(args)],
+                  errors=[Error(name="err", datatype="Status")])
+
+def make_struct(n, members=4):
+    return Struct(name=f"s{n}",
+                  description=f"Struct number {n}",
+                  members=[Member(name=f"mem{m}", datatype="int64") for m in range(members)])
+
+def make_enumeration(n, options=4):
+    return Enumeration(name=f"e{n}",
+                       datatype="uint8",
+                       options=[Option(name=f"opt{o}", value=o) for o in range(options)])
+
+def make_namespace(n, methods=20, structs=5, enumerations=5, args=3):
+    interface = Interface(name=f"if{n}",
+                          description=f"Interface number {n}",
+                          methods=[make_method(m, args) for m in range(methods)],
+                          events=[Event(name=f"ev{m}", input=[Argument(name="value", datatype="uint8")])
+                                  for m in range(methods // 4)],
+                          properties=[Property(name=f"p{m}", datatype="boolean") for m in range(methods // 4)])
+    return Namespace(name=f"ns{n}",
+                     description=f"Namespace number {n}",
+                     structs=[make_struct(s) for s in range(structs)],
+                     enumerations=[make_enumeration(e) for e in range(enumerations)],
+                     typedefs=[Typedef(name=f"t{t}", datatype="uint16") for t in range(structs)],
+                     interface=interface)
+
+def make_synthetic_ast(namespaces=10, methods=20, structs=5, enumerations=5, args=3):
+    """Return an AST with the given number of top-level namespaces, each with one interface"""
+    return AST(name="synthetic",
+               namespaces=[make_namespace(n, methods, structs, enumerations, args) for n in range(namespaces)])
+
+def count_nodes(node):
+    """Count the AST nodes (dataclass instances) in the tree below and including node"""
+    if isinstance(node, list):
+        return sum(count_nodes(x) for x in node)
+    if not hasattr(node, '__dataclass_fields__'):
+        return 0
+    return 1 + sum(count_nodes(getattr(node, f)) for f in node.__dataclass_fields__)
@@ -0,0 +1,138 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for applying augmenting layers (transformers/apply_layer.py)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from fnmatch import fnmatchcase
+from models.ifex.ifex_ast import *
+from models.ifex.ifex_paths import child_nodes
+from tests.helpers import make_synthetic_ast
+from transformers.apply_layer import apply_layer, read_layer_file, compile_layer, LayerStore, CHILD_NODE_FIELDS
+import os
+import random
+
+# HELPERS
+
+TestPath = os.path.dirname(os.path.realpath(__file__))
+example_layer = os.path.join(TestPath, '..', 'layer_types', 'ValueConstraint', 'example.ilay')
+
+def example_core():
+    method = Method(name="special_method",
+                    input=[Argument(name="important_value", datatype="double"),
+                           Argument(name="other", datatype="double")],
+                    output=[Argument(name="out1", datatype="uint16"), Argument(name="out2", datatype="uint32")],
+                    returns=[Argument(name="constrainted_return_value", datatype="uint8")])
+    event = Event(name="temp_alert", input=[Argument(name="inside", datatype="Temperature"),
+                                            Argument(name="outside", datatype="Temperature"),
+                                            Argument(name="sensor", datatype="string")])
+    interface = Interface(name="MyTimedProperties", methods=[method, Method(name="other_method")], events=[event],
+                          properties=[Property(name="speed", datatype="uint16"), Property(name="rpm", datatype="uint16")])
+    return AST(namespaces=[Namespace(name="_", interface=interface)])
+
+# Reference implementation: Try every rule on every node
+def naive_apply(node, rules, path='', result=None):
+    result = {} if result is None else result
+    for segment, child in child_nodes(node):
+        field_name = segment.split('/')[0] if '/' in segment else ('interface' if isinstance(child, Interface) else 'namespaces')
+        child_path = segment if path == '' else f"{path}/{segment}"
+        entries = []
+        for rule in rules:
+            value = rule.get(field_name, [])
+            entries.extend(value if isinstance(value, list) else [value])
+        matched = [r for r in entries if
+                   ('name' not in r or child.name is not None and fnmatchcase(child.name, r['name'])) and
+                   ('datatype' not in r or getattr(child, 'datatype', None) is not None and
+                                           fnmatchcase(child.datatype, r['datatype']))]
+        if matched:
+            for r in matched:
+                data = {k: v for k, v in r.items() if k not in ('name', 'datatype') and k not in CHILD_NODE_FIELDS}
+                if data:
+                    result.setdefault(child_path, {}).update(data)
+            naive_apply(child, matched, child_path, result)
+    return result
+
+# PYTEST ACTUAL TESTS:
+
+def test_apply_example_layer():
+    result = apply_layer(example_core(), read_layer_file(example_layer))
+    prefix = "_/MyTimedProperties"
+    assert result == {
+        f"{prefix}/methods/special_method/input/important_value": {"min_value": -4.714, "max_value": -4.512},
+        f"{prefix}/methods/special_method/output/out1": {"min_value": 400},
+        f"{prefix}/methods/special_method/output/out2": {"min_value": 400},
+        f"{prefix}/methods/special_method/returns/constrainted_return_value": {"min_value": 1, "max_value": 2},
+        f"{prefix}/events/temp_alert/input/inside": {"min_value": -273.15},
+        f"{prefix}/events/temp_alert/input/outside": {"min_value": -273.15},
+        f"{prefix}/properties/speed": {"min_value": "2ms", "max_value": "10ms", "action": "log"},
+        f"{prefix}/properties/rpm": {"min_value": "2ms", "max_value": "10ms", "action": "log"},
+    }
+
+def test_later_rules_override():
+    layer = {"namespaces": [{"name": "ns0", "structs": [{"name": "*", "size": 1, "packed": True},
+                                                        {"name": "s1", "size": 2},
+                                                        {"name": "s?", "size": 3, "members": [{"datatype": "int*", "bits": 8}]}]}]}
+    result = apply_layer(make_synthetic_ast(namespaces=2), layer)
+    assert result["ns0/structs/s0"] == {"size": 3, "packed": True}
+    assert result["ns0/structs/s1"] == {"size": 3, "packed": True}
+    assert result["ns0/structs/s1/members/mem0"] == {"bits": 8}
+    assert not any(path.startswith("ns1") for path in result)
+
+def test_matches_naive_implementation():
+    ast = make_synthetic_ast(namespaces=3, methods=12)
+    names = ["m1", "m1*", "m?", "*1", "m[12]*", "*", "x*", "in*", "out?", "*0", "ev*", "p[0-3]", "if*", "ns*", "nope"]
+    datatypes = ["uint32", "uint*", "string", "*", "Status"]
+    rng = random.Random(1)
+
+    def rules(fields, depth):
+        result = []
+        for i in range(rng.randint(1, 6)):
+            rule = {}
+            if rng.random() < 0.8:
+                rule["name"] = rng.choice(names)
+            if rng.random() < 0.3:
+                rule["datatype"] = rng.choice(datatypes)
+            rule[f"value{i}"] = rng.randint(0, 100)
+            if depth < 3:
+                for f in rng.sample(fields, 2):
+                    rule[f] = rules(fields, depth + 1)
+            result.append(rule)
+        return result
+
+    fields = ["namespaces", "methods", "input", "output", "events", "properties", "structs", "members"]
+    for _ in range(30):
+        layer = {"namespaces": rules(fields, 0)}
+        for ns in layer["namespaces"]:
+            ns["interface"] = rules(fields, 1)
+        assert apply_layer(ast, compile_layer(layer)) == naive_apply(ast, [layer])
+
+def test_layer_store():
+    store = LayerStore(example_core())
+    store.add_layer("constraints", example_layer)
+    timing = {"namespaces": [{"name": "_", "interface": {"properties": [{"name": "speed", "max_period": "5ms"},
+                                                                        {"name": "rpm", "action": "block"}]}}]}
+    store.add_layer("timing", timing)
+
+    speed = "_/MyTimedProperties/properties/speed"
+    rpm = "_/MyTimedProperties/properties/rpm"
+    assert store.get(speed, "max_period") == "5ms"
+    assert store.get(speed, "max_value") == "10ms"
+    assert store.get(rpm, "action") == "block"
+    assert store.get(rpm, "delta", "none") == "none"
+    assert store.attributes(speed) == {"min_value": "2ms", "max_value": "10ms", "action": "log", "max_period": "5ms"}
+    assert store.layer_attributes("constraints", rpm)["action"] == "log"
+    assert len(store.tables["timing"]) == 2
+
+    # Layers are dropped independently
+    store.remove_layer("timing")
+    assert store.get(rpm, "action") == "log"
+    assert store.get(speed, "max_period") is None
+    store.remove_layer("constraints")
+    assert store.attributes(speed) == {}
+
+if __name__ == '__main__':
+    test_apply_example_layer()
+    test_later_rules_override()
+    test_matches_naive_implementation()
+    test_layer_store()
@@ -0,0 +1,59 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for the D-Bus XML generator (output_filters/DBus/dbus_generator.py)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from models.ifex.ifex_ast import *
+from models.ifex.ifex_parser import get_ast_from_yaml_file
+from output_filters.DBus import dbus_generator
+from tests.helpers import make_synthetic_ast
+import io
+import os
+
+# HELPERS
+
+TestPath = os.path.dirname(os.path.realpath(__file__))
+
+def empty_elements_ast():
+    # Elements without children, and a namespace that generates nothing
+    interface = Interface(name="Empty_if",
+                          methods=[Method(name="no_args"), Method(name="ping", input=[Argument(name="x", datatype="uint8")])],
+                          events=[Event(name="changed"), Event(name="moved", input=[Argument(name="to", datatype="int16")])],
+                          properties=[Property(name="speed", datatype="double", description="km/h\nrounded")])
+    return AST(namespaces=[Namespace(name="a", interface=interface), Namespace(name="nothing")])
+
+def corpus():
+    for subdir in sorted(os.listdir(TestPath)):
+        if subdir.startswith('test.ifex.'):
+            yield get_ast_from_yaml_file(os.path.join(TestPath, subdir, 'input.yaml'))
+    yield make_synthetic_ast(namespaces=3, methods=4)
+    yield empty_elements_ast()
+    yield AST(namespaces=[Namespace(name="b", interface=Interface(name="Nothing_if"))])
+    yield AST(namespaces=[Namespace(name="c", typedefs=[Typedef(name="t", datatype="uint8")])])
+    yield AST(namespaces=[Namespace(name="d", interface=Interface(name="If", structs=[
+        Struct(name="s", description="multi\nline", members=[Member(name="m", datatype="uint8")])]))])
+    yield AST()
+
+# PYTEST ACTUAL TESTS:
+
+def test_same_output_as_lxml():
+    # The templates write the same layout as the lxml pretty-printer (golden output)
+    for ast in corpus():
+        direct = dbus_generator.generate(ast)
+        assert direct == dbus_generator.generate(ast, normalize=True)
+        out = io.StringIO()
+        dbus_generator.write(ast, out)
+        assert out.getvalue() == direct
+
+def test_empty_elements():
+    xml = dbus_generator.generate(empty_elements_ast())
+    assert '    <method name="no_args"/>\n' in xml
+    assert '    <signal name="changed"/>\n' in xml
+    assert '      <arg type="n" name="to"/>\n' in xml
+    assert dbus_generator.generate(AST()) == '<node xmlns:doc="http://www.freedesktop.org/dbus/1.0/doc.dtd"/>\n'
+
+if __name__ == '__main__':
+    test_same_output_as_lxml()
+    test_empty_elements()
@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for the D-Bus type signatures (models/DBus/dbus_types.py)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from models.DBus.dbus_types import DBusTypeError, SignatureResolver
+from models.ifex.ifex_ast import *
+import pytest
+
+# HELPERS
+
+def struct(name, *datatypes):
+    return Struct(name=name, members=[Member(name=f"m{i}", datatype=t) for i, t in enumerate(datatypes)])
+
+def scoped_ast():
+    # "Pos" is defined differently at each level
+    method = Method(name="move", input=[Argument(name="to", datatype="Pos")])
+    interface = Interface(name="Seating", methods=[method], structs=[struct("Pos", "uint8", "Level")])
+    inner = Namespace(name="inner", interface=interface, structs=[struct("Pos", "int16")],
+                      typedefs=[Typedef(name="Level", datatype="Pos[]")])
+    outer = Namespace(name="outer", namespaces=[inner], structs=[struct("Pos", "double")],
+                      enumerations=[Enumeration(name="Mode", datatype="uint8", options=[Option(name="on", value=1)])])
+    return AST(namespaces=[outer, Namespace(name="other", typedefs=[Typedef(name="Only", datatype="Mode")])]), method
+
+# PYTEST ACTUAL TESTS:
+
+def test_signatures():
+    types = SignatureResolver(AST(namespaces=[Namespace(name="ns",
+        structs=[struct("Point", "int32", "int32"), struct("Line", "Point", "Point[]", "string")],
+        typedefs=[Typedef(name="Path", datatype="Line[]")])]))
+    assert types.signature("uint8[]") == "ay"
+    assert types.signature("Line") == "((ii)a(ii)s)"
+    assert types.signature("Path[]") == "aa((ii)a(ii)s)"
+    assert types.signature("nothing") == "UNKNOWN_TYPE(nothing)"
+    assert types.signature(["uint8", "Point"]) == "uint8 => y\nPoint => (ii)\n"
+
+def test_scopes():
+    ast, method = scoped_ast()
+    types = SignatureResolver(ast)
+    # From the method, "Pos" is the struct of the interface.  Its member "Level" is found in the namespace, and the
+    # "Pos" in that typedef is the namespace's own.
+    assert types.signature("Pos", method) == "(ya(n))"
+    assert types.signature("Pos", ast.namespaces[0]) == "(d)"
+    assert types.signature("outer.inner.Pos") == "(n)"
+    # Names that are not visible from the scope are still found
+    assert types.signature("Only", ast.namespaces[0]) == "y"
+    assert types.signature("Mode", method) == "y"
+
+def test_cache():
+    structs = [struct("s0", "uint8")] + [struct(f"s{i}", f"s{i-1}", f"s{i-1}") for i in range(1, 12)]
+    types = SignatureResolver(Namespace(name="deep", structs=structs))
+    computed = []
+    resolve = types._definition_signature
+    types._definition_signature = lambda d, scope: computed.append(d.name) or resolve(d, scope)
+
+    # Each struct is expanded once, although s11 contains s0 2^11 times
+    assert types.signature("s1") == "((y)(y))"
+    assert len(types.signature("s11")) == 5 * 2 ** 11 - 2
+    assert types.signature("s11") is types.signature("s11")
+    assert sorted(set(computed)) == sorted(f"s{i}" for i in range(12))
+    assert types.signature(structs[5]) == types.signature("s5")
+
+def test_recursive_types():
+    types = SignatureResolver(Namespace(name="r", structs=[struct("Node", "uint8", "Child[]")],
+                                        typedefs=[Typedef(name="Child", datatype="Node")]))
+    with pytest.raises(DBusTypeError, match="Node -> Child -> Node"):
+        types.signature("Node")
+    with pytest.raises(DBusTypeError, match="Child -> Node -> Child"):
+        types.signature("Child")
+
+if __name__ == '__main__':
+    test_signatures()
+    test_scopes()
+    test_cache()
+    test_recursive_types()
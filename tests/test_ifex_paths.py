@@ -0,0 +1,49 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for node paths (models/ifex/ifex_paths.py)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from models.ifex.ifex_ast import *
+from models.ifex.ifex_paths import PathIndex, find_by_path, walk_path
+from tests.helpers import make_synthetic_ast, count_nodes
+
+# PYTEST ACTUAL TESTS:
+
+def test_paths():
+    move = Method(name="move", input=[Argument(name="seat", datatype="uint8")])
+    nested = Namespace(name="inner", structs=[Struct(name="Position")])
+    ast = AST(namespaces=[Namespace(name="seats", interface=Interface(name="Seating", methods=[move]),
+                                    includes=[Include(file="common.yaml")], namespaces=[nested])])
+    index = PathIndex(ast)
+
+    for path, node in [("", ast),
+                       ("seats/Seating/methods/move", move),
+                       ("seats/Seating/methods/move/input/seat", move.input[0]),
+                       ("seats/includes/0", ast.namespaces[0].includes[0]),
+                       ("seats/inner/structs/Position", nested.structs[0])]:
+        assert index[path] is node
+        assert find_by_path(ast, path) is node
+        assert index.path_of(node) == path
+
+    assert index.parent(move) is ast.namespaces[0].interface
+    assert index.parent(ast) is None
+    assert index.get("seats/Seating/methods/stop") is None
+    assert walk_path(ast, "seats/Seating/methods/stop") is None
+
+def test_index_matches_walk_path():
+    ast = make_synthetic_ast(namespaces=3, methods=4)
+    index = PathIndex(ast)
+    assert len(index) == count_nodes(ast)
+    for path in index.nodes:
+        assert [id(n) for n in index.ancestors(path)] == [id(n) for n in walk_path(ast, path)]
+
+    # The same path finds the corresponding node in another model
+    other = PathIndex(make_synthetic_ast(namespaces=2, methods=4))
+    assert other["ns1/if1/methods/m3"] == index["ns1/if1/methods/m3"]
+    assert "ns2" in index and "ns2" not in other
+
+if __name__ == '__main__':
+    test_paths()
+    test_index_matches_walk_path()
@@ -0,0 +1,133 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for incremental generation of output files (models/ifex/ifex_incremental.py)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from models.ifex.ifex_ast import *
+from models.ifex.ifex_generator import Generator
+from models.ifex.ifex_generator import GeneratorError
+from models.ifex.ifex_incremental import MANIFEST, Output, declared_outputs, generate_files, split_outputs, topmost_paths
+import pytest
+from tests.helpers import make_synthetic_ast
+import os
+
+# HELPERS
+
+TEMPLATES = {
+    'Namespace-test.txt': "{{ item.name }}: {% for s in item.structs %}{{ gen(s) }} {% endfor %}",
+    'Struct-test.txt': "{% include 'struct_body.txt' %}",
+    'struct_body.txt': "{{ item.name }}",
+    'Interface-test.txt': "interface {{ item.name }}",
+    'Extra.txt': "extra {{ gen(extra) }}",
+}
+
+def template_dir(tmp_path):
+    directory = tmp_path / 'templates'
+    directory.mkdir()
+    for name, text in TEMPLATES.items():
+        (directory / name).write_text(text)
+    return directory
+
+def run(directory, ast, output_dir, **template_globals):
+    generator = Generator(str(directory), **template_globals)
+    return generate_files(generator, ast, split_outputs(generator, ast), str(output_dir))
+
+# PYTEST ACTUAL TESTS:
+
+def test_topmost_paths():
+    assert topmost_paths(['a/b', 'a', 'a-b/c', 'x/y/z', 'x/y']) == {'a', 'a-b/c', 'x/y'}
+    assert topmost_paths(['a/b', '']) == {''}
+
+def test_incremental(tmp_path):
+    templates = template_dir(tmp_path)
+    out = tmp_path / 'out'
+    ast = make_synthetic_ast(namespaces=3, methods=2, structs=2)
+
+    assert run(templates, ast, out) == {'ns0.txt': 'written', 'ns1.txt': 'written', 'ns2.txt': 'written'}
+    assert (out / 'ns1.txt').read_text() == "ns1: s0 s1 \n"
+    assert run(templates, ast, out) == {'ns0.txt': 'skipped', 'ns1.txt': 'skipped', 'ns2.txt': 'skipped'}
+    mtime = os.stat(out / 'ns0.txt').st_mtime_ns
+
+    # A changed node: Only the output that contains it is rendered.  If the output is the same, the file is kept.
+    ast.namespaces[1].structs[0].name = "renamed"
+    ast.namespaces[2].structs[0].description = "not in the output"
+    assert run(templates, ast, out) == {'ns0.txt': 'skipped', 'ns1.txt': 'written', 'ns2.txt': 'unchanged'}
+    assert (out / 'ns1.txt').read_text() == "ns1: renamed s1 \n"
+    assert os.stat(out / 'ns0.txt').st_mtime_ns == mtime
+
+    # A changed template, also an included one
+    (templates / 'struct_body.txt').write_text("struct {{ item.name }}")
+    assert set(run(templates, ast, out).values()) == {'written'}
+    assert (out / 'ns0.txt').read_text() == "ns0: struct s0 struct s1 \n"
+
+    # Files that were modified or removed are generated again
+    (out / 'ns0.txt').write_text("edited")
+    os.remove(out / 'ns2.txt')
+    assert run(templates, ast, out) == {'ns0.txt': 'written', 'ns1.txt': 'skipped', 'ns2.txt': 'written'}
+
+    # Without the manifest, everything is rendered, but nothing is rewritten
+    os.remove(out / MANIFEST)
+    assert set(run(templates, ast, out).values()) == {'unchanged'}
+
+    # One file per node needs a default template for the node type (simple/ has none for Interface)
+    assert sorted(o.filename for o in split_outputs(Generator(str(templates)), ast, 'interfaces')) == \
+           ['ns0.if0.txt', 'ns1.if1.txt', 'ns2.if2.txt']
+    with pytest.raises(GeneratorError, match="no default template for Interface"):
+        split_outputs(Generator("simple"), ast, 'interfaces')
+
+def test_untracked_nodes(tmp_path):
+    templates = template_dir(tmp_path)
+    ast = make_synthetic_ast(namespaces=1, methods=1)
+    extra = Interface(name="outside")
+    generator = Generator(str(templates), extra=extra)
+    outputs = [Output("extra.txt", ast.namespaces[0], "Extra.txt")]
+
+    # The output renders a node that is not part of the tree, so it can not be skipped
+    assert generate_files(generator, ast, outputs, str(tmp_path / 'out')) == {'extra.txt': 'written'}
+    extra.name = "changed"
+    assert generate_files(generator, ast, outputs, str(tmp_path / 'out')) == {'extra.txt': 'written'}
+    assert (tmp_path / 'out' / 'extra.txt').read_text() == "extra interface changed\n"
+
+def test_declared_outputs(tmp_path):
+    templates = template_dir(tmp_path)
+    (templates / 'Interface-header.h').write_text("{# ifex:output {{ path|replace('/', '.') }}.h #}\n"
+                                                  "header {{ item.name }}")
+    (templates / 'Interface-source.c').write_text("{#- ifex:output src/{{ item.name }}.c -#}source {{ item.name }}")
+    ast = make_synthetic_ast(namespaces=3, methods=1)
+    generator = Generator(str(templates))
+    outputs = declared_outputs(generator, ast)
+    assert [(o.filename, o.template) for o in outputs[:2]] == [('ns0.if0.h', 'Interface-header.h'),
+                                                               ('src/if0.c', 'Interface-source.c')]
+    assert len(outputs) == 6
+
+    out = tmp_path / 'out'
+    assert set(generate_files(generator, ast, outputs, str(out), workers=4).values()) == {'written'}
+    assert (out / 'ns2.if2.h').read_text() == "header if2\n"
+    assert (out / 'src' / 'if1.c').read_text() == "source if1\n"
+
+    # Files of nodes that were removed from the tree are removed as well
+    del ast.namespaces[2]
+    results = generate_files(generator, ast, declared_outputs(generator, ast), str(out), workers=4)
+    assert results == {'ns0.if0.h': 'skipped', 'src/if0.c': 'skipped', 'ns1.if1.h': 'skipped',
+                       'src/if1.c': 'skipped', 'ns2.if2.h': 'removed', 'src/if2.c': 'removed'}
+    assert sorted(os.listdir(out / 'src')) == ['if0.c', 'if1.c']
+
+    # Each file can only be the output of one node, inside the output directory
+    (templates / 'Struct-test.txt').write_text("{# ifex:output {{ item.name }}.txt #}")
+    with pytest.raises(GeneratorError, match="already the output of 'ns0/structs/s0'"):
+        declared_outputs(Generator(str(templates)), ast)
+    (templates / 'Struct-test.txt').write_text("{# ifex:output ../{{ path }}.txt #}")
+    with pytest.raises(GeneratorError, match="not a file in the output directory"):
+        declared_outputs(Generator(str(templates)), ast)
+
+    # Without declared outputs, there are none
+    assert declared_outputs(Generator("simple"), ast) == []
+
+if __name__ == '__main__':
+    import pathlib, tempfile
+    test_topmost_paths()
+    for test in [test_incremental, test_untracked_nodes, test_declared_outputs]:
+        with tempfile.TemporaryDirectory() as tmp:
+            test(pathlib.Path(tmp))
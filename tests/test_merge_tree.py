@@ -6,11 +6,16 @@
 # vim: sw=4 et
 
 from models.ifex.ifex_ast import *
-from models.common.ast_utils import ast_as_yaml
+from models.common.ast_utils import ast_as_yaml, freeze, is_frozen, plain_type
 from models.ifex.ifex_parser import get_ast_from_yaml_file
 from transformers.merge_overlay import *
+from dataclasses import FrozenInstanceError, replace
+from tests.helpers import make_synthetic_ast
+import copy
 import difflib
 import os
+import pickle
+import pytest
 import sys
 
 # HELPERS
@@ -51,8 +56,169 @@ def test_merge2():
 def test_merge3():
     compare("four", "five", "four+five")
 
+def test_merge_shares_untouched_nodes():
+    base = make_synthetic_ast(namespaces=3, methods=3)
+    new_method = Method(name="+added", input=[Argument(name="x", datatype="uint8")])
+    overlay = AST(namespaces=[Namespace(name="ns1", interface=Interface(name="if1", methods=[new_method]))])
+
+    merged = merge_asts(base, overlay)
+
+    # Untouched parts of the base tree are referenced, not copied
+    assert merged.namespaces[0] is base.namespaces[0]
+    assert merged.namespaces[2] is base.namespaces[2]
+    assert merged.namespaces[1].structs is base.namespaces[1].structs
+    assert merged.namespaces[1].interface.methods[0] is base.namespaces[1].interface.methods[0]
+
+    # Modified path is new, and neither input was modified
+    assert merged.namespaces[1] is not base.namespaces[1]
+    assert [m.name for m in base.namespaces[1].interface.methods] == ["m0", "m1", "m2"]
+    assert [m.name for m in merged.namespaces[1].interface.methods] == ["m0", "m1", "m2", "added"]
+    assert new_method.name == "+added"
+    assert merged.namespaces[1].interface.methods[3].input is new_method.input
+
+def test_merge_frozen():
+    base = make_synthetic_ast(namespaces=2, methods=2)
+    overlay = AST(namespaces=[Namespace(name="ns0", description="changed")])
+    expected = merge_asts(base, overlay)
+    merged = merge_asts(base, overlay, freeze=True)
+
+    # The complete result is frozen, including the subtrees that it shares with the inputs, so nothing can be
+    # modified through the result
+    assert is_frozen(merged) and is_frozen(merged.namespaces[0])
+    with pytest.raises(FrozenInstanceError):
+        merged.namespaces[0].name = "x"
+    with pytest.raises(TypeError):
+        merged.namespaces.append(Namespace(name="x"))
+    assert merged.namespaces[1] is base.namespaces[1] and is_frozen(base.namespaces[1])
+    with pytest.raises(FrozenInstanceError):
+        merged.namespaces[1].interface.name = "x"
+    with pytest.raises(TypeError):
+        merged.namespaces[0].interface.methods.append(Method(name="added"))
+
+    # Input nodes that the result does not contain are not frozen
+    assert not is_frozen(base) and not is_frozen(base.namespaces[0]) and not is_frozen(overlay.namespaces[0])
+    base.name = "still modifiable"
+    overlay.namespaces[0].description = "also modifiable"
+    assert not is_frozen(Namespace(name="new"))
+
+    # Frozen nodes keep their type name, compare equal to normal nodes, and copies of them are frozen too
+    assert type(merged).__name__ == "AST" and plain_type(merged) is AST and isinstance(merged, AST)
+    assert merged == expected and expected == merged
+    copied = copy.deepcopy(merged)
+    assert is_frozen(copied) and copied == expected
+    assert is_frozen(pickle.loads(pickle.dumps(merged)))
+    assert not is_frozen(replace(merged, name="modifiable copy"))
+
+    # Still printable, and the frozen result can be used as base of another merge
+    assert "changed" in ast_as_yaml(merged)
+    again = merge_asts(merged, AST(namespaces=[Namespace(name="ns1", description="again")]), freeze=True)
+    assert again.namespaces[0] is merged.namespaces[0]
+    assert again.namespaces[1].description == "again"
+
+
+def test_frozen_yaml():
+    # Empty lists are left out of the YAML output, also when they are FrozenLists
+    for tree in [AST(name='x', namespaces=[Namespace(name='n')]), make_synthetic_ast(namespaces=2, methods=2)]:
+        assert ast_as_yaml(freeze(copy.deepcopy(tree))) == ast_as_yaml(tree)
+    base = make_synthetic_ast(namespaces=2, methods=2)
+    overlay = AST(namespaces=[Namespace(name="ns0", description="changed", interface=Interface(name="if0"))])
+    assert ast_as_yaml(merge_asts(base, overlay, freeze=True)) == ast_as_yaml(merge_asts(base, overlay))
+
+def merge_pairwise(base, overlays):
+    for overlay in overlays:
+        base = merge_asts(base, overlay)
+    return base
+
+def read(f):
+    return get_ast_from_yaml_file(os.path.join(merge_test_dir, f))
+
+def test_merge_many_matches_pairwise():
+    for base, overlays in [("one", ["two", "three"]),
+                           ("one", ["three", "two"]),
+                           ("one", ["two", "three", "two", "async"]),
+                           ("four", ["five", "five"])]:
+        base = read(base)
+        overlays = [read(f) for f in overlays]
+        assert merge_many(base, overlays) == merge_pairwise(base, overlays)
+
+    # Removal and re-adding across layers, new interface added by a layer, and an empty layer
+    base = make_synthetic_ast(namespaces=3, methods=3)
+    overlays = [AST(namespaces=[Namespace(name="ns0", interface=Interface(name="if0", methods=[Method(name="-m1")]))]),
+                AST(),
+                AST(namespaces=[Namespace(name="ns0", interface=Interface(name="if0", methods=[Method(name="+m1", description="back")])),
+                                Namespace(name="+new", interface=Interface(name="newif"))]),
+                AST(namespaces=[Namespace(name="new", interface=Interface(name="newif", methods=[Method(name="m")])),
+                                Namespace(name="ns2", typedefs=[Typedef(name="t0", datatypes=["-x", "y"])])])]
+    many = merge_many(base, overlays)
+    assert many == merge_pairwise(base, overlays)
+    assert [m.name for m in many.namespaces[0].interface.methods] == ["m0", "m2", "m1"]
+    assert many.namespaces[1] is base.namespaces[1]
+
+def test_incremental_merge():
+    base = make_synthetic_ast(namespaces=4, methods=4)
+    def layer(description):
+        return [AST(namespaces=[Namespace(name="ns0", description="layer0"),
+                                Namespace(name="ns1", interface=Interface(name="if1", methods=[Method(name="m1", description="layer0")]))]),
+                AST(namespaces=[Namespace(name="ns1", interface=Interface(name="if1", methods=[Method(name="m2", description=description)])),
+                                Namespace(name="ns2", description=description)])]
+
+    layers = layer("first")
+    incremental = IncrementalMerge(base, layers)
+    first = incremental.result
+    assert first == merge_many(base, layers)
+
+    # Replace layer 1 with modified content: Subtrees that are not touched by the modification are reused
+    modified = layer("second")[1]
+    second = incremental.set_layer(1, modified)
+    assert second == merge_many(base, [layers[0], modified])
+    assert second.namespaces[0] is first.namespaces[0]
+    assert second.namespaces[1].interface.methods[1] is first.namespaces[1].interface.methods[1]
+    assert second.namespaces[1].interface.methods[2] is not first.namespaces[1].interface.methods[2]
+    assert second.namespaces[2].description == "second"
+
+    # Re-reading an identical layer reuses everything
+    incremental.set_layer(1, layer("second")[1])
+    assert incremental.result is second
+
+def test_merge_provenance():
+    base = make_synthetic_ast(namespaces=3, methods=3)
+    overlays = [AST(namespaces=[Namespace(name="ns0", description="layer1",
+                                          interface=Interface(name="if0", methods=[Method(name="added", description="layer1")]))]),
+                AST(namespaces=[Namespace(name="ns0", interface=Interface(name="if0", methods=[Method(name="added", description="layer2"),
+                                                                                           Method(name="m1", description="layer2")]))])]
+    files = ["base.yaml", "one.yaml", "two.yaml"]
+
+    for merge_function in [merge_many, merge_pairwise]:
+        provenance = Provenance(files)
+        if merge_function is merge_many:
+            merged = merge_many(base, overlays, provenance=provenance)
+        else:
+            merged = merge_asts(merge_asts(base, overlays[0], provenance=provenance, layer=1), overlays[1],
+                                provenance=provenance, layer=2)
+        assert merged == merge_many(base, overlays)
+
+        assert provenance.origin(merged, "ns0") == Origin(0, "base.yaml")
+        assert provenance.origin(merged, "ns0/description") == Origin(1, "one.yaml")
+        assert provenance.origin(merged, "ns0/if0/methods/m0") == Origin(0, "base.yaml")
+        assert provenance.origin(merged, "ns0/if0/methods/m1/description") == Origin(2, "two.yaml")
+        assert provenance.origin(merged, "ns0/if0/methods/m1/name") == Origin(0, "base.yaml")
+        assert provenance.origin(merged, "ns0/if0/methods/added") == Origin(1, "one.yaml")
+        assert provenance.origin(merged, "ns0/if0/methods/added/description") == Origin(2, "two.yaml")
+        assert provenance.origin(merged, "ns0/if0/methods/added/name") == Origin(1, "one.yaml")
+        assert provenance.origin(merged, "ns1/if1/methods/m0/input/in0") == Origin(0, "base.yaml")
+        with pytest.raises(KeyError):
+            provenance.origin(merged, "ns0/if0/methods/nothere/description")
+        with pytest.raises(KeyError):
+            provenance.origin(merged, "ns0/if0/methods/m1/descripton")
+
 if __name__ == '__main__':
     test_merge1()
     test_merge2()
     test_merge3()
+    test_merge_shares_untouched_nodes()
+    test_merge_frozen()
+    test_frozen_yaml()
+    test_merge_many_matches_pairwise()
+    test_incremental_merge()
+    test_merge_provenance()
 
@@ -0,0 +1,110 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for the rule_translator (model-to-model) functions
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import fields
+from models.ifex import ifex_ast
+from tests.helpers import make_synthetic_ast
+from transformers.rule_translator import Default, Preparation, transform, transform_parallel
+import inspect
+import pytest
+
+# HELPERS
+
+# IFEX -> IFEX copy.  Every field is copied with its own name, using only the Default rules, which makes the table
+# picklable (no lambdas) and thereby usable with a process pool.
+def identity_mapping_table():
+    classes = [c for _, c in inspect.getmembers(ifex_ast, inspect.isclass) if hasattr(c, '__dataclass_fields__')]
+    names = sorted({f.name for c in classes for f in fields(c)})
+    table = { Default: [(n, n) for n in names] }
+    for c in classes:
+        table[(c, c)] = []
+    return table
+
+# Numbers all Options in tree order, using a module-global counter like input_filters/franca/franca_to_ifex.py does
+option_count = 0
+
+def reset_option_count(ast, attributes):
+    global option_count
+    option_count = 0
+
+def count_option(option, attributes):
+    global option_count
+    option_count += 1
+    return f"Option {option_count}"
+
+# Numbers all Options in tree order, with a counter that the field transform keeps itself.  transform_parallel() can not
+# detect this kind of state.
+def number_options(options, count=[0]):
+    for option in options:
+        count[0] += 1
+        option.description = f"#{count[0]}"
+    return options
+
+def reject_name(name):
+    raise ValueError(f"rejected {name}")
+
+class NoExecutor:
+    def submit(self, *args):
+        raise AssertionError("A table that passes state between nodes must not be split up")
+
+# PYTEST ACTUAL TESTS:
+
+def test_transform_parallel_threads():
+    ast = make_synthetic_ast(namespaces=4, methods=4)
+    table = identity_mapping_table()
+    serial = transform(table, ast)
+    assert transform_parallel(table, ast) == serial
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        assert transform_parallel(table, ast, executor, level=2) == serial
+
+def test_transform_parallel_processes():
+    ast = make_synthetic_ast(namespaces=4, methods=4)
+    table = identity_mapping_table()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        result = transform_parallel(table, ast, executor)
+    assert result == transform(table, ast)
+    assert [ns.name for ns in result.namespaces] == [f"ns{n}" for n in range(4)]
+
+def test_transform_parallel_stateful_table():
+    ast = make_synthetic_ast(namespaces=3, methods=3)
+    table = identity_mapping_table()
+    table[(ifex_ast.AST, ifex_ast.AST)] = [Preparation(reset_option_count)]
+    table[(ifex_ast.Option, ifex_ast.Option)] = [(count_option, 'description')]
+    result = transform_parallel(table, ast, NoExecutor(), level=2)
+    assert result == transform(table, ast)
+    options = [o for ns in result.namespaces for e in ns.enumerations for o in e.options]
+    assert [o.description for o in options] == [f"Option {n}" for n in range(1, len(options) + 1)]
+
+    # A field transform with its own state is only transformed serially when the caller says so
+    table = identity_mapping_table()
+    table[(ifex_ast.Enumeration, ifex_ast.Enumeration)] = [('options', 'options', number_options)]
+    with pytest.raises(AssertionError, match="must not be split up"):
+        transform_parallel(table, ast, NoExecutor(), level=2)
+    result = transform_parallel(table, ast, NoExecutor(), level=2, stateful=True)
+    numbers = [int(o.description[1:]) for ns in result.namespaces for e in ns.enumerations for o in e.options]
+    assert len(numbers) > 1 and numbers == list(range(numbers[0], numbers[0] + len(numbers)))
+
+def test_transform_parallel_errors():
+    ast = make_synthetic_ast(namespaces=2, methods=2)
+    table = identity_mapping_table()
+    unpicklable = dict(table)
+    unpicklable[(ifex_ast.Method, ifex_ast.Method)] = [('name', 'name', lambda name: name.upper())]
+    failing = dict(table)
+    failing[(ifex_ast.Option, ifex_ast.Option)] = [('name', 'name', reject_name)]
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(TypeError, match="can not be pickled"):
+            transform_parallel(unpicklable, ast, executor)
+        # An error in a worker is raised, not hidden by transforming serially
+        with pytest.raises(ValueError, match="rejected opt0"):
+            transform_parallel(failing, ast, executor)
+
+if __name__ == '__main__':
+    test_transform_parallel_threads()
+    test_transform_parallel_processes()
+    test_transform_parallel_stateful_table()
+    test_transform_parallel_errors()
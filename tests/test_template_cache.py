@@ -0,0 +1,157 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for the template bytecode cache (output_filters/templates/TemplateCache.py)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from models.ifex.ifex_generator import Generator
+from models.protobuf import protobuf_lark
+from output_filters.protobuf import grpc_generator
+from output_filters.templates import TemplateCache, TemplateCompiler, TemplateDir
+from output_filters.templates.JinjaTemplateEnv import JinjaTemplateEnv
+from tests.helpers import make_synthetic_ast
+import os
+
+# HELPERS
+
+def counting_compiles(template_env):
+    # Count the templates that are compiled from source (not loaded from the bytecode cache)
+    compiled = []
+    original = template_env.jinja_env.compile
+    def compile(source, name=None, filename=None, *args, **kwargs):
+        compiled.append(name)
+        return original(source, name, filename, *args, **kwargs)
+    template_env.jinja_env.compile = compile
+    return compiled
+
+def render(template_dir, cache_dir, compiled=False, **options):
+    env = JinjaTemplateEnv(str(template_dir), bytecode_cache=cache_dir and str(cache_dir), compiled=compiled)
+    for key, value in options.items():
+        setattr(env.jinja_env, key, value)
+    compiled = counting_compiles(env)
+    return env.get_template("AST.tpl").render(item=make_synthetic_ast(namespaces=1, methods=1)), compiled
+
+# PYTEST ACTUAL TESTS:
+
+def test_bytecode_cache(tmp_path):
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "AST.tpl").write_text("{% for n in item.namespaces %}\n{{ n.name }}\n{% endfor %}\n")
+    cache_dir = tmp_path / "cache"
+
+    text, compiled = render(template_dir, cache_dir)
+    assert text == "ns0\n" and compiled == ["AST.tpl"]
+    assert len(os.listdir(cache_dir)) == 1
+    text, compiled = render(template_dir, cache_dir)
+    assert text == "ns0\n" and compiled == []
+
+    # A modified template is compiled again
+    (template_dir / "AST.tpl").write_text("{% for n in item.namespaces %}\n[{{ n.name }}]\n{% endfor %}\n")
+    text, compiled = render(template_dir, cache_dir)
+    assert text == "[ns0]\n" and compiled == ["AST.tpl"]
+
+    # Different whitespace settings give different code, which is cached separately
+    text, compiled = render(template_dir, cache_dir, trim_blocks=False, lstrip_blocks=False)
+    assert text == "\n[ns0]\n" and compiled == ["AST.tpl"]
+    text, compiled = render(template_dir, cache_dir)
+    assert text == "[ns0]\n" and compiled == []
+
+def test_cache_setting(tmp_path, monkeypatch):
+    # The cache is opt-in
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delenv(TemplateCache.CACHE_ENV_VARIABLE, raising=False)
+    assert TemplateCache.bytecode_cache() is None
+    monkeypatch.setenv(TemplateCache.CACHE_ENV_VARIABLE, "off")
+    assert TemplateCache.bytecode_cache() is None
+    assert not os.path.exists(os.path.join(str(tmp_path), "ifex"))
+    monkeypatch.setenv(TemplateCache.CACHE_ENV_VARIABLE, str(tmp_path / "c"))
+    assert TemplateCache.bytecode_cache().directory == str(tmp_path / "c")
+    assert TemplateCache.bytecode_cache(False) is None
+    monkeypatch.setenv(TemplateCache.CACHE_ENV_VARIABLE, "on")
+    assert TemplateCache.bytecode_cache().directory == os.path.join(str(tmp_path), "ifex", "jinja2")
+    monkeypatch.delenv(TemplateCache.CACHE_ENV_VARIABLE)
+    assert TemplateCache.bytecode_cache("on").directory == os.path.join(str(tmp_path), "ifex", "jinja2")
+
+    # Generated output is the same with and without the cache
+    ast = make_synthetic_ast(namespaces=2, methods=3)
+    assert Generator("simple", bytecode_cache=False).gen(ast) == Generator("simple", bytecode_cache="on").gen(ast) == \
+           Generator("simple", bytecode_cache="on").gen(ast)
+
+def test_compiled_templates(tmp_path):
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "AST.tpl").write_text("{% for n in item.namespaces %}\n{% include 'Namespace.tpl' %}\n{% endfor %}\n")
+    (template_dir / "Namespace.tpl").write_text("<{{ n.name }}>")
+    assert sorted(TemplateCompiler.compile_template_dir(str(template_dir))) == ["AST.tpl", "Namespace.tpl"]
+
+    # Nothing is compiled at runtime
+    text, compiled = render(template_dir, None, compiled=None)
+    assert text == "<ns0>" and compiled == []
+    assert render(template_dir, None)[0] == text
+
+    # A modified template is loaded from source, the others still from the package
+    (template_dir / "Namespace.tpl").write_text("[{{ n.name }}]")
+    text, compiled = render(template_dir, None, compiled=None)
+    assert text == "[ns0]" and compiled == ["Namespace.tpl"]
+
+    # A different environment setting needs different code
+    text, compiled = render(template_dir, None, compiled=None, trim_blocks=False)
+    assert text == render(template_dir, None, trim_blocks=False)[0] and sorted(compiled) == ["AST.tpl", "Namespace.tpl"]
+
+    # The shipped template directories compile (into a separate directory here), and give the same output
+    ast = make_synthetic_ast(namespaces=2, methods=3)
+    TemplateCompiler.compile_template_dir("simple", str(tmp_path / "simple"))
+    generator = Generator("simple", bytecode_cache=False, compiled=str(tmp_path / "simple"))
+    assert counting_compiles(generator.jinja_env) == [] and \
+           generator.gen(ast) == Generator("simple", bytecode_cache=False).gen(ast)
+
+def test_compiled_grpc_templates(tmp_path):
+    # The gRPC templates are loaded by JinjaSetup, which must also be used to compile them
+    target = str(tmp_path / "protobuf")
+    names = grpc_generator.compile_templates(target=target)
+    env = grpc_generator.JinjaSetup.JinjaTemplateEnv(grpc_generator.protobuf_ast.Proto, grpc_generator.TEMPLATE_DIR,
+                                                     bytecode_cache=False, compiled=target)
+    compiled = counting_compiles(env)
+    for name in names:
+        env.get_template(name)
+    assert len(names) > 0 and compiled == []
+
+    proto_ast = protobuf_lark.get_ast_from_proto_file(os.path.join(os.path.dirname(__file__), "test.proto.1", "input"))
+    assert grpc_generator.ast_to_text(proto_ast, grpc_generator.TEMPLATE_DIR, compiled=target) == \
+           grpc_generator.ast_to_text(proto_ast, grpc_generator.TEMPLATE_DIR, compiled=False)
+
+def test_template_map(tmp_path, monkeypatch):
+    for name in ["AST-doc.tpl", "Method.tpl", "Methods.txt", "README.md"]:
+        (tmp_path / name).write_text("")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "Struct.tpl").write_text("")
+
+    listed = []
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda d: listed.append(d) or listdir(d))
+    expected = {"AST": "AST-doc.tpl", "Method": "Methods.txt"}
+    assert TemplateDir.find_matching_template_files(str(tmp_path)) in [expected, {**expected, "Method": "Method.tpl"}]
+    assert TemplateDir.match_template_files(str(tmp_path), ["AST", "Method"], '.') == {"Method": "Method.tpl"}
+    assert len(listed) == 2
+
+    # Cached until the directory changes
+    first = TemplateDir.find_matching_template_files(str(tmp_path))
+    assert len(listed) == 2
+    (tmp_path / "Struct-doc.tpl").write_text("")
+    assert TemplateDir.find_matching_template_files(str(tmp_path)) == {**first, "Struct": "Struct-doc.tpl"}
+    assert len(listed) == 3
+
+    # Recursive search gives absolute paths
+    found = TemplateDir.find_matching_template_files(str(tmp_path), recurse=True)
+    assert found["AST"] == os.path.join(str(tmp_path), "AST-doc.tpl")
+    assert found["Struct"] in [os.path.join(str(tmp_path), "sub", "Struct.tpl"), os.path.join(str(tmp_path), "Struct-doc.tpl")]
+
+if __name__ == '__main__':
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_bytecode_cache(pathlib.Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_compiled_templates(pathlib.Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_compiled_grpc_templates(pathlib.Path(d))
@@ -0,0 +1,183 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for JSON-schema validation (output_filters/schema/validate.py)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from layer_types.utils.identify_layer import get_matching_schemas, identify_file, peek_keys, plausible_schemas
+from models.ifex.ifex_ast import AST, Argument
+from output_filters.schema.ifex_to_json_schema import collect_type_info, get_json_schema
+from output_filters.schema.validate import get_validator, schema_check, schema_check_many
+from output_filters.schema.validate_repo import discover_files, validate_files
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+# HELPERS
+
+TestPath = os.path.dirname(os.path.realpath(__file__))
+layer_types_dir = os.path.join(TestPath, '..', 'layer_types')
+timing_schema = os.path.join(layer_types_dir, 'Timing', 'schema.json')
+constraint_schema = os.path.join(layer_types_dir, 'ValueConstraint', 'schema.json')
+timing_layer = os.path.join(layer_types_dir, 'Timing', 'example-timing.ilay')
+constraint_layer = os.path.join(layer_types_dir, 'ValueConstraint', 'example.ilay')
+
+# PYTEST ACTUAL TESTS:
+
+def test_validator_cache(tmp_path):
+    assert get_validator(timing_schema) is get_validator(timing_schema)
+
+    # A modified schema file is read again
+    schema_file = tmp_path / "schema.json"
+    schema_file.write_text(json.dumps({"type": "object", "required": ["a"]}))
+    input_file = tmp_path / "input.yaml"
+    input_file.write_text("b: 1\n")
+    assert not schema_check(str(input_file), str(schema_file))
+    first = get_validator(str(schema_file))
+
+    schema_file.write_text(json.dumps({"type": "object", "required": ["b"]}))
+    os.utime(schema_file, ns=(0, os.stat(schema_file).st_mtime_ns + 10**9))
+    assert schema_check(str(input_file), str(schema_file))
+    assert get_validator(str(schema_file)) is not first
+
+def test_schema_check_many():
+    result = schema_check_many([timing_layer, constraint_layer], [timing_schema, constraint_schema])
+    assert result == {timing_layer: [timing_schema], constraint_layer: [constraint_schema]}
+    assert get_matching_schemas(timing_layer, [constraint_schema, timing_schema]) == [timing_schema]
+
+def test_identify_by_discriminators(tmp_path):
+    schemas = [timing_schema, constraint_schema]
+    assert plausible_schemas(timing_layer, schemas) == [timing_schema]    # schema: key
+    assert plausible_schemas(constraint_layer, schemas) == [constraint_schema]  # min_value is not a Timing key
+    assert identify_file(constraint_layer, schemas, validate=False) == constraint_schema
+
+    # Text in block scalars is not taken for keys
+    layer = tmp_path / "layer.ilay"
+    layer.write_text("# comment\n"
+                     "description: |\n"
+                     "  min_value: this is text\n"
+                     "namespaces:\n"
+                     "  - name: ns\n"
+                     "    interface:\n"
+                     "      name: if\n"
+                     "      properties:\n"
+                     "        - name: p\n"
+                     "          max_period: 10ms\n")
+    top_level, keys = peek_keys(str(layer))
+    assert top_level == {"description": "|", "namespaces": None}
+    assert keys == {"description", "namespaces", "name", "interface", "properties", "max_period"}
+    assert plausible_schemas(str(layer), schemas) == [timing_schema]
+    assert get_matching_schemas(str(layer), schemas) == get_matching_schemas(str(layer), schemas, fast=False) == [timing_schema]
+
+    # Not block-style YAML: No discrimination
+    layer.write_text('{"namespaces": []}')
+    assert plausible_schemas(str(layer), schemas) == schemas
+
+def test_identify_wrapped_scalars(tmp_path):
+    core_schema = tmp_path / "core.json"
+    core_schema.write_text(json.dumps(get_json_schema()))
+    schemas = [str(core_schema), timing_schema, constraint_schema]
+
+    # The continuation lines of quoted scalars and merge keys are not keys
+    core = tmp_path / "core.ifex"
+    core.write_text('name: service\n'
+                    'description: "A long description\n'
+                    '  Note: wrapped line"\n'
+                    'namespaces:\n'
+                    '  - name: ns\n'
+                    "    description: 'it''s\n"
+                    "      Also: wrapped'\n"
+                    '    interface: &if\n'
+                    '      name: if\n'
+                    '  - name: ns2\n'
+                    '    interface:\n'
+                    '      <<: *if\n')
+    assert peek_keys(str(core))[1] == {"name", "description", "namespaces", "interface"}
+    assert get_matching_schemas(str(core), schemas) == get_matching_schemas(str(core), schemas, fast=False) == \
+        [str(core_schema)]
+
+    # A misleading discriminator only costs time:  If no plausible schema matches, all are validated
+    core.write_text('name: service\n'
+                    'description: "see # Timing/schema.json"\n'
+                    'schema: Timing/schema.json\n'
+                    'namespaces:\n'
+                    '  - name: ns\n')
+    assert plausible_schemas(str(core), schemas) == [timing_schema]
+    assert get_matching_schemas(str(core), schemas) == [str(core_schema)]
+
+def test_validate_files(tmp_path):
+    shutil.copy(timing_layer, tmp_path / "timing.ilay")
+    shutil.copy(constraint_layer, tmp_path / "sub-constraint.ilay")
+    (tmp_path / "broken.ilay").write_text("namespaces:\n  - name: ns\n    interface: []\n")
+    files = discover_files(str(tmp_path))
+    state_file = str(tmp_path / "state.json")
+    schemas = [timing_schema, constraint_schema]
+
+    for jobs in [2, 1]:
+        results = {os.path.basename(r["file"]): r for r in validate_files(files, schemas, jobs=jobs)}
+        assert results["timing.ilay"]["status"] == "valid" and results["timing.ilay"]["schemas"] == [timing_schema]
+        assert results["sub-constraint.ilay"]["schemas"] == [constraint_schema]
+        assert results["broken.ilay"]["status"] == "invalid"
+        assert results["broken.ilay"]["error"].startswith("namespaces[0].interface:")
+
+    # Unchanged valid files are skipped in the next run, modified and invalid files are validated again
+    statuses = lambda: {os.path.basename(r["file"]): r["status"] for r in validate_files(files, schemas, 2, state_file)}
+    assert statuses() == {"timing.ilay": "valid", "sub-constraint.ilay": "valid", "broken.ilay": "invalid"}
+    (tmp_path / "timing.ilay").write_text("{ broken")
+    assert statuses() == {"timing.ilay": "error", "sub-constraint.ilay": "skipped", "broken.ilay": "invalid"}
+
+def test_validate_repo_entrypoint(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    shutil.copy(os.path.join(TestPath, 'test.ifex.sample', 'input.yaml'), repo / "core.ifex")
+    shutil.copy(timing_layer, repo / "timing.ilay")
+    command = [sys.executable, '-m', 'packaging.entrypoints.validate_repo', str(repo), '-j', '1']
+    run = subprocess.run(command, cwd=os.path.join(TestPath, '..'), capture_output=True, text=True)
+    results = {os.path.basename(r["file"]): r for r in map(json.loads, run.stdout.splitlines())}
+    assert run.returncode == 0, run.stdout
+    assert results["core.ifex"]["status"] == "valid"
+    assert [os.path.basename(s) for s in results["core.ifex"]["schemas"]] == ["ifex-core-idl.json"]
+    assert results["timing.ilay"]["status"] == "valid"
+    # Nothing is written into the validated directory
+    assert sorted(os.listdir(repo)) == ["core.ifex", "timing.ilay"]
+
+    # With a state file, the core schema (a new temporary file in each run) still counts as unchanged
+    state_file = str(tmp_path / "state.json")
+    for expected in ["valid", "skipped"]:
+        run = subprocess.run(command + ['--state-file', state_file], cwd=os.path.join(TestPath, '..'),
+                             capture_output=True, text=True)
+        assert {json.loads(line)["status"] for line in run.stdout.splitlines()} == {expected}
+
+def test_json_schema_generation():
+    # The in-process schema is the same as the one the script prints
+    output = subprocess.run([sys.executable, '-m', 'output_filters.schema.ifex_to_json_schema'],
+                            cwd=os.path.join(TestPath, '..'), check=True, capture_output=True, text=True).stdout
+    schema = get_json_schema()
+    assert json.loads(output) == schema
+    assert get_json_schema() is schema
+    assert get_json_schema(Argument) is get_json_schema(Argument) is not schema
+    assert schema["definitions"]["Method"]["required"] == ["name"]
+    assert schema["definitions"]["Interface"]["properties"]["methods"] == \
+        {"type": "array", "items": {"$ref": "#/definitions/Method"}}
+
+    # Collecting the types of a subtree first does not affect later calls
+    assert list(collect_type_info(Argument)) == ["Argument"]
+    assert len(collect_type_info(AST)) == len(schema["definitions"])
+
+if __name__ == '__main__':
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_validator_cache(pathlib.Path(d))
+    test_schema_check_many()
+    with tempfile.TemporaryDirectory() as d:
+        test_identify_by_discriminators(pathlib.Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_identify_wrapped_scalars(pathlib.Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_validate_files(pathlib.Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_validate_repo_entrypoint(pathlib.Path(d))
+    test_json_schema_generation()
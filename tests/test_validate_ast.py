@@ -0,0 +1,91 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Test code for validating an AST without YAML (output_filters/schema/validate_ast.py)
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+from jsonschema import Draft202012Validator
+from models.common.ast_utils import ast_as_yaml
+from models.ifex.ifex_ast import *
+from models.ifex.ifex_parser import get_ast_from_yaml_file
+from output_filters.schema.ifex_to_json_schema import get_json_schema
+from output_filters.schema.validate_ast import is_valid_ast, validate_ast
+from tests.helpers import make_synthetic_ast
+import os
+import yaml
+
+# HELPERS
+
+TestPath = os.path.dirname(os.path.realpath(__file__))
+
+def schema_errors(validator, ast):
+    # The YAML round trip that validate_ast() avoids
+    return list(validator.iter_errors(yaml.safe_load(ast_as_yaml(ast))))
+
+def broken_asts():
+    # Each of these has exactly one error.  The type checking constructors are not used for the ifex_ast classes,
+    # but the fields are assigned afterwards anyway, to make sure no constructor rejects them.
+    method = Method(name="move")
+    method.name = None
+    yield method, "seats/Seating/methods/0", "'name' is a required property"
+
+    argument = Argument(name="seat", datatype="uint8")
+    argument.datatype = 5
+    yield Method(name="move", input=[argument]), "seats/Seating/methods/move/input/seat/datatype", \
+        "5 is not of type 'string'"
+
+    struct = Struct(name="Position", members=[Member(name="x", datatype="int32")])
+    yield struct, "seats/Seating/methods/Position", "Additional properties are not allowed ('members' was unexpected)"
+
+    enumeration = Enumeration(name="Mode", datatype="uint8", options=[Option(name="on", value=1)])
+    yield enumeration, "seats/Seating/methods/Mode", \
+        "Additional properties are not allowed ('datatype', 'options' were unexpected)"
+
+def wrap(method):
+    return AST(namespaces=[Namespace(name="seats", interface=Interface(name="Seating", methods=[method]))])
+
+# PYTEST ACTUAL TESTS:
+
+def test_valid_asts():
+    sample = get_ast_from_yaml_file(os.path.join(TestPath, 'test.ifex.sample', 'input.yaml'))
+    for ast in [sample, make_synthetic_ast(namespaces=3, methods=5), AST()]:
+        assert validate_ast(ast) == []
+        assert is_valid_ast(ast)
+
+def test_errors_by_path():
+    for method, path, message in broken_asts():
+        errors = validate_ast(wrap(method))
+        assert [str(e) for e in errors] == [f"{path}: {message}"]
+
+    # Validation can stop at the first error
+    ast = wrap(Method(name="move"))
+    ast.namespaces[0].name = 7
+    ast.namespaces[0].interface.methods[0].name = ""
+    assert len(validate_ast(ast)) == 2
+    assert len(validate_ast(ast, max_errors=1)) == 1
+    assert not is_valid_ast(ast)
+
+def test_same_result_as_json_schema():
+    validator = Draft202012Validator(get_json_schema())
+    sample = get_ast_from_yaml_file(os.path.join(TestPath, 'test.ifex.sample', 'input.yaml'))
+    assert schema_errors(validator, sample) == [] and validate_ast(sample) == []
+
+    option = Option(name="on", value=1)
+    option.value = 1.5
+    # (Only whole numbers are integers)
+    enumeration = Enumeration(name="Mode", datatype="uint8", options=[option])
+    cases = [wrap(method) for method, _, _ in broken_asts()] + \
+            [AST(namespaces=[Namespace(name="seats", enumerations=[enumeration])])]
+    for ast in cases:
+        expected = schema_errors(validator, ast)
+        errors = validate_ast(ast)
+        assert len(errors) == len(expected)
+        # Required and additional property messages are worded identically
+        assert sorted(e.message for e in errors if "propert" in e.message) == \
+               sorted(e.message for e in expected if "propert" in e.message)
+
+if __name__ == '__main__':
+    test_valid_asts()
+    test_errors_by_path()
+    test_same_result_as_json_schema()
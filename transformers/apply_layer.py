@@ -0,0 +1,298 @@
+# SPDX-License-Identifier: MPL-2.0
+# ----------------------------------------------------------------------------
+# (C) 2025 MBition GmbH
+# Apply an augmenting layer (e.g. layer_types/ValueConstraint) to an IFEX Core AST
+# ----------------------------------------------------------------------------
+# vim: sw=4 et
+
+# An augmenting layer mimics the tree structure of the core IDL, and uses that structure to select the core nodes
+# that the additional data (the "metadata" fields) shall be attached to.  See layer_types/README.md.
+# Each list entry in the layer is a rule.  It selects nodes using these fields:
+#
+#  - name      Exact name, or a wildcard pattern ('*', 'get_*', 'speed_?') with the same syntax as fnmatch
+#  - datatype  Exact datatype, or a wildcard pattern.  If both name and datatype are given, both must match.
+#              A rule without name and datatype matches all nodes in the list.
+#
+# Fields with the name of a child node list in the core AST (methods, input, properties ...) contain rules for the
+# children of the selected nodes.  All other fields are the layer data that is attached to the selected nodes.  If
+# several rules select the same node, their data is combined in the order the rules are written in the layer, so a
+# later rule overrides a value set by an earlier one.
+#
+# Compiling the layer:
+#
+# Matching each rule against every candidate node would mean (number of rules) x (number of nodes) pattern matches.
+# Instead, all rules of one list (e.g. all rules below 'methods' of the same parent rule) are compiled once into a
+# _Selector:
+#
+#  - Exact names are looked up in a dict.
+#  - All wildcard patterns are combined into one regular expression, which rejects names that match no pattern at
+#    all with a single match() call.  Names that match are looked up in an index of the patterns by their literal
+#    prefix and suffix, so only patterns that can possibly match are tested individually (with fnmatchcase, which
+#    compiles each pattern on first use only).
+#  - Rules without name are indexed by exact datatype, or kept in a (usually short) list if the datatype is a pattern.
+#
+# The core AST is then walked once.  A subtree is only visited if some rule has child rules for it.
+#
+# The result is a dict from node path (see models/ifex/ifex_paths.py) to the data attached to that node.
+
+from dataclasses import is_dataclass
+from models.common.ast_utils import is_ast_class
+from models.ifex.ifex_paths import child_node_fields, child_segment
+from typing import Any, Dict
+import fnmatch
+import models.ifex.ifex_ast as ifex_ast
+import re
+import yaml
+
+# Fields that only identify the layer file and are not data for the root node
+LAYER_HEADER_FIELDS = ('schema', 'filetype')
+
+# Fields used to select nodes
+SELECTOR_FIELDS = ('name', 'datatype')
+
+# Names of all fields in the IFEX AST that contain child nodes (e.g. methods, input, interface)
+CHILD_NODE_FIELDS = frozenset(name for type_name in ifex_ast.get_ast_node_type_names()
+                              if is_ast_class(getattr(ifex_ast, type_name))
+                              for name in child_node_fields(getattr(ifex_ast, type_name)))
+
+def is_pattern(s):
+    return any(c in s for c in '*?[')
+
+def _literal_prefix(pattern):
+    return re.split(r'[*?\[]', pattern, maxsplit=1)[0]
+
+def _literal_suffix(pattern):
+    return re.split(r'[*?\]]', pattern)[-1]
+
+
+class _Rule:
+    """One list entry of the layer, see compile_layer()"""
+    __slots__ = ('order', 'name', 'datatype', 'datatype_is_pattern', 'data', 'children')
+
+    def __init__(self, order, name, datatype, data, children):
+        self.order = order          # Position in the layer file, determines the order in which data is combined
+        self.name = name
+        self.datatype = datatype
+        self.datatype_is_pattern = datatype is not None and is_pattern(datatype)
+        self.data = data            # Dict with the layer data
+        self.children = children    # Child field name -> _Selector
+
+    def datatype_matches(self, node):
+        if self.datatype is None:
+            return True
+        datatype = getattr(node, 'datatype', None)
+        if datatype is None:
+            return False
+        if self.datatype_is_pattern:
+            return fnmatch.fnmatchcase(datatype, self.datatype)
+        return datatype == self.datatype
+
+
+class _Selector:
+    """All rules of one list in the layer, compiled for fast lookup"""
+    def __init__(self, rules):
+        self.exact = {}             # name -> [rules]
+        self.by_prefix = {}         # literal prefix of pattern -> [rules]
+        self.by_suffix = {}         # literal suffix of pattern -> [rules]
+        self.any_pattern = None     # One regex matching any of the patterns
+        self.no_name = {}           # datatype -> [rules], for rules without name
+        self.no_name_patterns = []  # Rules without name, and with no datatype or a datatype pattern
+
+        patterns = set()
+        for rule in rules:
+            if rule.name is None:
+                if rule.datatype is None or rule.datatype_is_pattern:
+                    self.no_name_patterns.append(rule)
+                else:
+                    self.no_name.setdefault(rule.datatype, []).append(rule)
+            elif not is_pattern(rule.name):
+                self.exact.setdefault(rule.name, []).append(rule)
+            else:
+                patterns.add(fnmatch.translate(rule.name))
+                # Index by the longer literal part, so that the bucket contains as few patterns as possible
+                prefix, suffix = _literal_prefix(rule.name), _literal_suffix(rule.name)
+                if len(suffix) > len(prefix):
+                    self.by_suffix.setdefault(suffix, []).append(rule)
+                else:
+                    self.by_prefix.setdefault(prefix, []).append(rule)
+
+        if patterns:
+            self.any_pattern = re.compile('|'.join(sorted(patterns)))
+        # Lengths of the indexed prefixes/suffixes, so that lookup only tries those
+        self.prefix_lengths = sorted({len(p) for p in self.by_prefix})
+        self.suffix_lengths = sorted({len(s) for s in self.by_suffix})
+
+    def match(self, node):
+        """Return the rules that select node (not sorted)"""
+        name = getattr(node, 'name', None)
+        matched = []
+        if name is not None:
+            for rule in self.exact.get(name, ()):
+                if rule.datatype_matches(node):
+                    matched.append(rule)
+            if self.any_pattern is not None and self.any_pattern.match(name):
+                for length in self.prefix_lengths:
+                    for rule in self.by_prefix.get(name[:length], ()):
+                        if fnmatch.fnmatchcase(name, rule.name) and rule.datatype_matches(node):
+                            matched.append(rule)
+                for length in self.suffix_lengths:
+                    if length <= len(name):
+                        for rule in self.by_suffix.get(name[len(name) - length:], ()):
+                            if fnmatch.fnmatchcase(name, rule.name) and rule.datatype_matches(node):
+                                matched.append(rule)
+        datatype = getattr(node, 'datatype', None)
+        if datatype is not None:
+            matched.extend(self.no_name.get(datatype, ()))
+        for rule in self.no_name_patterns:
+            if rule.datatype_matches(node):
+                matched.append(rule)
+        return matched
+
+
+class CompiledLayer:
+    """A layer, compiled to be applied to any number of core ASTs"""
+    def __init__(self, root):
+        self.root = root
+
+    def apply(self, ast) -> Dict[str, Dict[str, Any]]:
+        """Return a dict from node path to the layer data for each node in ast that the layer selects"""
+        result = {}
+        if self.root.data:
+            result[''] = dict(self.root.data)
+        self._walk(ast, '', [self.root], result)
+        return result
+
+    def _walk(self, node, path, rules, result):
+        # Combine the child rules of all rules that selected this node, per child field
+        for field_name in _child_fields(rules):
+            selectors = [rule.children[field_name] for rule in rules if field_name in rule.children]
+            value = getattr(node, field_name, None)
+            if isinstance(value, list):
+                items = enumerate(value)
+            elif is_dataclass(value):
+                items = [(None, value)]
+            else:
+                continue
+            for index, child in items:
+                matched = []
+                for selector in selectors:
+                    matched.extend(selector.match(child))
+                if not matched:
+                    continue
+                matched.sort(key=lambda rule: rule.order)
+                child_path = child_segment(field_name, child, index)
+                child_path = child_path if path == '' else f"{path}/{child_path}"
+                data = {}
+                for rule in matched:
+                    data.update(rule.data)
+                if data:
+                    result.setdefault(child_path, {}).update(data)
+                if any(rule.children for rule in matched):
+                    self._walk(child, child_path, matched, result)
+
+def _child_fields(rules):
+    if len(rules) == 1:
+        return rules[0].children
+    names = {}
+    for rule in rules:
+        names.update(dict.fromkeys(rule.children))
+    return names
+
+
+def _compile_rule(entry, counter, root=False):
+    if not isinstance(entry, dict):
+        raise TypeError(f"Layer entry must be a mapping, got: {entry!r}")
+    data = {}
+    children = {}
+    for key, value in entry.items():
+        if key in CHILD_NODE_FIELDS and isinstance(value, (list, dict)):
+            entries = value if isinstance(value, list) else [value]
+            children[key] = _Selector([_compile_rule(e, counter) for e in entries])
+        elif root and key in LAYER_HEADER_FIELDS:
+            continue
+        elif not root and key in SELECTOR_FIELDS:
+            continue
+        else:
+            data[key] = value
+    counter[0] += 1
+    name = None if root else entry.get('name')
+    datatype = None if root else entry.get('datatype')
+    return _Rule(counter[0], None if name is None else str(name), None if datatype is None else str(datatype),
+                 data, children)
+
+def compile_layer(layer: Dict[str, Any]) -> CompiledLayer:
+    """Compile a layer, as read from YAML, into a CompiledLayer"""
+    # Rules are numbered in file order (the counter is shared by the whole tree)
+    counter = [0]
+    return CompiledLayer(_compile_rule(layer or {}, counter, root=True))
+
+def read_layer_file(filename) -> CompiledLayer:
+    with open(filename, 'r') as f:
+        return compile_layer(yaml.safe_load(f))
+
+def apply_layer(ast, layer) -> Dict[str, Dict[str, Any]]:
+    """Apply layer (a CompiledLayer or a layer read from YAML) to ast.  See CompiledLayer.apply()"""
+    if not isinstance(layer, CompiledLayer):
+        layer = compile_layer(layer)
+    return layer.apply(ast)
+
+
+# Layer store:
+#
+# Generators that need the data of several augmenting layers can query it from a LayerStore, instead of from a
+# merged tree.  The store keeps the core AST as it is, and one side table (node path -> data) per layer, so each
+# table only holds entries for the nodes that its layer selects.  Layers can be added and removed independently,
+# without re-applying the others.
+#
+#     store = LayerStore(ast)
+#     store.add_layer('timing', 'timing.ilay')
+#     store.add_layer('constraints', 'constraints.ilay')
+#     store.get('seats/Seating/properties/speed', 'max_period')
+#
+# If several layers define the same key for a node, the layer that was added last wins.
+
+class LayerStore:
+    def __init__(self, ast):
+        self.ast = ast
+        self.layers = {}  # Layer name -> CompiledLayer, in the order the layers were added
+        self.tables = {}  # Layer name -> {node path: data}
+
+    def add_layer(self, name, layer):
+        """Add (or replace) the layer called name.  layer is a file name, a layer read from YAML, or a CompiledLayer"""
+        if isinstance(layer, str):
+            layer = read_layer_file(layer)
+        elif not isinstance(layer, CompiledLayer):
+            layer = compile_layer(layer)
+        self.remove_layer(name)
+        self.layers[name] = layer
+        self.tables[name] = layer.apply(self.ast)
+        return self.tables[name]
+
+    def remove_layer(self, name):
+        self.layers.pop(name, None)
+        self.tables.pop(name, None)
+
+    def set_ast(self, ast):
+        """Replace the core AST (for example after re-reading it) and re-apply all layers to it"""
+        self.ast = ast
+        for name, layer in self.layers.items():
+            self.tables[name] = layer.apply(ast)
+
+    def get(self, path, key, default=None):
+        """Return the value of key for the node at path, from the last added layer that defines it"""
+        for table in reversed(self.tables.values()):
+            data = table.get(path)
+            if data is not None and key in data:
+                return data[key]
+        return default
+
+    def attributes(self, path):
+        """Return all layer data for the node at path, combined in layer order"""
+        result = {}
+        for table in self.tables.values():
+            result.update(table.get(path, ()))
+        return result
+
+    def layer_attributes(self, name, path):
+        """Return the data that the layer called name attaches to the node at path"""
+        return self.tables[name].get(path, {})
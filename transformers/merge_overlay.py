@@ -5,13 +5,16 @@
 # ----------------------------------------------------------------------------
 # vim: sw=4 et
 
+from collections import namedtuple
 from dataclasses import fields, is_dataclass, replace
-from models.common.ast_utils import ast_as_yaml
+from models.common import ast_utils
+from models.common.ast_utils import ast_as_yaml, content_hash
 from models.ifex.ifex_ast import *
 from models.ifex.ifex_parser import get_ast_from_yaml_file
+from models.ifex.ifex_paths import PathIndex
 from transformers.rule_translator import _log
 from typing import List, Any, Type
-import copy
+import hashlib
 
 def is_removal(name):
     """Check very simple rule:  Starts with '-' (minus) if it is a removal, '+' or none at all means adding"""
@@ -25,6 +28,23 @@ def name_only(name):
     return None
 
 
+# Structural sharing:
+#
+# The merge does not copy the input trees.  A node (or list) from either input that is not affected by the overlay
+# is referenced as-is in the result, and new nodes are only created along the paths that the overlay actually
+# modifies.  The cost of a merge therefore depends on the size of the overlay, not on the size of the base tree.
+#
+# The consequence is that the result shares nodes with both inputs, and modifying one of those nodes afterwards
+# would modify all trees that share it.  With freeze=True, the complete result is made read-only (see
+# ast_utils.freeze()), including the subtrees that it shares with the inputs.  Those subtrees are therefore also
+# read-only in the input trees afterwards.  Freezing stops at nodes that are already frozen, so merging onto a frozen
+# result again only freezes the new part.
+
+def _merge(merge, freeze):
+    """Return the result of merge(), made read-only with freeze=True"""
+    merged = merge()
+    return ast_utils.freeze(merged) if freeze else merged
+
 # This merges lists of simple fields (list of strings)
 def merge_field_list(list1: List[str], list2: List[str]) -> List[str]:
     merged = set(list1)
@@ -40,11 +60,12 @@ def merge_field_list(list1: List[str], list2: List[str]) -> List[str]:
             # Add to set even if it exists
             merged.add(name)
 
-    return sorted(list(merged))  # Sort list because set has no guaranteed order
+    result = sorted(list(merged))  # Sort list because set has no guaranteed order
+    return list1 if result == list1 else result
 
 
 # This merges lists of AST objects, where we can expect there is a "name" field
-def merge_object_lists(list1: List[Any], list2: List[Any]) -> List[Any]:
+def merge_object_lists(list1: List[Any], list2: List[Any], provenance=None, layer=None) -> List[Any]:
     """Merge two lists without duplicates based on the 'name' attribute."""
 
     # TODO - if it is a plain list of fields instead of complex items, then there is no item.name
@@ -60,29 +81,50 @@ def merge_object_lists(list1: List[Any], list2: List[Any]) -> List[Any]:
                 _log("WARN", f"*** Warning: Overlay wants to remove {name=} but it didn't exist before")
         else:
             if name not in merged:
-                # In the merge we want to remove all +/- if they are used, but for debugging
-                # we print out the original overlay object.  Therefore, don't modify and
-                # reference the overlay object - use a copy
-                item_copy = copy.deepcopy(item)
-                item_copy.name = name  # In merged tree only: remove +/- sign
-                merged[name] = item_copy
+                # A new node is referenced directly from the overlay.  Only if the name carries a +/- sign, a
+                # (shallow) copy is made so that the sign can be removed in the merged tree, while the original
+                # overlay object is still printed unmodified for debugging.  (Only the copy needs to be recorded,
+                # the provenance of an overlay object is found from the overlay itself.)
+                if item.name == name:
+                    merged[name] = item
+                else:
+                    merged[name] = replace(item, name=name)
+                    if provenance is not None:
+                        provenance.record_node(merged[name], layer)
             else:
-                merged[name] = merge_nodes(merged[name], item)
+                merged[name] = merge_nodes(merged[name], item, provenance, layer)
+
+    result = list(merged.values())
+
+    # If every item is the original one, the original list can be reused
+    if len(result) == len(list1) and all(a is b for a, b in zip(result, list1)):
+        return list1
+    return result
+
 
-    return list(merged.values())
+def is_unchanged(old_value, new_value):
+    """True if new_value can be replaced by old_value without changing the result of the merge"""
+    if new_value is old_value:
+        return True
+    # Equal plain values (strings, numbers) do not count as a modification, even if they are different objects
+    return not isinstance(new_value, list) and not is_dataclass(new_value) and \
+           type(new_value) is type(old_value) and new_value == old_value
 
 
-def merge_nodes(node1: Any, node2: Any) -> Any:
-    """Recursively merge two nodes."""
+def merge_nodes(node1: Any, node2: Any, provenance=None, layer=None) -> Any:
+    """Recursively merge two nodes.  Returns node1 itself if node2 does not modify it.
+    If a Provenance is given, the origin of modified nodes and fields is recorded as the given layer."""
     if not is_dataclass(node1) or not is_dataclass(node2):
         return node2 or node1
 
     node_type = type(node1)
     merged_values = {}
+    overridden = {}  # Fields that got their value directly from node2 -> layer
 
     for var in [field.name for field in fields(node_type)]:
         value1 = getattr(node1, var, None)
         value2 = getattr(node2, var, None)
+        assigned = True  # The value is taken from node2 as it is (if it is a modification)
 
         # TODO Removal shall be possible on Lists, without object having a name
         # e.g. removal of type from datatypes: in a variant
@@ -90,7 +132,8 @@ def merge_nodes(node1: Any, node2: Any) -> Any:
         if isinstance(value1, list) and isinstance(value2, list):
             if len(value2) > 0:
                 if is_dataclass(value2[0]):
-                    merged_value = merge_object_lists(value1, value2)
+                    merged_value = merge_object_lists(value1, value2, provenance, layer)
+                    assigned = False
                 else:
                     merged_value = merge_field_list(value1, value2)
             else:  # value2 is empty list, so the merged result is simply value1
@@ -100,21 +143,469 @@ def merge_nodes(node1: Any, node2: Any) -> Any:
             if is_removal(value2.name):
                 merged_value = None  # Not storing anything, so it's remmoved
             else:
-                merged_value = merge_nodes(value1, name_only(value2))
+                merged_value = merge_nodes(value1, value2, provenance, layer)
+                assigned = False
         else: # value is a simple field.  Therefore if value2 is defined, it
               # overwrites the original value (there is no "merging" of two fundamental fields)
               # If value2 is not defined, the result defaults back to original value1
-            merged_value = name_only(value2) or value1
-
-        merged_values[var] = merged_value
-
-    # (Dataclass function which replaces all member variables with new values:)
-    return replace(node1, **merged_values)
+            merged_value = (name_only(value2) if isinstance(value2, str) else value2) or value1
+
+        # Only the modified fields need to be stored (and recorded)
+        if not is_unchanged(value1, merged_value):
+            merged_values[var] = merged_value
+            if provenance is not None and assigned:
+                overridden[var] = layer
+
+    # Untouched node -> reuse it.  Otherwise create a new node with the modified fields.  (The dataclass function
+    # replace() keeps the other member variables, i.e. it references the same unmodified children.)
+    if not merged_values:
+        return node1
+    merged = replace(node1, **merged_values)
+    if provenance is not None:
+        provenance.record_replace(node1, merged, overridden)
+    return merged
+
+
+def merge_asts(ast1: AST, ast2: AST, freeze: bool = False, provenance=None, layer: int = 1) -> AST:
+    """Merge two ASTs into one.  The result shares unmodified nodes with both inputs.
+    With freeze=True, the result is made read-only, including the nodes it shares with the inputs (see Structural
+    sharing above).
+    If a Provenance is given, the origins are recorded in it, with ast2 as the given layer number."""
+    if provenance is not None:
+        provenance.record_layer(layer, ast2)
+    return _merge(lambda: merge_nodes(ast1, ast2, provenance, layer), freeze)
+
+
+# Provenance:
+#
+# When debugging a layered model it is useful to know which file a node or a value came from.  A Provenance object
+# passed to merge_asts() or merge_many() records this in a side table, without adding anything to the AST nodes.
+#
+# Most nodes that a layer introduces are objects of the overlay tree itself, which the merged tree references
+# directly.  Their origin is not recorded during the merge, but found when queried:  The Provenance keeps each
+# overlay tree with its layer number, and a node that is part of an overlay comes from that layer.  The table only
+# has an entry, keyed by id(node), for the nodes that the merge created:
+#
+# - origin:  The layer of a copy that was made of a new overlay node (to remove the +/- sign from its name), or for
+#            a merged node, the input node that it is the merged version of.  A merged node has the origin of that
+#            input node, i.e. the layer of the overlay that it is part of.
+# - fields:  The fields of the node that a layer assigned directly (simple values, lists of strings, removals).
+#
+# A node whose origin is neither recorded nor part of an overlay has the origin of its parent, and the root of the
+# base tree is layer 0.  Only nodes that the merge actually created are recorded, so the cost follows the size of the
+# overlays.  When no Provenance is given, nothing is recorded at all.
+#
+# The table keeps references to its nodes, so the ids can not be reused while the entries exist.  When a merge
+# replaces a node by its merged version, the entry moves to the new node, so only nodes of the latest result have
+# entries, and the intermediate versions of a pairwise merge of several layers are not kept alive.  (An entry only
+# refers to input nodes, because every node that the merge creates gets an entry of its own.)  A Provenance therefore
+# describes the last result that it was passed to the merge for, which is the final tree when several layers are
+# merged one after the other.
+#
+# Origins are queried by node path (see models/ifex/ifex_paths.py), for example:
+#
+#     provenance.origin(merged, 'seats/Seating/methods/move')              -> Origin(layer=2, file='overlay.yaml')
+#     provenance.origin(merged, 'seats/Seating/methods/move/description')  -> origin of the description field
+#
+# Note that a MergeCache (and therefore IncrementalMerge) does not record provenance, because subtrees that are
+# found in the cache are not merged again.
+
+Origin = namedtuple('Origin', ['layer', 'file'])
+
+class Provenance:
+    def __init__(self, files=None):
+        """files: Optional list of file names, in layer order starting with the base file (layer 0)"""
+        self.files = list(files) if files is not None else []
+        self.layers = {}  # layer -> overlay tree
+        self.entries = {}  # id(node) -> [node, layer or input node, {field name: layer} or None]
+        self._overlay_layers = None  # id(node) -> layer, for all nodes of the overlays (built when queried)
+        self._index = None  # PathIndex of the tree that was queried last
+
+    def record_layer(self, layer, overlay):
+        self.layers[layer] = overlay
+        self._overlay_layers = None
+
+    def record_node(self, node, layer):
+        self.entries[id(node)] = [node, layer, None]
+
+    def record_replace(self, old, new, overridden):
+        """Called when new is the merged version of old.  The entry of old (if any) moves to new, with the fields in
+        overridden added to it."""
+        entry = self.entries.pop(id(old), None)
+        if entry is None:
+            # old is a node of one of the input trees.  Which one is only looked up when queried.
+            self.entries[id(new)] = [new, old, overridden or None]
+            return
+        entry[0] = new
+        if entry[2] is None:
+            entry[2] = overridden or None
+        else:
+            entry[2].update(overridden)
+        self.entries[id(new)] = entry
+
+    def _origin(self, layer):
+        return Origin(layer, self.files[layer] if layer < len(self.files) else None)
+
+    def _walk_path(self, root, path):
+        # Queries usually go to the same merged tree, so its path index is built once and kept
+        if self._index is None or self._index.root is not root:
+            self._index = PathIndex(root)
+        return self._index.ancestors(path)
+
+    def _layer_of(self, node):
+        """The layer that node comes from, or None if it has the origin of its parent"""
+        if self._overlay_layers is None:
+            self._overlay_layers = {}
+            # In layer order, so that a node that is part of several overlays counts for the first one
+            for layer in sorted(self.layers, reverse=True):
+                self._overlay_layers.update(dict.fromkeys(PathIndex(self.layers[layer]).paths, layer))
+        entry = self.entries.get(id(node))
+        if entry is not None:
+            if isinstance(entry[1], int):
+                return entry[1]
+            node = entry[1]
+        return self._overlay_layers.get(id(node))
+
+    def _node_layer(self, nodes):
+        # The nearest node on the path that has a known layer decides the origin
+        for node in reversed(nodes):
+            layer = self._layer_of(node)
+            if layer is not None:
+                return layer
+        return 0
+
+    def node_origin(self, root, path):
+        """Return the Origin of the node at path in the merged tree root"""
+        nodes = self._walk_path(root, path)
+        if nodes is None:
+            raise KeyError(f"No node at path {path!r}")
+        return self._origin(self._node_layer(nodes))
+
+    def field_origin(self, root, path, field):
+        """Return the Origin of the value of field in the node at path"""
+        nodes = self._walk_path(root, path)
+        if nodes is None:
+            raise KeyError(f"No node at path {path!r}")
+        node = nodes[-1]
+        if field not in node.__dataclass_fields__:
+            raise KeyError(f"{type(node).__name__} at path {path!r} has no field {field!r}")
+        entry = self.entries.get(id(node))
+        if entry is not None and entry[2] is not None and field in entry[2]:
+            return self._origin(entry[2][field])
+        return self._origin(self._node_layer(nodes))
+
+    def origin(self, root, path):
+        """Return the Origin of the node at path, or of a field if the last path segment is a field name"""
+        if self._walk_path(root, path) is not None:
+            return self.node_origin(root, path)
+        parent, _, field = path.rpartition('/')
+        return self.field_origin(root, parent, field)
+
+
+# N-way merge:
+#
+# Merging N overlays onto one base with merge_asts() means N passes, where every pass creates a new version of all
+# nodes on the modified paths and re-sorts the field lists.  merge_many() instead walks the base once and, for each
+# node, applies the contributions of all layers in layer order before creating the merged node.  The result is the
+# same as merging pairwise, layer by layer.
+#
+# To get the same result, each field is "folded" over the layers exactly like repeated merge_nodes() calls would do,
+# but the expensive steps are postponed:  Matching nodes from several layers are only collected (start node + list of
+# overlay nodes), and merged recursively when all layers have been seen.
+
+class _Fold:
+    """Result of folding a field over the layers so far.  kind is one of:
+        'value'   : value is the plain value
+        'node'    : value is (start_node, [overlay nodes], [their layer numbers])
+        'objects' : value is (original_list, {name: (start_node, [overlay nodes], [their layer numbers])})
+        'fields'  : value is (original_list, set of strings)
+    layer is the layer that last assigned the value directly (None = unchanged)."""
+    def __init__(self, value, cache=None, provenance=None):
+        self.kind = 'value'
+        self.value = value
+        self.layer = None
+        self.cache = cache
+        self.provenance = provenance
+
+    def is_list(self):
+        return self.kind in ('objects', 'fields') or isinstance(self.value, list)
+
+    def is_node(self):
+        return self.kind == 'node' or (self.kind == 'value' and is_dataclass(self.value))
+
+    def add_objects(self, list2, layer):
+        if self.kind != 'objects':
+            original = self.result()
+            self.kind = 'objects'
+            self.value = (original, {name_only(item.name): (item, [], []) for item in original})
+
+        merged = self.value[1]
+        for item in list2:
+            name = name_only(item.name)
+            if is_removal(item.name):
+                if name in merged:
+                    del merged[name]
+                else:
+                    # FIXME use better reporting
+                    _log("WARN", f"*** Warning: Overlay wants to remove {name=} but it didn't exist before")
+            elif name not in merged:
+                if item.name == name:
+                    start = item
+                else:
+                    start = replace(item, name=name)
+                    if self.provenance is not None:
+                        self.provenance.record_node(start, layer)
+                merged[name] = (start, [], [])
+            else:
+                merged[name][1].append(item)
+                merged[name][2].append(layer)
+
+    def add_fields(self, list2, layer):
+        self.layer = layer
+        if self.kind != 'fields':
+            original = self.result()
+            self.kind = 'fields'
+            self.value = (original, set(original))
+
+        merged = self.value[1]
+        for item in list2:
+            name = name_only(item)
+            if is_removal(item):
+                if name in merged:
+                    merged.remove(name)
+                else:
+                    # FIXME use better reporting
+                    _log("WARN", f"*** Warning: Overlay wants to remove {name=} but it didn't exist before")
+            else:
+                merged.add(name)
+
+    def add_node(self, node2, layer):
+        if self.kind != 'node':
+            self.kind = 'node'
+            self.value = (self.value, [], [])
+        self.value[1].append(node2)
+        self.value[2].append(layer)
+
+    def set_value(self, value, layer):
+        self.kind = 'value'
+        self.value = value
+        self.layer = layer
+
+    def result(self):
+        """Create the merged value"""
+        if self.kind == 'node':
+            start, overlays, layers = self.value
+            return merge_nodes_many(start, overlays, self.cache, self.provenance, layers)
+
+        if self.kind == 'objects':
+            original, merged = self.value
+            result = [merge_nodes_many(start, overlays, self.cache, self.provenance, layers) if overlays else start
+                      for start, overlays, layers in merged.values()]
+            if len(result) == len(original) and all(a is b for a, b in zip(result, original)):
+                return original
+            return result
+
+        if self.kind == 'fields':
+            original, merged = self.value
+            result = sorted(list(merged))
+            return original if result == original else result
+
+        return self.value
+
+
+def merge_nodes_many(node1: Any, nodes: List[Any], cache=None, provenance=None, layers=None) -> Any:
+    """Merge the overlay nodes, in the given order, onto node1.
+    Equivalent to repeated merge_nodes() calls, but without creating the intermediate nodes.
+    If a MergeCache is given, results are looked up in (and stored into) the cache.
+    If a Provenance is given, origins are recorded, using the layer numbers in layers (default: 1, 2, 3...).
+    (A cache can not be combined with provenance, because a cached result would not be recorded)"""
+    if not nodes:
+        return node1
+    if layers is None:
+        layers = range(1, len(nodes) + 1)
+
+    # Not a tree of nodes -> simple fold, see merge_nodes()
+    if not is_dataclass(node1) or not all(is_dataclass(n) for n in nodes):
+        result = node1
+        for node2, layer in zip(nodes, layers):
+            result = merge_nodes(result, node2, provenance, layer)
+        return result
+
+    if cache is not None and provenance is None:
+        return cache.lookup(node1, nodes, lambda: _merge_nodes_many(node1, nodes, cache, None, layers))
+    return _merge_nodes_many(node1, nodes, cache, provenance, layers)
+
+
+def _merge_nodes_many(node1: Any, nodes: List[Any], cache, provenance, layers) -> Any:
+    merged_values = {}
+    overridden = {}  # Field name -> layer that assigned the value
 
+    for var in [field.name for field in fields(type(node1))]:
+        value1 = getattr(node1, var, None)
+        fold = _Fold(value1, cache, provenance)
+
+        # The same cases as in merge_nodes(), applied for one layer at a time
+        for node2, layer in zip(nodes, layers):
+            value2 = getattr(node2, var, None)
+
+            if fold.is_list() and isinstance(value2, list):
+                if len(value2) > 0:
+                    if is_dataclass(value2[0]):
+                        fold.add_objects(value2, layer)
+                    else:
+                        fold.add_fields(value2, layer)
+
+            elif fold.is_node() and is_dataclass(value2):
+                if is_removal(value2.name):
+                    fold.set_value(None, layer)
+                else:
+                    fold.add_node(value2, layer)
 
-def merge_asts(ast1: AST, ast2: AST) -> AST:
-    """Merge two ASTs into one."""
-    return merge_nodes(ast1, ast2)
+            else:
+                value2 = name_only(value2) if isinstance(value2, str) else value2
+                if value2:
+                    fold.set_value(value2, layer)
+
+        merged_value = fold.result()
+        if not is_unchanged(value1, merged_value):
+            merged_values[var] = merged_value
+            if fold.layer is not None and fold.kind in ('value', 'fields'):
+                overridden[var] = fold.layer
+
+    if not merged_values:
+        return node1
+    merged = replace(node1, **merged_values)
+    if provenance is not None:
+        provenance.record_replace(node1, merged, overridden)
+    return merged
+
+
+def merge_many(base: AST, overlays: List[AST], freeze: bool = False, provenance=None) -> AST:
+    """Merge all overlays, in the given order, onto base in a single pass.
+    The result is the same as calling merge_asts() once for each overlay.
+    If a Provenance is given, the origins are recorded in it, with the overlays numbered from 1."""
+    if provenance is not None:
+        for layer, overlay in enumerate(overlays, 1):
+            provenance.record_layer(layer, overlay)
+    return _merge(lambda: merge_nodes_many(base, overlays, provenance=provenance), freeze)
+
+
+# Incremental merge:
+#
+# In an edit-generate loop (watch mode, or a server) usually only one layer changes between two merges.  The
+# MergeCache remembers the result of each merge_nodes_many() call, keyed by the start node and the content hashes of
+# the overlay nodes applied to it.  In other words, each cache entry records which layers touched that subtree, and
+# with which content.  A layer that is re-read with modifications gets new hashes only for its modified parts (and
+# the path leading to them), so all other subtrees are found in the cache and reused as they are.
+#
+# Start nodes are identified by id(), so the cache entry keeps a reference to the start node.  This makes sure the
+# id can not be reused by another object while the entry exists.  Entries that were not used by the latest merge are
+# dropped afterwards, except the ones that a used entry was built from.
+
+class _CacheEntry:
+    def __init__(self, start, result, children, generation):
+        self.start = start
+        self.result = result
+        self.children = children
+        self.generation = generation
+
+
+class MergeCache:
+    def __init__(self):
+        self.entries = {}
+        self.hashes = {}       # id(overlay node) -> content hash, for all nodes of the current layers
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._stack = []       # Keys of entries used while computing the entry being computed
+
+    def lookup(self, start, overlays, compute):
+        if not all(id(n) in self.hashes for n in overlays):
+            return compute()   # (Not from a registered layer - should not happen)
+        key = (id(start), tuple(self.hashes[id(n)] for n in overlays))
+
+        entry = self.entries.get(key)
+        if entry is not None and entry.start is start:
+            self.hits += 1
+            self._mark_used(entry)
+        else:
+            self.misses += 1
+            self._stack.append([])
+            result = compute()
+            entry = _CacheEntry(start, result, self._stack.pop(), self.generation)
+            self.entries[key] = entry
+
+        if self._stack:
+            self._stack[-1].append(key)
+        return entry.result
+
+    def _mark_used(self, entry):
+        if entry.generation != self.generation:
+            entry.generation = self.generation
+            for key in entry.children:
+                child = self.entries.get(key)
+                if child is not None:
+                    self._mark_used(child)
+
+    def begin(self, layer_hashes):
+        """Start a merge.  layer_hashes is a list of dicts from content_hash(), one for each layer"""
+        self.generation += 1
+        self.hashes = {}
+        for hashes in layer_hashes:
+            self.hashes.update(hashes)
+
+    def end(self):
+        self.entries = {k: e for k, e in self.entries.items() if e.generation == self.generation}
+
+
+class IncrementalMerge:
+    """Keeps merge_many(base, layers) up to date while single layers are replaced.
+    Only the subtrees that a modified layer touches are merged again."""
+
+    def __init__(self, base: AST, layers: List[AST] = None, freeze: bool = False):
+        self.base = base
+        self.layers = list(layers or [])
+        self.layer_files = [None] * len(self.layers)   # (filename, file content hash) if read from file
+        self.freeze = freeze
+        self.layer_hashes = [self._hash_layer(layer) for layer in self.layers]
+        self.cache = MergeCache()
+        self.result = None
+        self.merge()
+
+    def merge(self) -> AST:
+        """(Re)compute the merged result, reusing all cached subtrees"""
+        self.cache.begin(self.layer_hashes)
+        self.result = _merge(lambda: merge_nodes_many(self.base, self.layers, self.cache), self.freeze)
+        self.cache.end()
+        return self.result
+
+    def set_layer(self, index: int, layer: AST) -> AST:
+        """Replace the layer at index (index == number of layers appends a new layer) and return the new result"""
+        if index == len(self.layers):
+            self.layers.append(layer)
+            self.layer_files.append(None)
+            self.layer_hashes.append(self._hash_layer(layer))
+        else:
+            self.layers[index] = layer
+            self.layer_files[index] = None
+            self.layer_hashes[index] = self._hash_layer(layer)
+        return self.merge()
+
+    @staticmethod
+    def _hash_layer(layer):
+        hashes = {}
+        content_hash(layer, hashes)
+        return hashes
+
+    def set_layer_file(self, index: int, filename: str) -> AST:
+        """Like set_layer(), but reads the layer from file.  Nothing is done if the file content is unchanged."""
+        with open(filename, 'rb') as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+        if index < len(self.layers) and self.layer_files[index] == (filename, digest):
+            return self.result
+        result = self.set_layer(index, get_ast_from_yaml_file(filename))
+        self.layer_files[index] = (filename, digest)
+        return result
 
 
 # MAIN = Standalone test Code only, not normal use
@@ -164,8 +655,8 @@ if __name__ == "__main__":
             ],
         )
 
-        merged_ast = merge_asts(ast1, ast2)
-        merged_ast.name = "Merged Result"
+        # (The result shares nodes with ast1 and ast2, so it is not modified in place)
+        merged_ast = replace(merge_asts(ast1, ast2), name="Merged Result")
 
         print(ast_as_yaml(ast1))
         print("-----------------------------------------")
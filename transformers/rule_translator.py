@@ -30,10 +30,13 @@ See example table in rule_translator.py source for more information, or any of t
 """
 
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, fields
 import os
+import pickle
 import re
 import sys
+import threading
 
 # -----------------------------------------------------------------------------
 # Translation Table Helper-objects
@@ -263,23 +266,28 @@ def transform_value_common(mapping_table, value, field_transform):
 
     return value
 
-delegated_refs = {}
+# Delegated objects are kept per thread, so that transform() calls running concurrently in different threads do not
+# see each other's delegations.  (transform_parallel() does not split up tables that use Delegate, because a delegation
+# from a node to the subtrees below it would then have to cross threads or processes)
+_delegation = threading.local()
 
-def store_delegated_object(input_obj, input_attr, delegate_to_this_node_type, delegate_to_this_attr):
-    global delegated_refs
+def _delegated_refs():
+    if not hasattr(_delegation, 'refs'):
+        _delegation.refs = {}
+    return _delegation.refs
 
+def store_delegated_object(input_obj, input_attr, delegate_to_this_node_type, delegate_to_this_attr):
     _log("DEBUG", f"\n\n==============   store_delegated_object: {delegate_to_this_attr=} {delegate_to_this_node_type=}:")
 
     # Store under a tuple of type and attr name
-    delegated_refs[(delegate_to_this_node_type, delegate_to_this_attr)] = getattr(input_obj, input_attr)
+    _delegated_refs()[(delegate_to_this_node_type, delegate_to_this_attr)] = getattr(input_obj, input_attr)
 
 def clear_delegated_ref(input_type, input_attr):
-    global delegated_refs
     _log("DEBUG", f"Clearing delegated_ref: {(input_type, input_attr)=} ")
-    delegated_refs.pop((input_type, input_attr), None)
+    _delegated_refs().pop((input_type, input_attr), None)
 
 def get_delegated_ref(input_type, input_attr):
-    global delegated_refs
+    delegated_refs = _delegated_refs()
     _log("DEBUG", f"Looking for {(input_type,input_attr)} in {delegated_refs=}")
     return delegated_refs.get((input_type,input_attr))
 
@@ -300,6 +308,11 @@ def transform(mapping_table, input_obj):
     if is_builtin(input_obj):
         return input_obj
 
+    # Subtree already transformed by a worker (see transform_parallel)
+    precomputed = getattr(_precomputed, 'results', None)
+    if precomputed is not None and id(input_obj) in precomputed:
+        return precomputed[id(input_obj)]
+
     # Find a translation rule in the metadata
     for key, mappings in mapping_table.items():
 
@@ -487,3 +500,119 @@ def transform(mapping_table, input_obj):
     no_rule = f"no translation rule found for object {input_obj} of class {input_obj.__class__.__name__}"
     _log("WARN", no_rule)
     raise TypeError(no_rule)
+
+
+# ----------------------------------------------------------------------------
+# --- Parallel conversion ---
+# ----------------------------------------------------------------------------
+
+# Sibling subtrees (e.g. the top-level Namespaces of an AST) are independent of each other, so they can be transformed
+# concurrently.  transform_parallel() hands each node at the chosen fan-out level to an executor, and then runs the
+# normal serial transform() on the root.  When the serial pass reaches one of the fanned-out nodes it picks up the
+# finished result instead of descending into it.  Since the serial pass still visits and assembles everything in its
+# usual order, the result is identical to calling transform() directly.
+#
+# Notes:
+# - The default is a ProcessPoolExecutor, because transform() is pure Python and threads do not run it in parallel.
+#   The mapping table and the input nodes are pickled, so functions in the table must be defined at module level
+#   (a lambda can not be pickled).  If the table or a subtree can not be pickled, a TypeError is raised.
+# - Tables with rules that pass state from one node to another are always transformed serially:  Preparation
+#   functions (e.g. resetting a counter), Delegate, and rules without output attribute that only store a value for a
+#   later rule (see input_filters/franca/franca_to_ifex.py).  That state lives in module globals or in the delegation
+#   table of the thread, which the workers do not share.
+# - Field transforms must be pure functions of their input.  State that a field transform keeps itself (a counter in
+#   a global, a closure or a mutable default argument) can not be detected:  Each worker gets its own copy of it, so the
+#   result would silently differ from transform().  Pass stateful=True for such a table, to transform it serially.
+# - An error in a worker is raised by transform_parallel(), as transform() would have raised it.
+
+# Results computed by the workers, keyed by id() of the input node.  Thread-local so that worker threads, which run in
+# the same process when a ThreadPoolExecutor is used, do not see the table of their caller.
+_precomputed = threading.local()
+
+def _list_items(value):
+    if isinstance(value, OrderedDict):
+        return list(value.values())
+    elif isinstance(value, list):
+        return value
+    return []
+
+def fan_out_nodes(input_obj, level=1):
+    """Return the nodes found in list-valued attributes exactly 'level' steps below input_obj, in tree order.
+    level=1 means the items in the lists of the root node itself, e.g. AST.namespaces."""
+    if level == 0:
+        return [input_obj]
+    if is_builtin(input_obj) or not hasattr(input_obj, '__dict__'):
+        return []
+
+    nodes = []
+    for value in vars(input_obj).values():
+        for item in _list_items(value):
+            if not is_builtin(item):
+                nodes.extend(fan_out_nodes(item, level - 1))
+    return nodes
+
+def _passes_state(mapping_table):
+    """True if the table has rules that pass state between nodes (see Parallel conversion)"""
+    for rules in mapping_table.values():
+        if isinstance(rules, dict):
+            # Default can be a dict of input_attr -> output_attr, or -> (output_attr, field_transform)
+            rules = [(key,) + (value if isinstance(value, tuple) else (value,)) for key, value in rules.items()]
+        for rule in rules:
+            if isinstance(rule, Preparation):
+                return True
+            if any(isinstance(x, Delegate) for x in rule):
+                return True
+            if len(rule) > 2 and rule[1] is None:
+                return True
+    return False
+
+def _transform_pickled(mapping_table, node):
+    return transform(pickle.loads(mapping_table), pickle.loads(node))
+
+def _pickled(obj, what):
+    try:
+        return pickle.dumps(obj)
+    except Exception as e:
+        raise TypeError(f"transform_parallel: {what} can not be pickled for a process pool ({e}).  "
+                        "Functions in the mapping table must be defined at module level.") from e
+
+def transform_parallel(mapping_table, input_obj, executor=None, level=1, stateful=False):
+    """Same as transform(), but the subtrees found at the given fan-out level are transformed by the executor.
+    If no executor is given, a ProcessPoolExecutor is created (and shut down) for this call.
+    The field transforms of the table must be pure functions:  With stateful=True, or if the table has rules that
+    pass state between nodes (see Parallel conversion), the tree is transformed serially."""
+
+    if stateful or _passes_state(mapping_table):
+        _log("INFO", "transform_parallel: The mapping table passes state between nodes - transforming serially")
+        return transform(mapping_table, input_obj)
+
+    # The same node object might be referenced more than once -> transform it only once
+    nodes = list({id(node): node for node in fan_out_nodes(input_obj, level)}.values())
+    _log("INFO", f"transform_parallel: {len(nodes)} subtrees at {level=}")
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor()
+
+    results = {}
+    try:
+        if isinstance(executor, ThreadPoolExecutor):
+            futures = [(node, executor.submit(transform, mapping_table, node)) for node in nodes]
+        else:
+            # Pickle here, so that an object that can not be pickled is reported as such (the executor would
+            # otherwise fail later, in its own thread)
+            table = _pickled(mapping_table, "The mapping table")
+            futures = [(node, executor.submit(_transform_pickled, table, _pickled(node, f"{type(node).__name__} subtree")))
+                       for node in nodes]
+        for node, future in futures:
+            results[id(node)] = future.result()
+    finally:
+        if own_executor:
+            executor.shutdown()
+    # Assemble the final result in the calling thread
+    previous = getattr(_precomputed, 'results', None)
+    _precomputed.results = results
+    try:
+        return transform(mapping_table, input_obj)
+    finally:
+        _precomputed.results = previous